@@ -0,0 +1,61 @@
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Optional
+from app.schemes.auth import UserPrincipal
+
+# Bounded LRU of verified tokens. An entry lives until the cache TTL or the token expiry, whichever comes first,
+# and every entry of a user is dropped when that user is changed or deleted.
+class TokenCache:
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._user_tokens = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[UserPrincipal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(token)
+            self.misses += 1
+            return None
+
+    def set(self, token: str, principal: UserPrincipal, expires_at: Optional[float] = None) -> None:
+        expires_at = min(expires_at or float("inf"), time.time() + self.ttl)
+        with self._lock:
+            self._entries[token] = (principal, expires_at)
+            self._entries.move_to_end(token)
+            self._user_tokens.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in list(self._user_tokens.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._user_tokens.clear()
+
+    def _remove(self, token: str) -> None:
+        principal, _ = self._entries.pop(token)
+        tokens = self._user_tokens.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._user_tokens[principal.id]
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
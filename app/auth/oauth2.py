@@ -1,12 +1,16 @@
-from jose import jwt, JWTError
-from fastapi import Depends, HTTPException, status
+import time
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
 from app.core.config import settings
-from app.schemes.auth import TokenData
+from app.schemes.auth import TokenData, UserPrincipal
 from app.database.dependencis import get_db
 from app.models.user import User
+from app.auth.cache import TokenCache
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from typing import Optional, Tuple
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
@@ -14,33 +18,83 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+token_cache = TokenCache(settings.auth_cache_size, settings.auth_cache_ttl_seconds) if settings.auth_cache_enabled else None
+
+# python-jose is imported on first use, importing the app does not load it
 def create_access_token(data: dict):
-    to_encode = data.copy()
+    from jose import jwt
     
+    to_encode = data.copy()
+
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    
+
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
     return encoded_jwt
 
-def verify_access_token(token: str, credentials_exceptions):
+def decode_access_token(token: str, credentials_exceptions) -> dict:
+    from jose import jwt, JWTError
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
-        id: str = payload.get("user_id")
-        if id is None:
-            raise credentials_exceptions
-        token_data = TokenData(id=id)
     except JWTError:
         raise credentials_exceptions
-    return token_data
+    if payload.get("user_id") is None:
+        raise credentials_exceptions
+    return payload
+
+def verify_access_token(token: str, credentials_exceptions):
+    payload = decode_access_token(token, credentials_exceptions)
+    return TokenData(id=payload.get("user_id"))
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db), request: Request = None) -> UserPrincipal:
+        # The time is kept on the request, the route reports it under its own name as the auth stage
+        start = time.perf_counter()
+        try:
+            return authenticate(token, db)
+        finally:
+            if request is not None:
+                request.state.auth_seconds = time.perf_counter() - start
+
+def authenticate(token: str, db: Session) -> UserPrincipal:
+        principal, payload = principal_from_token(token)
+        if principal is None:
+            principal = principal_from_user(token, payload, db.query(User.id, User.email).filter(User.id == payload["user_id"]).first())
+        return principal
+
+def credentials_exception() -> HTTPException:
+        return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                             detail="Could not validate credentials",
+                             headers={"WWW-Authenticate": "Bearer"})
+
+# The principal when the token cache or the token claims are enough, otherwise None and the decoded payload
+def principal_from_token(token: str) -> Tuple[Optional[UserPrincipal], dict]:
+        if token_cache is not None:
+            principal = token_cache.get(token)
+            if principal is not None:
+                return principal, {}
+
+        payload = decode_access_token(token, credentials_exception())
+        if settings.auth_trust_token_claims and payload.get("email") is not None:
+            principal = UserPrincipal(id=payload["user_id"], email=payload["email"])
+            if token_cache is not None:
+                token_cache.set(token, principal, expires_at=payload.get("exp"))
+            return principal, payload
+        return None, payload
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-        credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                          detail="Could not validate credentials",
-                                          headers={"WWW-Authenticate": "Bearer"})
-        token = verify_access_token(token, credentials_exception)
-        user = db.query(User).filter(User.id == token.id).first()
-        return user
+def principal_from_user(token: str, payload: dict, user) -> UserPrincipal:
+        if user is None:
+            raise credentials_exception()
+        principal = UserPrincipal(id=user.id, email=user.email)
+        if token_cache is not None:
+            token_cache.set(token, principal, expires_at=payload.get("exp"))
+        return principal
 
-    
\ No newline at end of file
+# Cached principals of a user are dropped as soon as the user row is changed or deleted through the ORM.
+# Changes made elsewhere (other workers, bulk queries) are picked up when the cache TTL runs out.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_user(mapper, connection, target):
+    if token_cache is not None:
+        token_cache.invalidate_user(target.id)
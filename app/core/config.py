@@ -1,26 +1,104 @@
 from pathlib import Path
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
-from typing import ClassVar
+from typing import ClassVar, Literal, Optional
 
 load_dotenv()
 
 class Settings(BaseSettings):
     BASE_DIR: ClassVar = Path(__file__).resolve().parent.parent
     MODEL_PATH: Path = BASE_DIR.parent / "ml_models" / "xgb_model.pkl"
+    # pickle: XGBRegressor pickle, booster: native xgb_model.ubj/.json, numpy: xgb_model.json evaluated without xgboost
+    MODEL_FORMAT: Literal["pickle", "booster", "numpy"] = "pickle"
     ONE_HOT_ENCODER_PATH: Path = BASE_DIR.parent / "ml_models" / "OneHot_encoder.pkl"
     LABEL_ENCODER_PATH: Path = BASE_DIR.parent / "ml_models" / "Label_encoder.pkl"
+    # onehot_label: OneHotEncoder + LabelEncoder pickles, categorical: native XGBoost categories with a vocabulary file
+    ENCODING: Literal["onehot_label", "categorical"] = "onehot_label"
+    CATEGORY_VOCABULARY_PATH: Path = BASE_DIR.parent / "ml_models" / "category_vocabulary.json"
+    # Single file written by scripts/train.py, replaces the model and encoder files above when set.
+    # Its tree arrays are memory-mapped and shared by the workers, only MODEL_FORMAT booster loads the booster it holds
+    MODEL_BUNDLE_PATH: Optional[Path] = None
     
-    db_user: str
-    db_password: str
-    db_hostname: str
-    db_port: str
-    db_name: str
+    # Either a full SQLAlchemy URL (e.g. sqlite:///./app.sqlite) or the Postgres connection parts below
+    database_url: Optional[str] = None
+    db_user: Optional[str] = None
+    db_password: Optional[str] = None
+    db_hostname: Optional[str] = None
+    db_port: Optional[str] = None
+    db_name: Optional[str] = None
+    
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_pre_ping: bool = True
+    db_pool_recycle_seconds: int = 1800
+    db_echo: bool = False
     
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
     
+    auth_cache_enabled: bool = True
+    auth_cache_size: int = 10000
+    auth_cache_ttl_seconds: float = 60
+    # Build the current user from the id and email claims of the token without querying the users table
+    auth_trust_token_claims: bool = False
+    
+    bcrypt_rounds: int = 12
+    # thread or process: a dedicated pool of password_hash_workers, inline: the shared request threadpool
+    password_hash_executor: Literal["inline", "thread", "process"] = "thread"
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+    
+    batching_enabled: bool = False
+    batch_max_size: int = 32
+    batch_max_wait_ms: float = 5.0
+    
+    prediction_cache_enabled: bool = False
+    prediction_cache_size: int = 10000
+    prediction_cache_ttl_seconds: float = 3600
+    # Kilometres are rounded down to this bucket before scoring when caching, 0 disables bucketing
+    prediction_cache_km_bucket: int = 0
+    # Optional store shared by all workers: file (sqlite file at prediction_cache_url) or redis (redis:// url)
+    prediction_cache_backend: Literal["none", "file", "redis"] = "none"
+    prediction_cache_url: str = str(BASE_DIR.parent / "cache" / "predictions.sqlite")
+    # Row cap of the file backend, expired and oldest rows are pruned every prediction_cache_prune_every writes
+    prediction_cache_shared_size: int = 100000
+    prediction_cache_prune_every: int = 1000
+    
+    # Request, stage and model timings served on /metrics
+    metrics_enabled: bool = True
+    
+    # Worker processes of app/serve.py and XGBoost threads per worker, derived from the available cores when unset
+    workers: Optional[int] = None
+    model_nthread: Optional[int] = None
+    
+    # Seconds between checks of the model artifacts by the reload watcher, 0 leaves reloads to the admin endpoint
+    model_check_interval_seconds: float = 5.0
+    # Required in the X-Admin-Token header of the model admin endpoints, they are disabled while unset
+    model_admin_token: Optional[str] = None
+    # JSON list of records a new model must score before it is swapped in, the built-in set is used when unset
+    model_golden_set_path: Optional[Path] = None
+    model_golden_min_price: float = 0.0
+    model_golden_max_price: float = 10_000_000.0
+    # Allowed relative error against the expected_price of a golden record
+    model_golden_tolerance: float = 0.05
+    
+    # sync: every prediction row is committed before the response, background: rows are bulk-inserted by a writer thread
+    prediction_write_mode: Literal["sync", "background"] = "sync"
+    prediction_writer_queue_size: int = 10000
+    prediction_writer_batch_size: int = 500
+    prediction_writer_flush_interval_ms: float = 200
+    prediction_writer_put_timeout_ms: float = 100
+    
+    @property
+    def sqlalchemy_database_url(self) -> str:
+        if self.database_url:
+            return self.database_url
+        missing = [name for name in ["db_user", "db_password", "db_hostname", "db_port", "db_name"] if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"Set database_url or all of the Postgres settings, missing: {missing}")
+        return f"postgresql://{self.db_user}:{self.db_password}@{self.db_hostname}:{self.db_port}/{self.db_name}"
+    
     class Config:
         env_file = ".env"
         
@@ -0,0 +1,254 @@
+import abc
+import bisect
+import math
+import threading
+import time
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Prometheus text format (version 0.0.4) without the prometheus_client dependency. Every worker process keeps its own
+# values, a scrape of /metrics returns the worker that served it.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abc.abstractmethod
+    def labels(self, *values):
+        ...
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        ...
+
+# Counters and histograms keep one child per label set and update it in place
+class _LabelledMetric(_Metric):
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        # Label values are strings, the lock is only taken the first time a label set is seen
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            values = tuple(str(value) for value in values)
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        ...
+
+    @abc.abstractmethod
+    def _render_child(self, values, child) -> List[str]:
+        ...
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+class Counter(_LabelledMetric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf bucket, made cumulative only when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Histogram(_LabelledMetric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+# Values read by a callback when /metrics is scraped, e.g. connection pool usage, nothing is tracked per request
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._callbacks = []
+
+    def set_function(self, callback: Callable[[], Dict[tuple, float]]) -> None:
+        self._callbacks.append(callback)
+
+    def labels(self, *values):
+        raise ValueError(f"Gauge {self.name} has no labelled values to update, its values are read from set_function callbacks")
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for callback in self._callbacks:
+            for values, value in sorted(callback().items()):
+                if value is not None:
+                    lines.append(f"{self.name}{_format_labels(self.labelnames, tuple(values))} {_format_value(value)}")
+        return lines
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = {}
+        self.enabled = True
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests", "HTTP requests by method, route template and status code", ("method", "route", "status")))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time from receiving a request until the response is sent", ("method", "route")))
+REQUEST_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "http_request_stage_seconds", "Time spent in a stage of a request: auth, validation, db_commit or db_queue", ("route", "stage")))
+MODEL_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "model_stage_seconds", "Time spent encoding features and predicting, per model version", ("stage", "model_version")))
+PREDICTIONS = REGISTRY.register(Counter(
+    "model_predictions", "Rows scored by the model, per model version", ("model_version",)))
+MODEL_INFO = REGISTRY.register(Gauge("model_info", "Model version currently serving, always 1", ("model_version",)))
+MODEL_RELOADS = REGISTRY.register(Gauge("model_reloads", "Model reloads by result since the worker started", ("result",)))
+DB_POOL = REGISTRY.register(Gauge("db_pool_connections", "Database pool connections by state", ("state",)))
+
+# Timing helpers for the request path, they cost two clock reads and a lock when enabled
+def observe_stage(route: str, stage: str, seconds: float) -> None:
+    if REGISTRY.enabled:
+        REQUEST_STAGE_SECONDS.labels(route, stage).observe(seconds)
+
+def observe_model(model_version: str, encode_seconds: float, predict_seconds: float, rows: int) -> None:
+    if REGISTRY.enabled:
+        MODEL_STAGE_SECONDS.labels("encode", model_version).observe(encode_seconds)
+        MODEL_STAGE_SECONDS.labels("predict", model_version).observe(predict_seconds)
+        PREDICTIONS.labels(model_version).inc(rows)
+
+def pool_state(pool) -> Dict[tuple, float]:
+    # QueuePool exposes its usage, the StaticPool of an in-memory SQLite database does not
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("checked_in",): pool.checkedin(),
+        ("overflow",): max(pool.overflow(), 0),
+    }
+
+# Pure ASGI middleware, cheaper than BaseHTTPMiddleware which wraps every response in a streaming task
+class MetricsMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REGISTRY.enabled:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        scope.setdefault("state", {})["started_at"] = start
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # The route template keeps the label set bounded, /predict/{id} instead of one series per id
+            path = route.path if route is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], path).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(scope["method"], path, str(status[0])).inc()
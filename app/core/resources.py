@@ -0,0 +1,28 @@
+import os
+import warnings
+
+from typing import Optional, Tuple
+
+def available_cores() -> int:
+    # Respects CPU affinity (taskset, container cpusets) where the platform exposes it
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# Splits the cores between parallel workers (serving worker processes or the joblib fits of a CV search) and
+# XGBoost threads per worker, so workers * nthread never exceeds the cores unless the overrides ask for more.
+# By default every core gets a worker, single-row predictions and the many small fits of a search barely use a
+# second thread. n_tasks caps the workers at what there is to run in parallel, the cores left over go to XGBoost.
+def plan_workers(cores: Optional[int] = None, workers: Optional[int] = None, nthread: Optional[int] = None,
+                 n_tasks: Optional[int] = None) -> Tuple[int, int]:
+    cores = cores or available_cores()
+    if not (workers and nthread):
+        if nthread:
+            workers = max(1, cores // nthread)
+        workers = workers or cores
+        if n_tasks:
+            workers = min(workers, n_tasks)
+        nthread = nthread or max(1, cores // workers)
+    if workers * nthread > cores:
+        warnings.warn(f"{workers} workers x {nthread} threads oversubscribe {cores} cores")
+    return workers, nthread
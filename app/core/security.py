@@ -1,10 +1,114 @@
-from passlib.context import CryptContext
+import asyncio
+import functools
+import logging
+import threading
+import time
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+
+# Built on the first hash, importing the app does not load passlib.
+# The bcrypt cost factor is configurable so load tests can use a cheap setting
+@functools.lru_cache(maxsize=None)
+def crypt_context():
+    from passlib.context import CryptContext
+    
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 
 def hash(password: str):
-    return pwd_context.hash(password)
+    return crypt_context().hash(password)
 
 def verify(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return crypt_context().verify(plain_password, hashed_password)
+
+class HashingPoolBusy(Exception):
+    pass
+
+def _timed_call(fn, submitted_at: float, *args):
+    # Wall clock times, so queue time can be measured across processes too
+    started_at = time.time()
+    return fn(*args), started_at - submitted_at, time.time() - started_at
+
+# Dedicated, size-limited executor for bcrypt, so a login burst cannot take every worker of the request threadpool.
+# At most max_workers hashes run at once and at most max_pending wait, further requests fail fast with HashingPoolBusy.
+# The inline executor hashes on the shared request threadpool without a cap, like sync routes do.
+class PasswordHasher:
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 64, executor: str = "thread"):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor_type = executor
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+        self.submitted_total = 0
+        self.rejected_total = 0
+        self.in_flight = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+        self.completed_total = 0
+
+    def _get_executor(self):
+        # Created on first use, a process pool must not be forked while the app is still importing
+        with self._executor_lock:
+            if self._executor is None:
+                if self.executor_type == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+            return self._executor
+
+    async def _run(self, fn, *args):
+        if self.executor_type == "inline":
+            return await run_in_threadpool(fn, *args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected_total += 1
+            raise HashingPoolBusy(f"More than {self.max_workers + self.max_pending} password hashes in progress")
+        self.submitted_total += 1
+        self.in_flight += 1
+        try:
+            future = self._get_executor().submit(_timed_call, fn, time.time(), *args)
+            result, queue_seconds, run_seconds = await asyncio.wrap_future(future)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+        self.completed_total += 1
+        self.queue_seconds_total += queue_seconds
+        self.queue_seconds_max = max(self.queue_seconds_max, queue_seconds)
+        self.run_seconds_total += run_seconds
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                logging.info("Password hashing pool stopped")
+
+    def stats(self) -> dict:
+        completed = self.completed_total or 1
+        return {
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "submitted_total": self.submitted_total,
+            "completed_total": self.completed_total,
+            "rejected_total": self.rejected_total,
+            "queue_seconds_avg": self.queue_seconds_total / completed,
+            "queue_seconds_max": self.queue_seconds_max,
+            "run_seconds_avg": self.run_seconds_total / completed,
+        }
 
+password_hasher = PasswordHasher(
+    max_workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    executor=settings.password_hash_executor,
+)
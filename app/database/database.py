@@ -1,16 +1,38 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.core.config import settings
 from sqlalchemy.ext.declarative import declarative_base
+from typing import Optional
 
 Base = declarative_base()
 
+def engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False}}
+        # An in-memory database only exists inside its connection, so every session has to share one
+        if ":memory:" in url or url.split("://", 1)[1] in ("", "/"):
+            options["poolclass"] = StaticPool
+        return options
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
+
+def async_database_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    drivers = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+    if dialect not in drivers:
+        return url
+    return f"{dialect}+{drivers[dialect]}://{rest}"
+
 class DatabaseSession:
-    def __init__(self):
-        self._engine = create_engine(
-            f"postgresql://{settings.db_user}:{settings.db_password}@{settings.db_hostname}:{settings.db_port}/{settings.db_name}",
-            echo=True
-        )
+    def __init__(self, url: Optional[str] = None):
+        url = url or settings.sqlalchemy_database_url
+        self._engine = create_engine(url, echo=settings.db_echo, **engine_options(url))
 
         self._SessionLocal = sessionmaker(
             bind=self._engine,
@@ -18,11 +40,55 @@ class DatabaseSession:
             autocommit=False,
             expire_on_commit=False
         )
+    
+    @property
+    def engine(self):
+        return self._engine
        
     def init(self):
         Base.metadata.create_all(bind=self._engine)
     
     def get_session(self):
         return self._SessionLocal()
+
+# AsyncEngine/AsyncSession variant for routes written as coroutines, needs asyncpg (Postgres) or aiosqlite (SQLite)
+class AsyncDatabaseSession:
+    def __init__(self, url: Optional[str] = None):
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url = async_database_url(url or settings.sqlalchemy_database_url)
+        self._engine = create_async_engine(url, echo=settings.db_echo, **engine_options(url))
+
+        self._SessionLocal = async_sessionmaker(
+            bind=self._engine,
+            autoflush=False,
+            expire_on_commit=False
+        )
+    
+    @property
+    def engine(self):
+        return self._engine
+    
+    async def init(self):
+        async with self._engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+    
+    def get_session(self):
+        return self._SessionLocal()
         
-db = DatabaseSession()
\ No newline at end of file
+db = DatabaseSession()
+
+# Created on first use, so the async driver is only required when async sessions are used
+async_db = None
+
+def get_async_database() -> AsyncDatabaseSession:
+    global async_db
+    if async_db is None:
+        async_db = AsyncDatabaseSession()
+    return async_db
+
+async def dispose_async_database() -> None:
+    global async_db
+    if async_db is not None:
+        await async_db.engine.dispose()
+        async_db = None
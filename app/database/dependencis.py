@@ -1,4 +1,4 @@
-from app.database.database import db
+from app.database.database import db, get_async_database
 
 def get_db():
     session = db.get_session()
@@ -6,3 +6,10 @@ def get_db():
         yield session
     finally:
         session.close()
+
+async def get_async_db():
+    session = get_async_database().get_session()
+    try:
+        yield session
+    finally:
+        await session.close()
@@ -0,0 +1,46 @@
+import argparse
+import json
+import logging
+
+from typing import Dict, List, Optional
+from sqlalchemy import inspect
+from app.database.database import Base, DatabaseSession, db
+
+# Explicit schema step, run once per deployment before the workers start (python -m app.database.migrate or
+# python -m app.serve --migrate). Importing the app never touches the database, so it needs no live database
+# and concurrently started workers cannot race on creating the same tables. Missing tables are created with
+# their indexes. create_all never touches a table that exists, so indexes added to a model later are created
+# on the existing tables here. Columns of existing tables are left as they are.
+
+def migrate(database: Optional[DatabaseSession] = None) -> Dict[str, List[str]]:
+    # The models register their tables on Base.metadata when imported
+    import app.models
+
+    database = database or db
+    inspector = inspect(database.engine)
+    existing = set(inspector.get_table_names())
+    database.init()
+    created_tables = [table.name for table in Base.metadata.sorted_tables if table.name not in existing]
+    created_indexes = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        present = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in present:
+                index.create(bind=database.engine, checkfirst=True)
+                created_indexes.append(index.name)
+    if created_tables:
+        logging.info(f"Created tables {created_tables}")
+    if created_indexes:
+        logging.info(f"Created indexes {created_indexes}")
+    return {"created_tables": created_tables, "created_indexes": created_indexes}
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Create the missing tables and indexes of the configured database")
+    parser.add_argument("--database-url", default=None, help="The DATABASE_URL setting by default")
+    args = parser.parse_args()
+
+    logging.basicConfig(level="INFO", format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    print(json.dumps(migrate(DatabaseSession(args.database_url) if args.database_url else db)))
@@ -1,11 +1,22 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.config import settings
+from app.core.metrics import REGISTRY, CONTENT_TYPE, DB_POOL, MetricsMiddleware, pool_state
 from app.routes import prediction, user, auth
-from app.database.database import db
+from app.database.database import db, dispose_async_database
 
-db.init()
+# Tables are created by the explicit migration step (app/database/migrate.py), not on import.
+# The model and its dependencies are loaded once, in the lifespan or before app/serve.py forks the workers.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prediction.startup()
+    yield
+    prediction.shutdown()
+    auth.stop_password_hasher()
+    await dispose_async_database()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "*"
@@ -19,10 +30,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the request time includes the other middleware
+REGISTRY.enabled = settings.metrics_enabled
+DB_POOL.set_function(lambda: pool_state(db.engine.pool))
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(prediction.router)
 app.include_router(user.router)
 app.include_router(auth.router)
 
 @app.get("/")
 async def root():
-    return {"message": "root"}
\ No newline at end of file
+    return {"message": "root"}
+
+# Prometheus scrape endpoint, the values are those of the worker process serving the scrape
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    if not REGISTRY.enabled:
+        raise HTTPException(status_code=404)
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, DECIMAL, ForeignKey, text
+from sqlalchemy import Column, Integer, String, TIMESTAMP, DECIMAL, ForeignKey, Index, func
 from app.database.database import Base
 
 class Prediction(Base):
     __tablename__ = 'price_predictions'
+    __table_args__ = (
+        # History queries filter on the owner and page on prediction_id, app.database.migrate adds it to existing tables
+        Index("ix_price_predictions_owner_id_prediction_id", "owner_id", "prediction_id"),
+    )
     
     prediction_id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     brand = Column(String, nullable=False)
@@ -18,5 +22,5 @@ class Prediction(Base):
     doors = Column(Integer, nullable=False)
     seats = Column(Integer, nullable=False)
     prediction_price = Column(DECIMAL, nullable=False)
-    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('NOW()'))
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
\ No newline at end of file
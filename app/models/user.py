@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, text
+from sqlalchemy import Column, Integer, String, TIMESTAMP, func
 from app.database.database import Base
 
 class User(Base):
@@ -7,4 +7,4 @@ class User(Base):
     id = Column(Integer, primary_key=True, nullable=False, index=True)
     email = Column(String, nullable=False, unique=True)
     password = Column(String, nullable=False, unique=True)
-    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("NOW()"))
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
@@ -1,25 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.database.dependencis import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.dependencis import get_async_db
 from app.models import User
-from app.core.security import verify
+from app.core.security import password_hasher, HashingPoolBusy
 from app.auth.oauth2 import create_access_token
 
 router = APIRouter(
     tags=["Auth"]
 )
 
+# Called from the application lifespan
+def stop_password_hasher():
+    password_hasher.shutdown()
+
+# Native coroutine on the async session, waiting for the database or for bcrypt on the hashing pool does not
+# hold a worker of the request threadpool
 @router.post('/login')
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_credentials.username).first()
-    print("a")
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).where(User.email == user_credentials.username))).scalars().first()
     if not user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials")
     
-    if not verify(user_credentials.password, user.password):
+    try:
+        valid = await password_hasher.verify(user_credentials.password, user.password)
+    except HashingPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many login attempts, try again later",
+                            headers={"Retry-After": "1"})
+    if not valid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials")
     
-    access_token = create_access_token(data = {"user_id": user.id})
+    # The email claim lets get_current_user skip the users table when auth_trust_token_claims is enabled
+    access_token = create_access_token(data = {"user_id": user.id, "email": user.email})
     
     return {"access_token": access_token, "token_type": "bearer"}
+
+# Password hashing pool concurrency and queue-time metrics
+@router.get('/login/metrics')
+def password_hashing_metrics():
+    return {"executor": password_hasher.executor_type, **password_hasher.stats()}
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Response
-from app.schemes.prediction import PredictionInputData, PredictionOutputData
-from app.services.model_handler import ModelHandler
+import hmac
+import time
+
+from fastapi import APIRouter, Depends, status, HTTPException, Request, Response, Query, Header
+from fastapi.responses import StreamingResponse
+from app.schemes.prediction import PredictionInputData, PredictionBatchInputData, PredictionOutputData, PredictionHistoryItem
+from app.services.batcher import MicroBatcher
+from app.services.prediction_cache import PredictionCache, FileCacheBackend, RedisCacheBackend
+from app.services.prediction_writer import PredictionWriter
+from app.services.prediction_history import history_query, select_columns, encode_cursor
+from app.services.prediction_export import iter_history_rows, ndjson_chunks, csv_chunks, gzip_chunks
 from app.core.config import settings
+from app.core.metrics import MODEL_INFO, MODEL_RELOADS, observe_stage
+from app.database.database import db as database
 from app.database.dependencis import get_db
 from app.models.prediction import Prediction
 from app.auth.oauth2 import get_current_user
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Literal
 
 # FastAPI application setup
 router = APIRouter(
@@ -14,25 +25,127 @@ router = APIRouter(
     tags=["Prediction"]
 )
 
-@router.on_event("startup")
-def init_model():
-    global model_handler
-    model_handler = ModelHandler(
-        model_path=settings.MODEL_PATH,
-        one_hot_encoder_path=settings.ONE_HOT_ENCODER_PATH,
-        label_encoder_path=settings.LABEL_ENCODER_PATH,
+registry = None
+batcher = None
+prediction_writer = None
+
+MODEL_INFO.set_function(lambda: {(registry.model_version,): 1} if registry is not None else {})
+MODEL_RELOADS.set_function(lambda: {("reloaded",): registry.reloads_total, ("rejected",): registry.rejected_total}
+                           if registry is not None else {})
+
+def create_prediction_cache():
+    if not settings.prediction_cache_enabled:
+        return None
+    shared_backend = None
+    if settings.prediction_cache_backend == "file":
+        shared_backend = FileCacheBackend(settings.prediction_cache_url, ttl=settings.prediction_cache_ttl_seconds,
+                                          maxsize=settings.prediction_cache_shared_size, prune_every=settings.prediction_cache_prune_every)
+    elif settings.prediction_cache_backend == "redis":
+        shared_backend = RedisCacheBackend(settings.prediction_cache_url, ttl=settings.prediction_cache_ttl_seconds)
+    return PredictionCache(
+        maxsize=settings.prediction_cache_size,
+        ttl=settings.prediction_cache_ttl_seconds,
+        kilometres_bucket=settings.prediction_cache_km_bucket,
+        shared_backend=shared_backend,
+    )
+
+# The model modules bring numpy, pandas, xgboost and sklearn, they are imported when the model is loaded
+# (application lifespan or the app/serve.py parent) and not when the app is imported
+def create_model_handler():
+    from app.services.model_handler import ModelHandler
+    
+    # Reloads are done by the registry swapping whole handlers, the handler never reloads itself mid-request
+    return ModelHandler.from_settings(settings, version_check_interval=None)
+
+# Loads the model without starting any thread, app/serve.py calls it before forking the workers
+def preload():
+    from app.services.model_registry import ModelRegistry, load_golden_set
+    
+    global registry
+    registry = ModelRegistry(
+        create_model_handler,
+        golden_records=load_golden_set(settings.model_golden_set_path),
+        min_price=settings.model_golden_min_price,
+        max_price=settings.model_golden_max_price,
+        tolerance=settings.model_golden_tolerance,
     )
+    registry.load()
+
+# Called from the application lifespan
+def startup():
+    global batcher, prediction_writer
+    if registry is None:
+        preload()
+    # Opened in the worker, cache connections must not be shared with a forked parent
+    registry.attach_cache(create_prediction_cache())
+    registry.start_watcher(settings.model_check_interval_seconds)
+    if settings.batching_enabled:
+        batcher = MicroBatcher(
+            lambda model_handler, records: model_handler.predict_batch(records),
+            max_batch_size=settings.batch_max_size,
+            max_wait_ms=settings.batch_max_wait_ms,
+        ).start()
+    if settings.prediction_write_mode == "background":
+        prediction_writer = PredictionWriter(
+            database.get_session,
+            Prediction,
+            max_queue_size=settings.prediction_writer_queue_size,
+            batch_size=settings.prediction_writer_batch_size,
+            flush_interval=settings.prediction_writer_flush_interval_ms / 1000,
+            put_timeout=settings.prediction_writer_put_timeout_ms / 1000,
+        ).start()
+
+def shutdown():
+    if registry is not None:
+        registry.stop_watcher()
+    if batcher is not None:
+        batcher.stop()
+    if prediction_writer is not None:
+        prediction_writer.stop()
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if settings.model_admin_token is None or x_admin_token is None \
+            or not hmac.compare_digest(x_admin_token.encode(), settings.model_admin_token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
 
 # Healthcheck endpoint to verify application status
 @router.get("/healthcheck")
 def healthcheck():
-    return {"status": "ok"}
+    return {"status": "ok", "model_version": registry.model_version if registry is not None else None}
 
-# Prediction endpoint
-@router.post('/',status_code=status.HTTP_201_CREATED)
-def predict(input_data: PredictionInputData, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    prediction = model_handler.predict(input_data.model_dump())
-    db_prediction = Prediction(
+# Loads, warms and validates the current artifacts in the background, predictions keep using the active model
+@router.post("/admin/reload", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(verify_admin_token)])
+def reload_model():
+    started = registry.reload_in_background()
+    return {"started": started, **registry.status()}
+
+@router.get("/admin/model", dependencies=[Depends(verify_admin_token)])
+def model_status():
+    return registry.status()
+
+# Micro-batching queue depth and batch size metrics
+@router.get("/batching/metrics")
+def batching_metrics():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.metrics()}
+
+# Prediction cache hit/miss/eviction counters
+@router.get("/cache/metrics")
+def cache_metrics():
+    if registry.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "model_version": registry.model_version, **registry.cache.stats()}
+
+# Background prediction writer queue and throughput counters
+@router.get("/writer/metrics")
+def writer_metrics():
+    if prediction_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_writer.metrics()}
+
+def prediction_row(input_data: PredictionInputData, prediction_price: float, owner_id: int) -> dict:
+    return dict(
         brand=input_data.Brand,
         production_year=input_data.Year,
         used_or_new=input_data.UsedOrNew,
@@ -45,21 +158,105 @@ def predict(input_data: PredictionInputData, db: Session = Depends(get_db), curr
         body_type=input_data.BodyType,
         doors=input_data.Doors,
         seats=input_data.Seats,
-        prediction_price=round(prediction[0], 2),
-        owner_id=current_user.id
+        prediction_price=round(prediction_price, 2),
+        owner_id=owner_id
     )
-    db.add(db_prediction)
-    db.commit()
-    db.refresh(db_prediction)
-    return {"prediction": prediction}
 
-@router.get('/', response_model=List[PredictionOutputData])
-def get_predictions(db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    predictions = db.query(Prediction).filter(Prediction.owner_id == current_user.id).all()
-    if not predictions:
+def observe_request_stages(request: Request, route: str) -> None:
+    # Set by the metrics middleware, missing when metrics are disabled
+    started_at = getattr(request.state, "started_at", None)
+    if started_at is None:
+        return
+    auth_seconds = getattr(request.state, "auth_seconds", 0.0)
+    observe_stage(route, "auth", auth_seconds)
+    # Everything else before the handler runs: routing, reading and validating the body, the hop to the threadpool
+    observe_stage(route, "validation", time.perf_counter() - started_at - auth_seconds)
+
+def save_rows(db: Session, rows: List[dict], route: str) -> None:
+    start = time.perf_counter()
+    # In background mode the rows are queued, they are written through only when the writer queue is full
+    if prediction_writer is not None:
+        rows = [row for row in rows if not prediction_writer.submit(row)]
+        observe_stage(route, "db_queue", time.perf_counter() - start)
+        start = time.perf_counter()
+    if rows:
+        db.add_all([Prediction(**row) for row in rows])
+        db.commit()
+        observe_stage(route, "db_commit", time.perf_counter() - start)
+
+# Prediction endpoint
+@router.post('/',status_code=status.HTTP_201_CREATED)
+def predict(input_data: PredictionInputData, request: Request, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
+    observe_request_stages(request, "/predict/")
+    # The active model is read once, a swap during the request does not change the model that scores it
+    model_handler = registry.active
+    # With micro-batching enabled concurrent requests on the same model are scored together in one model call
+    if batcher is not None:
+        prediction = batcher.predict(input_data.model_dump(), model_handler)
+    else:
+        prediction = model_handler.predict(input_data.model_dump())
+    save_rows(db, [prediction_row(input_data, prediction[0], current_user.id)], "/predict/")
+    return {"prediction": prediction, "model_version": model_handler.model_version}
+
+# Batch prediction endpoint, the whole batch is encoded and scored with a single model call
+@router.post('/batch', status_code=status.HTTP_201_CREATED)
+def predict_batch(input_data: PredictionBatchInputData, request: Request, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
+    observe_request_stages(request, "/predict/batch")
+    model_handler = registry.active
+    predictions = model_handler.predict_batch([item.model_dump() for item in input_data.items])
+    rows = [prediction_row(item, price, current_user.id) for item, price in zip(input_data.items, predictions)]
+    save_rows(db, rows, "/predict/batch")
+    return {"predictions": predictions, "model_version": model_handler.model_version}
+
+# Keyset-paginated history, the cursor of the next page is returned in the X-Next-Cursor header
+@router.get('/', response_model=List[PredictionHistoryItem], response_model_exclude_unset=True)
+def get_predictions(response: Response,
+                    limit: int = Query(100, ge=1, le=1000),
+                    cursor: Optional[str] = None,
+                    fields: Optional[str] = Query(None, description="Comma separated columns to return"),
+                    brand: Optional[str] = None,
+                    created_from: Optional[datetime] = None,
+                    created_to: Optional[datetime] = None,
+                    db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
+    try:
+        columns = select_columns(fields)
+        query = history_query(db, current_user.id, columns, brand=brand, created_from=created_from,
+                              created_to=created_to, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    rows = query.limit(limit + 1).all()
+    if not rows and cursor is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"There is no prediction for {current_user.email} user")
-    return predictions
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].prediction_id)
+    return [dict(row._mapping) for row in rows]
+
+# Streams the whole history with a server-side cursor, memory stays constant however many rows are exported
+@router.get("/export")
+def export_predictions(format: Literal["ndjson", "csv"] = "ndjson",
+                       compress: bool = Query(False, description="gzip the stream on the fly"),
+                       fields: Optional[str] = Query(None, description="Comma separated columns to export"),
+                       brand: Optional[str] = None,
+                       created_from: Optional[datetime] = None,
+                       created_to: Optional[datetime] = None,
+                       current_user: int = Depends(get_current_user)):
+    try:
+        columns = select_columns(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    rows = iter_history_rows(database.get_session, current_user.id, columns, brand=brand,
+                             created_from=created_from, created_to=created_to)
+    chunks = ndjson_chunks(rows, columns) if format == "ndjson" else csv_chunks(rows, columns)
+    headers = {"Content-Disposition": f"attachment; filename=predictions.{format}"}
+    if compress:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
 
 @router.get("/{id}", response_model=PredictionOutputData)
 def get_one_prediction(id: int, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
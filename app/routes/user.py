@@ -1,33 +1,42 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from app.database.dependencis import get_db
-from sqlalchemy.orm import Session
+from app.database.dependencis import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemes.user import UserCreate, UserOut
 from app.models import User
-from app.core.security import hash
+from app.core.security import password_hasher, HashingPoolBusy
 
 router = APIRouter(
     prefix="/users",
     tags=["Users"]
 )
 
+async def add_user(db: AsyncSession, user: UserCreate) -> User:
+    new_user = User(**user.model_dump())
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    return new_user
+
+# Native coroutine on the async session, the password is hashed on the dedicated hashing pool
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=UserOut)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = (await db.execute(select(User.id).where(User.email == user.email))).first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail="User with this email already exists")
-    hashed_password = hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HashingPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many requests, try again later",
+                            headers={"Retry-After": "1"})
     user.password = hashed_password
-    new_user = User(**user.model_dump())
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    return await add_user(db, user)
 
 @router.get("/{id}", response_model=UserOut)
-def get_user(id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == id).first()
+async def get_user(id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"User {id} does not exits")
@@ -7,4 +7,8 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     id: Optional[int] = None
-    
\ No newline at end of file
+
+# Lightweight authenticated user, all the routes need from the users table
+class UserPrincipal(BaseModel):
+    id: int
+    email: str
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Literal, List, Optional
 from datetime import datetime
 
 class PredictionInputData(BaseModel):
@@ -16,6 +16,9 @@ class PredictionInputData(BaseModel):
     Doors: int = Field(..., ge=2, le=12)
     Seats: int = Field(..., ge=2, le=12)
 
+class PredictionBatchInputData(BaseModel):
+    items: List[PredictionInputData] = Field(..., min_length=1, max_length=10000)
+
 class PredictionOutputData(BaseModel):
     prediction_id: int 
     prediction_price: float
@@ -34,4 +37,23 @@ class PredictionOutputData(BaseModel):
     created_at: datetime
     owner_id: int
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# History item with every field optional, only the selected columns are returned
+class PredictionHistoryItem(BaseModel):
+    prediction_id: Optional[int] = None
+    prediction_price: Optional[float] = None
+    brand: Optional[str] = None
+    production_year: Optional[int] = None
+    used_or_new: Optional[Literal["USED", "NEW", "DEMO"]] = None
+    transmission: Optional[Literal["Automatic", "Manual"]] = None
+    drive_type: Optional[Literal["4WD", "AWD", "Front", "Other", "Rear"]] = None
+    fuel_type: Optional[Literal["Diesel", "Hybrid", "LPG", "Premium", "Unleaded"]] = None
+    fuel_consumption: Optional[float] = None
+    kilometres: Optional[int] = None
+    cylinder_in_engine: Optional[int] = None
+    body_type: Optional[str] = None
+    doors: Optional[int] = None
+    seats: Optional[int] = None
+    created_at: Optional[datetime] = None
+    owner_id: Optional[int] = None
@@ -0,0 +1,116 @@
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+import uvicorn
+
+from typing import Optional
+from app.core.config import settings
+from app.core.resources import plan_workers
+
+# Production entry point. The parent process imports the app and loads and validates the model once, then forks
+# the workers, which serve from the same listening socket and share the model pages copy-on-write instead of
+# loading a copy each. Dead workers are replaced, SIGTERM/SIGINT stop all of them gracefully.
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    # asyncio only sets TCP_NODELAY on connections of sockets created with IPPROTO_TCP, without it every
+    # response waits for the delayed ACK of the client (about 40 ms)
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock: socket.socket, nthread: int, log_level: str) -> None:
+    from app.database.database import db
+    from app.routes import prediction
+
+    # Own process group, a Ctrl-C in the terminal only reaches the parent which then stops the workers once
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Pooled connections opened by the parent (migration) must not be used by two processes
+    db.engine.dispose(close=False)
+    settings.model_nthread = nthread
+    prediction.registry.active.set_nthread(nthread)
+    uvicorn.Server(uvicorn.Config(app, log_level=log_level, lifespan="on")).run(sockets=[sock])
+
+def spawn(app, sock: socket.socket, nthread: int, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock, nthread, log_level)
+        except BaseException:
+            logging.exception("Worker failed")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: Optional[int] = None, nthread: Optional[int] = None,
+          log_level: str = "info", migrate: bool = False) -> None:
+    workers, nthread = plan_workers(workers=workers or settings.workers, nthread=nthread or settings.model_nthread)
+    # The parent validates the model single threaded, an OpenMP thread pool started before fork is unusable in the workers
+    settings.model_nthread = 1
+    from app.main import app
+    from app.routes import prediction
+
+    if migrate:
+        from app.database.migrate import migrate as run_migration
+
+        run_migration()
+    prediction.preload()
+    # Everything loaded so far leaves the tracked generations, collections in the workers then neither scan
+    # nor write to these objects, which would copy their pages into every worker
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(host, port)
+    logging.info(f"Serving model {prediction.registry.model_version} on {host}:{port} with {workers} workers x {nthread} threads")
+    children = {spawn(app, sock, nthread, log_level) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            logging.warning(f"Worker {pid} exited with status {status}, starting a new one")
+            # A worker failing on start should not turn into a fork loop
+            time.sleep(1)
+            # A stop signal during the pause has already been sent to all running workers
+            if not stopping:
+                children.add(spawn(app, sock, nthread, log_level))
+    sock.close()
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Serve the API from pre-forked workers sharing one loaded model")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, one per available core by default")
+    parser.add_argument("--nthread", type=int, default=None, help="XGBoost threads per worker, the cores left per worker by default")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--migrate", action="store_true", help="Create the missing tables and indexes before forking the workers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    serve(args.host, args.port, args.workers, args.nthread, args.log_level, args.migrate)
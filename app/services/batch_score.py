@@ -0,0 +1,172 @@
+import argparse
+import functools
+import json
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Set, Tuple
+from tqdm import tqdm
+from app.services.encoding import INPUT_COLS
+from app.services.model_handler import ModelHandler
+
+# Offline re-pricing of a whole listings file (CSV or Parquet with the input columns of /predict).
+# The file is read in chunks, every chunk is encoded column-wise and scored in a single model call, and written
+# with its inputs and the prediction as its own part file named after the offset of its first row. Parts are
+# renamed into place once complete and a run started with resume skips every offset that already has one.
+# At most two chunks per worker are in flight, memory stays bounded however large the file is.
+# A row the model cannot encode (an unknown category, a non-numeric value) does not stop the job, it is
+# written with a missing prediction and the reason in the error column, and counted in the summary.
+
+PREDICTION_COLUMN = "PredictedPrice"
+ERROR_COLUMN = "ScoringError"
+MANIFEST_NAME = "_batch_score.json"
+FORMATS = ["csv", "parquet"]
+
+handler = None
+
+def file_format(path: Path) -> str:
+    return "parquet" if path.suffix in [".parquet", ".pq"] else "csv"
+
+def count_rows(path: Path) -> Optional[int]:
+    # Only Parquet knows its length without reading the file
+    return pq.ParquetFile(path).metadata.num_rows if file_format(path) == "parquet" else None
+
+def read_chunks(path: Path, chunksize: int) -> Iterator[Tuple[int, pd.DataFrame]]:
+    offset = 0
+    if file_format(path) == "parquet":
+        # Batches never span row groups, chunks can be shorter than chunksize but are the same on every run
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize))
+    else:
+        chunks = pd.read_csv(path, chunksize=chunksize)
+    for chunk in chunks:
+        yield offset, chunk
+        offset += len(chunk)
+
+def part_path(output_dir: Path, offset: int, output_format: str) -> Path:
+    return output_dir / f"part-{offset:012d}.{output_format}"
+
+def completed_offsets(output_dir: Path, output_format: str) -> Set[int]:
+    return {int(path.name[len("part-"):-len(f".{output_format}")]) for path in output_dir.glob(f"part-*.{output_format}")}
+
+def write_part(frame: pd.DataFrame, path: Path) -> None:
+    temporary = path.with_name(path.name + ".tmp")
+    if path.suffix == ".parquet":
+        frame.to_parquet(temporary, index=False)
+    else:
+        frame.to_csv(temporary, index=False)
+    os.replace(temporary, path)
+
+def init_worker(factory: Callable[[], ModelHandler], nthread: Optional[int]) -> None:
+    # Forked workers inherit the model loaded by the parent, spawned ones load their own
+    global handler
+    if handler is None:
+        handler = factory()
+    handler.set_nthread(nthread)
+
+def score_chunk(chunk: pd.DataFrame, path: Path) -> Tuple[int, int]:
+    state = handler.ensure_loaded()
+    frame = chunk[INPUT_COLS]
+    errors = state.encoding_tables.row_errors(frame)
+    valid = errors.isna().to_numpy()
+    predictions = np.full(len(chunk), np.nan, dtype=np.float32)
+    predictions[valid] = handler.predict_frame(frame[valid], state)
+    chunk[PREDICTION_COLUMN] = predictions
+    chunk[ERROR_COLUMN] = errors
+    write_part(chunk, path)
+    return len(chunk), int((~valid).sum())
+
+def prepare_output(output_dir: Path, manifest: dict, resume: bool) -> None:
+    manifest_path = output_dir / MANIFEST_NAME
+    if output_dir.exists() and any(output_dir.iterdir()):
+        if not resume:
+            raise FileExistsError(f"{output_dir} is not empty, pass resume to continue a previous run")
+        if not manifest_path.exists():
+            raise FileExistsError(f"{output_dir} holds no {MANIFEST_NAME} of a previous run")
+        previous = json.loads(manifest_path.read_text())
+        # Other chunk boundaries would make the existing parts overlap the new ones
+        changed = [key for key in ["input", "chunksize", "output_format"] if previous[key] != manifest[key]]
+        if changed:
+            raise ValueError(f"The previous run used different {changed}: {[previous[key] for key in changed]}")
+        if previous["model_version"] != manifest["model_version"]:
+            logging.warning(f"Resuming a run of model {previous['model_version']} with model {manifest['model_version']}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+def score_file(input_path: Path, output_dir: Path, factory: Callable[[], ModelHandler], chunksize: int = 100_000,
+               workers: int = 0, nthread: Optional[int] = None, output_format: Optional[str] = None,
+               resume: bool = False, progress: bool = True) -> dict:
+    global handler
+    input_path, output_dir = Path(input_path), Path(output_dir)
+    output_format = output_format or file_format(input_path)
+    handler = factory()
+    prepare_output(output_dir, {"input": str(input_path.resolve()), "chunksize": chunksize, "output_format": output_format,
+                                "model_version": handler.model_version}, resume)
+    done = completed_offsets(output_dir, output_format)
+
+    start = time.perf_counter()
+    summary = {"rows": 0, "error_rows": 0, "chunks": 0, "skipped_chunks": 0}
+    bar = tqdm(total=count_rows(input_path), unit="rows", desc="Scoring", disable=not progress)
+
+    def finished(result: Tuple[int, int]) -> None:
+        rows, error_rows = result
+        summary["rows"] += rows
+        summary["error_rows"] += error_rows
+        summary["chunks"] += 1
+        bar.update(rows)
+
+    if workers:
+        # Model threads split between the workers, the parent only reads chunks and writes nothing
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(factory, nthread or 1)) as pool:
+            pending = deque()
+            for offset, chunk in read_chunks(input_path, chunksize):
+                if offset in done:
+                    summary["skipped_chunks"] += 1
+                    bar.update(len(chunk))
+                    continue
+                pending.append(pool.submit(score_chunk, chunk, part_path(output_dir, offset, output_format)))
+                if len(pending) >= 2 * workers:
+                    finished(pending.popleft().result())
+            while pending:
+                finished(pending.popleft().result())
+    else:
+        handler.set_nthread(nthread)
+        for offset, chunk in read_chunks(input_path, chunksize):
+            if offset in done:
+                summary["skipped_chunks"] += 1
+                bar.update(len(chunk))
+                continue
+            finished(score_chunk(chunk, part_path(output_dir, offset, output_format)))
+    bar.close()
+    if summary["error_rows"]:
+        logging.warning(f"{summary['error_rows']} rows could not be scored, see the {ERROR_COLUMN} column of the parts")
+
+    seconds = time.perf_counter() - start
+    return {**summary, "seconds": seconds, "rows_per_second": summary["rows"] / seconds if seconds else 0.0,
+            "model_version": handler.model_version, "output": str(output_dir)}
+
+if __name__ == "__main__":
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of vehicles in chunks with the configured model")
+    parser.add_argument("input", type=Path)
+    parser.add_argument("output", type=Path, help="Directory of the scored part files, one per chunk")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=0, help="Score chunks in this many processes, 0 scores in this one")
+    parser.add_argument("--nthread", type=int, default=None, help="XGBoost threads per worker")
+    parser.add_argument("--output-format", choices=FORMATS, default=None, help="Format of the parts, the input format by default")
+    parser.add_argument("--resume", action="store_true", help="Continue a previous run, chunks with a part are skipped")
+    parser.add_argument("--no-progress", action="store_true")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    factory = functools.partial(ModelHandler.from_settings, settings, version_check_interval=None)
+    print(json.dumps(score_file(args.input, args.output, factory, args.chunksize, args.workers, args.nthread,
+                                args.output_format, args.resume, not args.no_progress), indent=2))
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+
+# Every request carries the model it was routed to. Requests collected in one window are grouped by that model
+# and each group is scored with a single predict_fn(model, records) call, so a model swapped in while a request
+# waits never scores it.
+class MicroBatcher:
+
+    def __init__(self, predict_fn: Callable[[Any, List[dict]], List[float]], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._worker = None
+        self._running = False
+
+        self.batches_total = 0
+        self.items_total = 0
+        self.errors_total = 0
+        self.max_queue_depth = 0
+        self.last_batch_size = 0
+        self.batch_size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS + [float("inf")]}
+
+    def start(self) -> "MicroBatcher":
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+        self._worker = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+        self._worker.start()
+        logging.info(f"Micro-batching started (max_batch_size={self.max_batch_size}, max_wait={self.max_wait * 1000}ms)")
+        return self
+
+    def stop(self) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        logging.info("Micro-batching stopped")
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, record: dict, model: Any = None) -> Future:
+        future = Future()
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("MicroBatcher is not running")
+            self._queue.append((record, model, future))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._condition.notify()
+        return future
+
+    # Same return shape as ModelHandler.predict, so the batcher can be used in its place
+    def predict(self, record: dict, model: Any = None) -> List[float]:
+        return [self.submit(record, model).result()]
+
+    def _next_batch(self) -> list:
+        with self._condition:
+            while not self._queue and self._running:
+                self._condition.wait()
+            if not self._queue:
+                return []
+            # The first request opens the window, the batch closes when it is full or the window expires
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch_size and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                # Only reached once stopped and the queue is drained
+                return
+            groups = {}
+            for record, model, future in batch:
+                groups.setdefault(id(model), (model, []))[1].append((record, future))
+            for model, group in groups.values():
+                self._score(model, group)
+
+    def _score(self, model: Any, batch: list) -> None:
+        records = [record for record, _ in batch]
+        try:
+            predictions = self.predict_fn(model, records)
+            if len(predictions) != len(records):
+                raise ValueError(f"Expected {len(records)} predictions, got {len(predictions)}")
+        except Exception as e:
+            logging.exception("Batch prediction failed")
+            self.errors_total += 1
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), prediction in zip(batch, predictions):
+            future.set_result(prediction)
+        self._record(len(batch))
+
+    def _record(self, size: int) -> None:
+        self.batches_total += 1
+        self.items_total += size
+        self.last_batch_size = size
+        for bucket in self.batch_size_histogram:
+            if size <= bucket:
+                self.batch_size_histogram[bucket] += 1
+                break
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "batches_total": self.batches_total,
+            "items_total": self.items_total,
+            "errors_total": self.errors_total,
+            "last_batch_size": self.last_batch_size,
+            "mean_batch_size": self.items_total / self.batches_total if self.batches_total else 0.0,
+            "batch_size_histogram": {f"le_{bucket}": count for bucket, count in self.batch_size_histogram.items()},
+        }
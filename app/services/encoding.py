@@ -0,0 +1,178 @@
+import json
+import numpy as np
+import threading
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+INPUT_COLS = ["Brand", "Year", "UsedOrNew", "Transmission", "DriveType", "FuelType", "FuelConsumption",
+              "Kilometres", "CylindersinEngine", "BodyType", "Doors", "Seats"]
+CATEGORICAL_COLS_FOR_ONE_HOT = ["UsedOrNew", "Transmission", "DriveType", "FuelType"]
+CATEGORICAL_COLS_FOR_LABEL = ["Brand", "BodyType"]
+CATEGORICAL_COLS = CATEGORICAL_COLS_FOR_LABEL + CATEGORICAL_COLS_FOR_ONE_HOT
+ENCODINGS = ["onehot_label", "categorical"]
+
+def load_category_vocabulary(path) -> Dict[str, List[str]]:
+    with open(path, "r") as file:
+        return json.load(file)
+
+def save_category_vocabulary(vocabulary: Dict[str, List[str]], path) -> None:
+    with open(path, "w") as file:
+        json.dump(vocabulary, file, indent=2)
+
+# Fitted encoders compiled into plain dict lookups and a fixed feature column order.
+# Request features are written straight into a float32 row, so the hot path never touches
+# pandas or sklearn. The row layout is the same as the one produced by ModelHandler.process_input_data.
+class EncodingTables:
+
+    def __init__(self, feature_names: Sequence[str], numeric_index: Dict[str, int],
+                 one_hot_index: Dict[str, Dict[str, int]], label_index: Dict[str, int],
+                 label_tables: Dict[str, Dict[str, float]], label_defaults: Dict[str, float],
+                 one_hot_ignore_unknown: bool = False):
+        self.feature_names = list(feature_names)
+        self.numeric_index = numeric_index
+        self.one_hot_index = one_hot_index
+        self.label_index = label_index
+        self.label_tables = label_tables
+        self.label_defaults = label_defaults
+        self.one_hot_ignore_unknown = one_hot_ignore_unknown
+        self.n_features = len(self.feature_names)
+        self._local = threading.local()
+
+    @classmethod
+    def from_encoders(cls, one_hot_encoder, label_encoder, feature_names: Optional[Sequence[str]] = None) -> "EncodingTables":
+        one_hot_names = list(one_hot_encoder.get_feature_names_out(CATEGORICAL_COLS_FOR_ONE_HOT))
+        if feature_names is None:
+            feature_names = [col for col in INPUT_COLS if col not in CATEGORICAL_COLS_FOR_ONE_HOT] + one_hot_names
+        feature_names = list(feature_names)
+        position = {name: i for i, name in enumerate(feature_names)}
+
+        missing = [name for name in one_hot_names if name not in position]
+        if missing:
+            raise ValueError(f"OneHotEncoder features missing from the model feature order: {missing}")
+
+        numeric_index = {col: position[col] for col in INPUT_COLS
+                         if col not in CATEGORICAL_COLS_FOR_ONE_HOT and col not in CATEGORICAL_COLS_FOR_LABEL}
+
+        # Categories dropped by the encoder have no column (-1) and are encoded as all zeros
+        one_hot_index = {}
+        for col, categories in zip(CATEGORICAL_COLS_FOR_ONE_HOT, one_hot_encoder.categories_):
+            one_hot_index[col] = {str(category): position.get(f"{col}_{category}", -1) for category in categories}
+
+        # One LabelEncoder is shared by both columns, unknown labels fall back to classes_[0] which is code 0
+        label_table = {str(label): float(code) for code, label in enumerate(label_encoder.classes_)}
+        label_index = {col: position[col] for col in CATEGORICAL_COLS_FOR_LABEL}
+        label_tables = {col: label_table for col in CATEGORICAL_COLS_FOR_LABEL}
+        label_defaults = {col: 0.0 for col in CATEGORICAL_COLS_FOR_LABEL}
+
+        return cls(feature_names, numeric_index, one_hot_index, label_index, label_tables, label_defaults,
+                   one_hot_ignore_unknown=one_hot_encoder.handle_unknown != "error")
+
+    @classmethod
+    def from_vocabulary(cls, vocabulary: Dict[str, List[str]], feature_names: Optional[Sequence[str]] = None) -> "EncodingTables":
+        # Native categorical models take the position of the category in the vocabulary, one feature per column.
+        # Categories missing from the vocabulary are encoded as NaN and follow the default branch of every split.
+        if feature_names is None:
+            feature_names = INPUT_COLS
+        feature_names = list(feature_names)
+        position = {name: i for i, name in enumerate(feature_names)}
+
+        missing = [col for col in INPUT_COLS if col not in position]
+        if missing:
+            raise ValueError(f"Input columns missing from the model feature order: {missing}")
+
+        numeric_index = {col: position[col] for col in INPUT_COLS if col not in vocabulary}
+        label_index = {col: position[col] for col in vocabulary}
+        label_tables = {col: {str(category): float(code) for code, category in enumerate(categories)}
+                        for col, categories in vocabulary.items()}
+        label_defaults = {col: np.nan for col in vocabulary}
+        return cls(feature_names, numeric_index, {}, label_index, label_tables, label_defaults)
+
+    def to_dict(self) -> dict:
+        return {
+            "feature_names": self.feature_names,
+            "numeric_index": self.numeric_index,
+            "one_hot_index": self.one_hot_index,
+            "label_index": self.label_index,
+            "label_tables": self.label_tables,
+            "label_defaults": self.label_defaults,
+            "one_hot_ignore_unknown": self.one_hot_ignore_unknown,
+        }
+
+    @classmethod
+    def from_dict(cls, tables: dict) -> "EncodingTables":
+        return cls(**tables)
+
+    def _row_buffer(self) -> np.ndarray:
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = np.zeros((1, self.n_features), dtype=np.float32)
+            self._local.row = row
+        return row
+
+    def _write(self, row: np.ndarray, record: dict) -> None:
+        for col, i in self.numeric_index.items():
+            row[i] = record[col]
+        for col, i in self.label_index.items():
+            row[i] = self.label_tables[col].get(record[col], self.label_defaults[col])
+        for col, table in self.one_hot_index.items():
+            i = table.get(record[col])
+            if i is None:
+                if not self.one_hot_ignore_unknown:
+                    raise ValueError(f"Found unknown category {record[col]!r} in column {col} during transform")
+            elif i >= 0:
+                row[i] = 1.0
+
+    def encode_row(self, record: dict) -> np.ndarray:
+        # The row is preallocated per thread and reused by the next call, consume it before encoding again
+        row = self._row_buffer()
+        row.fill(0.0)
+        self._write(row[0], record)
+        return row
+
+    def encode_batch(self, records: List[dict]) -> np.ndarray:
+        matrix = np.zeros((len(records), self.n_features), dtype=np.float32)
+        for row, record in zip(matrix, records):
+            self._write(row, record)
+        return matrix
+
+    def encode_frame(self, frame: "pd.DataFrame") -> np.ndarray:
+        import pandas as pd
+        
+        # Column by column for offline scoring, categories are looked up once per distinct value instead of per row.
+        # Missing values (code -1 of factorize) take the last entry of each lookup, the fallback of an unknown category.
+        matrix = np.zeros((len(frame), self.n_features), dtype=np.float32)
+        for col, i in self.numeric_index.items():
+            matrix[:, i] = frame[col].to_numpy(dtype=np.float32)
+        for col, i in self.label_index.items():
+            codes, uniques = pd.factorize(frame[col])
+            table, default = self.label_tables[col], self.label_defaults[col]
+            matrix[:, i] = np.array([table.get(value, default) for value in uniques] + [default], dtype=np.float32)[codes]
+        for col, table in self.one_hot_index.items():
+            codes, uniques = pd.factorize(frame[col])
+            # -2 marks an unknown category, -1 a category dropped by the encoder, both leave the row all zeros
+            positions = np.array([table.get(value, -2) for value in uniques] + [-2])[codes]
+            if not self.one_hot_ignore_unknown and (positions == -2).any():
+                value = frame[col].to_numpy()[np.argmax(positions == -2)]
+                raise ValueError(f"Found unknown category {value!r} in column {col} during transform")
+            rows = np.flatnonzero(positions >= 0)
+            matrix[rows, positions[rows]] = 1.0
+        return matrix
+
+    def row_errors(self, frame: "pd.DataFrame") -> "pd.Series":
+        import pandas as pd
+        
+        # Why encode_frame would reject a row, missing for the rows it accepts. Lets offline scoring set aside
+        # single bad rows instead of failing the whole frame.
+        errors = pd.Series(pd.NA, index=frame.index, dtype="string")
+        for col in self.numeric_index:
+            bad = (pd.to_numeric(frame[col], errors="coerce").isna() & frame[col].notna()).to_numpy()
+            errors[bad & errors.isna().to_numpy()] = f"Non-numeric value in column {col}"
+        if not self.one_hot_ignore_unknown:
+            for col, table in self.one_hot_index.items():
+                codes, uniques = pd.factorize(frame[col])
+                bad = ~np.array([value in table for value in uniques] + [False])[codes]
+                errors[bad & errors.isna().to_numpy()] = f"Unknown category in column {col}"
+        return errors
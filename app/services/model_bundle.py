@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import numpy as np
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+from app.services.encoding import EncodingTables
+from app.services.predictors import BoosterPredictor, NumpyTreePredictor
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_MAGIC = b"AVPBNDL\0"
+ALIGNMENT = 64
+NUMPY_TREE_ARRAYS = ["left", "right", "feature", "threshold", "default_left", "value", "roots"]
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+# Everything serving needs in one file: the raw booster, the compiled encoding tables, the feature order and
+# training metadata. Layout: magic, header length, JSON header, then 64-byte aligned raw arrays. The arrays are
+# memory-mapped on load, so every worker on the host shares the same page cache copy instead of a private one.
+def save_bundle(path: Path, model, encoding_tables: EncodingTables, metadata: Optional[dict] = None) -> dict:
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    raw = bytes(booster.save_raw(raw_format="ubj"))
+    arrays = {"booster": np.frombuffer(raw, dtype=np.uint8)}
+
+    numpy_model = None
+    try:
+        predictor = NumpyTreePredictor.from_learner(json.loads(bytes(booster.save_raw(raw_format="json")))["learner"])
+    except ValueError as e:
+        logging.info(f"Model bundle without NumPy trees: {e}")
+    else:
+        arrays.update({f"trees/{name}": getattr(predictor, name) for name in NUMPY_TREE_ARRAYS})
+        numpy_model = {"depth": predictor.depth, "base_score": predictor.base_score}
+
+    tables = encoding_tables.to_dict()
+    digest = hashlib.blake2b(raw, digest_size=8)
+    digest.update(json.dumps(tables, sort_keys=True).encode())
+
+    offset = 0
+    layout = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "model_version": digest.hexdigest(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "feature_names": encoding_tables.feature_names,
+        "encoding_tables": tables,
+        "numpy_model": numpy_model,
+        "metadata": metadata or {},
+        "arrays": layout,
+    }
+    encoded_header = json.dumps(header, default=str).encode()
+    data_start = _aligned(len(BUNDLE_MAGIC) + 8 + len(encoded_header))
+
+    # Written next to the target and renamed, a worker never maps a half written bundle
+    path = Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(BUNDLE_MAGIC + struct.pack("<Q", len(encoded_header)) + encoded_header)
+            for name, array in arrays.items():
+                file.seek(data_start + layout[name]["offset"])
+                file.write(array.tobytes())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    logging.info(f"Model bundle {header['model_version']} saved to {path}")
+    return header
+
+class ModelBundle:
+
+    def __init__(self, path: Path, header: dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.header = header
+        self.arrays = arrays
+        self.encoding_tables = EncodingTables.from_dict(header["encoding_tables"])
+
+    @classmethod
+    def load(cls, path: Path) -> "ModelBundle":
+        path = Path(path)
+        with open(path, "rb") as file:
+            magic = file.read(len(BUNDLE_MAGIC))
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"{path} is not a model bundle")
+            (header_length,) = struct.unpack("<Q", file.read(8))
+            header = json.loads(file.read(header_length))
+        if header["format_version"] > BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Model bundle format {header['format_version']} is newer than the supported {BUNDLE_FORMAT_VERSION}")
+
+        data_start = _aligned(len(BUNDLE_MAGIC) + 8 + header_length)
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            start = data_start + spec["offset"]
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        return cls(path, header, arrays)
+
+    @property
+    def model_version(self) -> str:
+        return self.header["model_version"]
+
+    @property
+    def feature_names(self) -> list:
+        return self.header["feature_names"]
+
+    @property
+    def metadata(self) -> dict:
+        return self.header["metadata"]
+
+    def predictor(self, model_format: str = "numpy"):
+        # numpy evaluates the mapped tree arrays in place, the only way the model pages are shared between workers.
+        # xgboost parses a booster into memory of its own whatever it is loaded from, so the booster is only used
+        # when asked for explicitly or when the model has no NumPy trees (e.g. native categorical splits).
+        # A bundle holds no pickle, the default MODEL_FORMAT therefore gets the NumPy trees too.
+        numpy_model = self.header["numpy_model"]
+        if model_format == "numpy" and numpy_model is None:
+            raise ValueError(f"Model bundle {self.path} has no NumPy trees, load it with the booster format")
+        if model_format != "booster" and numpy_model is not None:
+            return NumpyTreePredictor(**{name: self.arrays[f"trees/{name}"] for name in NUMPY_TREE_ARRAYS},
+                                      depth=numpy_model["depth"], base_score=numpy_model["base_score"],
+                                      feature_names=self.feature_names)
+        if model_format != "booster":
+            logging.info(f"Model bundle {self.path} has no NumPy trees, loading its booster")
+        return BoosterPredictor(bytearray(self.arrays["booster"]))
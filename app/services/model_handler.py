@@ -1,56 +1,224 @@
-import pandas as pd
+import numpy as np
 import pickle
 import logging
 import os
+import threading
+import time
 
 from pathlib import Path
 from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional
+from app.core.metrics import observe_model
+from app.services.encoding import EncodingTables, CATEGORICAL_COLS_FOR_ONE_HOT, CATEGORICAL_COLS_FOR_LABEL, load_category_vocabulary
+from app.services.model_bundle import ModelBundle
+from app.services.predictors import load_predictor, model_feature_names, set_predictor_threads
+from app.services.prediction_cache import PredictionCache, artifact_fingerprint
+
+# pandas is only used by the reference encoding and offline scoring, serving never imports it
+if TYPE_CHECKING:
+    import pandas as pd
+
+class ModelState:
+    
+    # Everything a prediction reads, a reload builds a new state and swaps it in with one assignment
+    def __init__(self, version: str, model, encoding_tables: EncodingTables, bundle: Optional[ModelBundle] = None,
+                 one_hot_encoder=None, label_encoder=None, category_vocabulary: Optional[dict] = None):
+        self.version = version
+        self.model = model
+        self.encoding_tables = encoding_tables
+        self.bundle = bundle
+        self.one_hot_encoder = one_hot_encoder
+        self.label_encoder = label_encoder
+        self.category_vocabulary = category_vocabulary
 
 class ModelHandler:
     
-    def __init__(self, model_path: Path, one_hot_encoder_path: Path, label_encoder_path: Path):
+    def __init__(self, model_path: Optional[Path] = None, one_hot_encoder_path: Optional[Path] = None,
+                 label_encoder_path: Optional[Path] = None, model_format: str = "pickle",
+                 cache: Optional[PredictionCache] = None, version_check_interval: Optional[float] = 5.0,
+                 category_vocabulary_path: Optional[Path] = None, bundle_path: Optional[Path] = None,
+                 nthread: Optional[int] = None):
         self.model_path = model_path
+        self.model_format = model_format
         self.one_hot_encoder_path = one_hot_encoder_path
         self.label_encoder_path = label_encoder_path
-        self.model = None
-        self.one_hot_encoder = None
-        self.label_encoder = None
+        # With a vocabulary the model was trained on native categorical features and the sklearn encoders are not used
+        self.category_vocabulary_path = category_vocabulary_path
+        # A model bundle replaces all of the separate artifacts above
+        self.bundle_path = bundle_path
+        self.cache = cache
+        self.version_check_interval = version_check_interval
+        # XGBoost threads per prediction, None keeps the threads the model was saved with
+        self.nthread = nthread
+        self._version_checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
         
-        self.load_model()
-        self.load_label_encoder()
-        self.load_one_hot_encoder()
+        self.state: Optional[ModelState] = None
+        self.load_artifacts()
+    
+    @classmethod
+    def from_settings(cls, settings, **overrides) -> "ModelHandler":
+        return cls(**{
+            "model_path": settings.MODEL_PATH,
+            "one_hot_encoder_path": settings.ONE_HOT_ENCODER_PATH,
+            "label_encoder_path": settings.LABEL_ENCODER_PATH,
+            "model_format": settings.MODEL_FORMAT,
+            "category_vocabulary_path": settings.CATEGORY_VOCABULARY_PATH if settings.ENCODING == "categorical" else None,
+            "bundle_path": settings.MODEL_BUNDLE_PATH,
+            "nthread": settings.model_nthread,
+            **overrides,
+        })
+    
+    @property
+    def categorical(self) -> bool:
+        return self.category_vocabulary_path is not None
+    
+    # Readers that need more than one of these take self.state once instead, a reload may swap it in between
+    @property
+    def model_version(self) -> str:
+        return self.state.version
+    
+    @property
+    def model(self):
+        return self.state.model
+    
+    @property
+    def encoding_tables(self) -> EncodingTables:
+        return self.state.encoding_tables
+    
+    @property
+    def bundle(self) -> Optional[ModelBundle]:
+        return self.state.bundle
+    
+    @property
+    def one_hot_encoder(self):
+        return self.state.one_hot_encoder
+    
+    @property
+    def label_encoder(self):
+        return self.state.label_encoder
+    
+    @property
+    def category_vocabulary(self) -> Optional[dict]:
+        return self.state.category_vocabulary
+    
+    def artifact_paths(self) -> List[Path]:
+        if self.bundle_path is not None:
+            return [self.bundle_path]
+        if self.categorical:
+            return [self.model_path, self.category_vocabulary_path]
+        return [self.model_path, self.one_hot_encoder_path, self.label_encoder_path]
+    
+    def artifact_version(self) -> str:
+        return artifact_fingerprint(self.artifact_paths())
+    
+    def reload_if_changed(self) -> bool:
+        # None leaves reloading to the caller, the serving app swaps whole handlers through the ModelRegistry
+        if self.version_check_interval is None:
+            return False
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return False
+        with self._reload_lock:
+            self._version_checked_at = now
+            try:
+                version = self.artifact_version()
+            except OSError as e:
+                logging.warning(f"Could not check model artifacts, keeping model {self.model_version}: {e}")
+                return False
+            if version == self.model_version:
+                return False
+            logging.info(f"Model artifacts changed, reloading model {self.model_version} -> {version}")
+            self.load_artifacts(version)
+            # Cached predictions of the previous model must never be served again
+            if self.cache is not None:
+                self.cache.clear()
+            return True
     
         
-    def load_model(self) -> None:
+    def load_artifacts(self, version: Optional[str] = None) -> ModelState:
+        if version is None:
+            version = self.artifact_version()
+        if self.bundle_path is not None:
+            state = self.load_bundle(version)
+        elif self.categorical:
+            model = self.load_model()
+            vocabulary = self.load_category_vocabulary()
+            tables = EncodingTables.from_vocabulary(vocabulary, feature_names=model_feature_names(model))
+            state = ModelState(version, model, tables, category_vocabulary=vocabulary)
+        else:
+            model = self.load_model()
+            one_hot_encoder = self.load_one_hot_encoder()
+            label_encoder = self.load_label_encoder()
+            tables = EncodingTables.from_encoders(one_hot_encoder, label_encoder, feature_names=model_feature_names(model))
+            state = ModelState(version, model, tables, one_hot_encoder=one_hot_encoder, label_encoder=label_encoder)
+        self.state = state
+        return state
+    
+    def load_bundle(self, version: str) -> ModelState:
+        logging.info("Loading model bundle...")
+        if not os.path.exists(self.bundle_path):
+            raise FileNotFoundError(f"Model bundle not found: {self.bundle_path}")
+        bundle = ModelBundle.load(self.bundle_path)
+        model = bundle.predictor(self.model_format)
+        if self.nthread is not None:
+            set_predictor_threads(model, self.nthread)
+        logging.info(f"Model bundle {bundle.model_version} loaded successfully")
+        return ModelState(version, model, bundle.encoding_tables, bundle=bundle)
+    
+    def load_model(self):
         logging.info("Loading model...")
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(f"Model file not found: {self.model_path}")
-        with open(self.model_path, 'rb') as file:
-            self.model = pickle.load(file)
+        model = load_predictor(self.model_path, self.model_format)
+        if self.nthread is not None:
+            set_predictor_threads(model, self.nthread)
         logging.info("Model loaded successfully")
+        return model
+    
+    def set_nthread(self, nthread: Optional[int]) -> None:
+        self.nthread = nthread
+        if nthread is not None and self.state is not None:
+            set_predictor_threads(self.state.model, nthread)
     
-    def load_one_hot_encoder(self) -> None:
+    def load_category_vocabulary(self) -> dict:
+        logging.info("Loading category vocabulary...")
+        if not os.path.exists(self.category_vocabulary_path):
+            raise FileNotFoundError(f"Category vocabulary file not found {self.category_vocabulary_path}")
+        vocabulary = load_category_vocabulary(self.category_vocabulary_path)
+        logging.info("Category vocabulary loaded successfully")
+        return vocabulary
+    
+    def load_one_hot_encoder(self):
         logging.info("Loading OneHotEncoder...")
         if not os.path.exists(self.one_hot_encoder_path):
             raise FileNotFoundError(f"OneHotEncoder file not found {self.one_hot_encoder_path}")
         with open(self.one_hot_encoder_path, "rb") as file:
-            self.one_hot_encoder = pickle.load(file)
+            one_hot_encoder = pickle.load(file)
         logging.info("OneHotEncoder loaded successfully")
+        return one_hot_encoder
     
-    def load_label_encoder(self) -> None:
+    def load_label_encoder(self):
         logging.info("Loading LabelEncoder...")
         if not os.path.exists(self.label_encoder_path):
             raise FileNotFoundError(f"LabelEncoder file not found {self.label_encoder_path}")
         with open(self.label_encoder_path, "rb") as file:
-            self.label_encoder = pickle.load(file)
+            label_encoder = pickle.load(file)
         logging.info("LabelEncoder loaded successfully")
+        return label_encoder
     
-    def process_input_data(self, input_data: dict) -> pd.DataFrame:
+    # process_input_data and process_batch_data are the pandas reference implementation of the encoding,
+    # predictions go through the compiled EncodingTables and must stay in parity with them
+    def process_input_data(self, input_data: dict) -> "pd.DataFrame":
+        import pandas as pd
+        
         logging.info("Preprocessing data...")
         df = pd.DataFrame([input_data])
+        if self.categorical:
+            return self.category_encode(df)
         
         # OneHotEncoding
-        categorical_cols_for_one_hot = ["UsedOrNew", "Transmission", "DriveType", "FuelType"] 
+        categorical_cols_for_one_hot = CATEGORICAL_COLS_FOR_ONE_HOT
         one_hot_encoded = self.one_hot_encoder.transform(df[categorical_cols_for_one_hot])
         one_hot_df = pd.DataFrame(one_hot_encoded, columns=self.one_hot_encoder.get_feature_names_out(categorical_cols_for_one_hot))
         df_encoded = pd.concat([df.drop(categorical_cols_for_one_hot, axis=1), one_hot_df], axis=1)
@@ -66,16 +234,100 @@ class ModelHandler:
             df_encoded['BodyType'] = self.label_encoder.transform([self.label_encoder.classes_[0]])
         return df_encoded
     
-    def predict(self, input_data):
-        if self.model is None:
-            self.load_model()
-        if self.one_hot_encoder is None:
-            self.load_one_hot_encoder()
-        if self.label_encoder is None:
-            self.load_label_encoder()
+    def process_batch_data(self, records: List[dict]) -> "pd.DataFrame":
+        import pandas as pd
+        
+        logging.info(f"Preprocessing batch of {len(records)} records...")
+        df = pd.DataFrame.from_records(records)
+        if self.categorical:
+            return self.category_encode(df)
+        
+        # OneHotEncoding of the whole block at once
+        one_hot_encoded = self.one_hot_encoder.transform(df[CATEGORICAL_COLS_FOR_ONE_HOT])
+        one_hot_df = pd.DataFrame(one_hot_encoded, columns=self.one_hot_encoder.get_feature_names_out(CATEGORICAL_COLS_FOR_ONE_HOT))
+        df_encoded = pd.concat([df.drop(CATEGORICAL_COLS_FOR_ONE_HOT, axis=1), one_hot_df], axis=1)
         
-        processed_data = self.process_input_data(input_data)
-        prediction = self.model.predict(processed_data)
+        # LabelEncoding, unknown labels fall back to the first class like in process_input_data
+        for col in CATEGORICAL_COLS_FOR_LABEL:
+            df_encoded[col] = self.label_encode_column(df[col])
+        return df_encoded
+    
+    def category_encode(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        import pandas as pd
+        
+        # Position in the vocabulary, unknown categories become NaN (missing) like in the encoding tables
+        for col, categories in self.category_vocabulary.items():
+            codes = pd.Categorical(df[col], categories=categories).codes.astype(np.float32)
+            df[col] = np.where(codes < 0, np.nan, codes)
+        return df
+    
+    def label_encode_column(self, column: "pd.Series") -> np.ndarray:
+        classes = self.label_encoder.classes_
+        values = column.to_numpy()
+        known = np.isin(values, classes)
+        return self.label_encoder.transform(np.where(known, values, classes[0]))
+    
+    def ensure_loaded(self) -> ModelState:
+        state = self.state
+        if state is None:
+            state = self.load_artifacts()
+        return state
+    
+    def predict(self, input_data):
+        if self.cache is not None:
+            return self.predict_cached([input_data])
+        state = self.ensure_loaded()
+        start = time.perf_counter()
+        features = state.encoding_tables.encode_row(input_data)
+        encoded = time.perf_counter()
+        prediction = state.model.predict(features)
+        observe_model(state.version, encoded - start, time.perf_counter() - encoded, 1)
+        return prediction.tolist()
+    
+    def predict_batch(self, records: List[dict]) -> List[float]:
+        if not records:
+            return []
+        if self.cache is not None:
+            return self.predict_cached(records)
+        state = self.ensure_loaded()
+        # A single predict call over the whole matrix instead of one call per vehicle
+        start = time.perf_counter()
+        features = state.encoding_tables.encode_batch(records)
+        encoded = time.perf_counter()
+        prediction = state.model.predict(features)
+        observe_model(state.version, encoded - start, time.perf_counter() - encoded, len(records))
         return prediction.tolist()
-            
-        
\ No newline at end of file
+    
+    def predict_frame(self, frame: "pd.DataFrame", state: Optional[ModelState] = None) -> np.ndarray:
+        # Offline scoring of whole DataFrames, no cache and no conversion to records
+        if frame.empty:
+            return np.empty(0, dtype=np.float32)
+        if state is None:
+            state = self.ensure_loaded()
+        start = time.perf_counter()
+        features = state.encoding_tables.encode_frame(frame)
+        encoded = time.perf_counter()
+        prediction = state.model.predict(features)
+        observe_model(state.version, encoded - start, time.perf_counter() - encoded, len(frame))
+        return prediction
+    
+    def predict_cached(self, records: List[dict]) -> List[float]:
+        self.reload_if_changed()
+        # The version in the cache keys, the tables and the model all come from this one state
+        state = self.ensure_loaded()
+        records = [self.cache.canonicalize(record) for record in records]
+        keys = [self.cache.key(record, state.version) for record in records]
+        predictions = [self.cache.get(key) for key in keys]
+        
+        # Only the cache misses are encoded and scored, together in one model call
+        missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+        if missing:
+            start = time.perf_counter()
+            features = state.encoding_tables.encode_batch([records[i] for i in missing])
+            encoded = time.perf_counter()
+            scored = state.model.predict(features).tolist()
+            observe_model(state.version, encoded - start, time.perf_counter() - encoded, len(missing))
+            for i, prediction in zip(missing, scored):
+                predictions[i] = prediction
+                self.cache.set(keys[i], prediction)
+        return predictions
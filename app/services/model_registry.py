@@ -0,0 +1,172 @@
+import json
+import logging
+import math
+import threading
+import time
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Optional
+from app.services.model_handler import ModelHandler
+from app.services.prediction_cache import PredictionCache
+
+# Used when no golden set file is configured, the categories exist in every vocabulary the training data produces
+DEFAULT_GOLDEN_RECORDS = [
+    {"Brand": "Toyota", "Year": 2018, "UsedOrNew": "USED", "Transmission": "Automatic", "DriveType": "Front", "FuelType": "Unleaded",
+     "FuelConsumption": 7.5, "Kilometres": 60000, "CylindersinEngine": 4, "BodyType": "SUV", "Doors": 4, "Seats": 5},
+    {"Brand": "Ford", "Year": 2021, "UsedOrNew": "NEW", "Transmission": "Manual", "DriveType": "4WD", "FuelType": "Diesel",
+     "FuelConsumption": 9.0, "Kilometres": 10, "CylindersinEngine": 6, "BodyType": "Ute / Tray", "Doors": 4, "Seats": 5},
+    {"Brand": "Mazda", "Year": 2012, "UsedOrNew": "USED", "Transmission": "Automatic", "DriveType": "Front", "FuelType": "Premium",
+     "FuelConsumption": 6.4, "Kilometres": 180000, "CylindersinEngine": 4, "BodyType": "Hatchback", "Doors": 5, "Seats": 5},
+]
+
+class ModelValidationError(Exception):
+    pass
+
+def load_golden_set(path: Optional[Path]) -> List[dict]:
+    # A JSON list of input records, a record may carry an expected_price the candidate has to reproduce
+    if path is None:
+        return DEFAULT_GOLDEN_RECORDS
+    with open(path, "r") as file:
+        return json.load(file)
+
+# Holds the ModelHandler that serves requests. A reload builds and warms a complete new handler next to the
+# active one, validates it on the golden set and only then replaces the reference in a single assignment.
+# Requests read the reference once and keep scoring with the handler they got, so nothing waits for a reload.
+class ModelRegistry:
+
+    def __init__(self, factory: Callable[[], ModelHandler], golden_records: List[dict] = DEFAULT_GOLDEN_RECORDS,
+                 cache: Optional[PredictionCache] = None, min_price: float = 0.0, max_price: float = 1e7, tolerance: float = 0.05):
+        self.factory = factory
+        self.cache = cache
+        self.golden_records = golden_records
+        self.min_price = min_price
+        self.max_price = max_price
+        self.tolerance = tolerance
+        self._active = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._rejected_version = None
+
+        self.loaded_at = None
+        self.reloads_total = 0
+        self.rejected_total = 0
+        self.last_reload = None
+
+    @property
+    def active(self) -> ModelHandler:
+        return self._active
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._active.model_version if self._active is not None else None
+
+    def attach_cache(self, cache: Optional[PredictionCache]) -> None:
+        self.cache = cache
+        if self._active is not None:
+            self._active.cache = cache
+
+    def load(self) -> ModelHandler:
+        # The first model is validated too, a worker must not start serving a broken artifact
+        self._swap(self._prepare())
+        return self._active
+
+    def _prepare(self) -> ModelHandler:
+        candidate = self.factory()
+        self.validate(candidate)
+        return candidate
+
+    def _swap(self, candidate: ModelHandler) -> None:
+        # The cache is attached only now, the golden set is always scored by the candidate itself
+        candidate.cache = self.cache
+        self._active = candidate
+        self.loaded_at = datetime.now(timezone.utc)
+        # Entries are keyed by model version, dropping the old ones only frees memory
+        if self.cache is not None:
+            self.cache.clear()
+        logging.info(f"Serving model {candidate.model_version}")
+
+    def validate(self, candidate: ModelHandler) -> None:
+        # Scoring the golden set also warms the candidate, per-thread buffers and lazy state are set up before the swap
+        try:
+            predictions = candidate.predict_batch(self.golden_records)
+            candidate.predict(self.golden_records[0])
+        except Exception as e:
+            raise ModelValidationError(f"Model {candidate.model_version} failed to score the golden set: {e}") from e
+        if len(predictions) != len(self.golden_records):
+            raise ModelValidationError(f"Model {candidate.model_version} returned {len(predictions)} predictions for {len(self.golden_records)} records")
+        for record, prediction in zip(self.golden_records, predictions):
+            if not math.isfinite(prediction) or not self.min_price <= prediction <= self.max_price:
+                raise ModelValidationError(f"Model {candidate.model_version} predicted {prediction} outside [{self.min_price}, {self.max_price}]")
+            expected = record.get("expected_price")
+            if expected is not None and abs(prediction - expected) > self.tolerance * abs(expected):
+                raise ModelValidationError(f"Model {candidate.model_version} predicted {prediction}, expected {expected} +/- {self.tolerance:.0%}")
+
+    def reload(self) -> dict:
+        if not self._reload_lock.acquire(blocking=False):
+            return {"status": "in_progress", "model_version": self.model_version}
+        start = time.perf_counter()
+        try:
+            previous = self.model_version
+            try:
+                candidate = self._prepare()
+            except Exception as e:
+                self.rejected_total += 1
+                logging.error(f"Model reload rejected, keeping model {previous}: {e}")
+                result = {"status": "rejected", "model_version": previous, "error": str(e)}
+            else:
+                if candidate.model_version == previous:
+                    result = {"status": "unchanged", "model_version": previous}
+                else:
+                    self._swap(candidate)
+                    self.reloads_total += 1
+                    result = {"status": "reloaded", "model_version": candidate.model_version, "previous_version": previous}
+            result["seconds"] = time.perf_counter() - start
+            result["finished_at"] = datetime.now(timezone.utc).isoformat()
+            self.last_reload = result
+            return result
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self) -> bool:
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, name="model-reload", daemon=True).start()
+        return True
+
+    def start_watcher(self, interval: float) -> "ModelRegistry":
+        if self._watcher is None and interval > 0:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name="model-watcher", daemon=True)
+            self._watcher.start()
+            logging.info(f"Watching model artifacts every {interval}s")
+        return self
+
+    def stop_watcher(self) -> None:
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                version = self._active.artifact_version()
+            except OSError:
+                # Usually a deploy that is still copying files, checked again on the next tick
+                continue
+            # A rejected artifact is not retried until it changes again
+            if version != self._active.model_version and version != self._rejected_version:
+                result = self.reload()
+                self._rejected_version = version if result["status"] == "rejected" else None
+
+    def status(self) -> dict:
+        return {
+            "model_version": self.model_version,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "reloads_total": self.reloads_total,
+            "rejected_total": self.rejected_total,
+            "reloading": self._reload_lock.locked(),
+            "last_reload": self.last_reload,
+        }
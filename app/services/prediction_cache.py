@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+# Bounded in-process LRU with a TTL per entry
+class InMemoryCacheBackend:
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Shared file-backed store, every worker process on the host can open the same file.
+# Every prune_every writes expired rows are deleted and the oldest rows beyond maxsize are evicted,
+# so the file stays bounded under a steady stream of unique keys.
+class FileCacheBackend:
+
+    def __init__(self, path: Path, ttl: float = 3600, maxsize: int = 100_000, prune_every: int = 1000):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.prune_every = prune_every
+        self.evictions = 0
+        self._writes = 0
+        os.makedirs(self.path.parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value REAL, expires_at REAL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_predictions_expires_at ON predictions (expires_at)")
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM predictions WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        # All entries share one TTL, the earliest expiry is the oldest write
+        deleted = self._connection.execute("DELETE FROM predictions WHERE expires_at < ?", (time.time(),)).rowcount
+        deleted += self._connection.execute(
+            "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,)
+        ).rowcount
+        self.evictions += deleted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM predictions")
+
+# Shared store on Redis, needs the optional redis package
+class RedisCacheBackend:
+
+    def __init__(self, url: str, ttl: float = 3600, prefix: str = "prediction:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("RedisCacheBackend requires the redis package, install it with `pip install redis`") from e
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[float]:
+        value = self.client.get(self.prefix + key)
+        return float(value) if value is not None else None
+
+    def set(self, key: str, value: float) -> None:
+        self.client.set(self.prefix + key, value, ex=int(self.ttl))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+class PredictionCache:
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600, kilometres_bucket: int = 0, shared_backend=None):
+        self.local = InMemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+        self.shared = shared_backend
+        self.kilometres_bucket = kilometres_bucket
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        # Counters are updated from the request threads, += is not atomic
+        self._stats_lock = threading.Lock()
+
+    def canonicalize(self, input_data: dict) -> dict:
+        # Kilometres are rounded down to the bucket before scoring, so every vehicle in a bucket gets the same price
+        record = dict(input_data)
+        if self.kilometres_bucket > 0:
+            record["Kilometres"] = record["Kilometres"] // self.kilometres_bucket * self.kilometres_bucket
+        return record
+
+    def key(self, record: dict, model_version: str) -> str:
+        payload = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(f"{model_version}|{payload}".encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[float]:
+        value = self.local.get(key)
+        if value is not None:
+            with self._stats_lock:
+                self.hits += 1
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                with self._stats_lock:
+                    self.shared_hits += 1
+                self.local.set(key, value)
+                return value
+        with self._stats_lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: float) -> None:
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def clear(self) -> None:
+        # Shared entries are keyed by model version, so only the local copy has to go
+        self.local.clear()
+        logging.info("Prediction cache cleared")
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+        }
+
+def artifact_fingerprint(paths: Iterable[Path]) -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
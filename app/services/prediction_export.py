@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+import zlib
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator, List
+from app.services.prediction_history import history_query
+
+CHUNK_SIZE = 64 * 1024
+
+def iter_history_rows(session_factory: Callable, owner_id: int, columns: List[str], yield_per: int = 1000, **filters) -> Iterator:
+    # The session belongs to the stream, it is closed once the last row has been sent or the client went away
+    session = session_factory()
+    try:
+        query = history_query(session, owner_id, columns, **filters).execution_options(stream_results=True)
+        for row in query.yield_per(yield_per):
+            yield row
+    finally:
+        session.close()
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def ndjson_chunks(rows: Iterable, columns: List[str]) -> Iterator[bytes]:
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps({column: _json_value(value) for column, value in zip(columns, row)}) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+def csv_chunks(rows: Iterable, columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_json_value(value) for value in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,48 @@
+import base64
+import json
+
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.models.prediction import Prediction
+
+HISTORY_COLUMNS = [column.name for column in Prediction.__table__.columns]
+# Always returned, prediction_id makes up the keyset cursor and created_at dates every row
+CURSOR_COLUMNS = ["prediction_id", "created_at"]
+
+# Pages are keyed on prediction_id alone. created_at is not stored canonically everywhere: SQLite keeps the
+# func.now() default as 'YYYY-MM-DD HH:MM:SS' but binds datetimes with microseconds, so a created_at cursor
+# compares as a string against a different format and can return the same page again.
+def encode_cursor(prediction_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([prediction_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        prediction_id, = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(prediction_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor {cursor}") from e
+
+def select_columns(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return HISTORY_COLUMNS
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in HISTORY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}, available fields are {HISTORY_COLUMNS}")
+    return [column for column in HISTORY_COLUMNS if column in requested or column in CURSOR_COLUMNS]
+
+# Newest first, ids are assigned in insertion order, the (owner_id, prediction_id) index serves every page
+def history_query(db: Session, owner_id: int, columns: List[str], brand: Optional[str] = None,
+                  created_from: Optional[datetime] = None, created_to: Optional[datetime] = None,
+                  cursor: Optional[str] = None):
+    query = db.query(*[getattr(Prediction, column) for column in columns]).filter(Prediction.owner_id == owner_id)
+    if brand is not None:
+        query = query.filter(Prediction.brand == brand)
+    if created_from is not None:
+        query = query.filter(Prediction.created_at >= created_from)
+    if created_to is not None:
+        query = query.filter(Prediction.created_at < created_to)
+    if cursor is not None:
+        query = query.filter(Prediction.prediction_id < decode_cursor(cursor))
+    return query.order_by(Prediction.prediction_id.desc())
@@ -0,0 +1,130 @@
+import logging
+import queue
+import threading
+import time
+
+from typing import Callable, List
+from sqlalchemy import insert
+
+_STOP = object()
+
+# Background writer that drains an in-memory queue of prediction rows and bulk-inserts them in batches.
+# The queue is bounded: when it is full submit blocks up to put_timeout and then reports False,
+# so the caller can fall back to writing the row itself.
+class PredictionWriter:
+
+    def __init__(self, session_factory: Callable, model, max_queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.2, put_timeout: float = 0.1, max_retries: int = 3):
+        self.session_factory = session_factory
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._worker = None
+        self._accepting = False
+        # Submits past the accepting check that have not finished their put yet, stop waits for them before
+        # queueing _STOP so no row can land behind it and be lost
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+        self.written_total = 0
+        self.batches_total = 0
+        self.rejected_total = 0
+        self.failed_total = 0
+
+    def start(self) -> "PredictionWriter":
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+            self._worker.start()
+            with self._condition:
+                self._accepting = True
+            logging.info(f"Prediction writer started (batch_size={self.batch_size}, queue_size={self._queue.maxsize})")
+        return self
+
+    def stop(self) -> None:
+        # Everything queued before stop is flushed before the worker exits
+        if self._worker is None:
+            return
+        with self._condition:
+            self._accepting = False
+            self._condition.wait_for(lambda: self._in_flight == 0)
+        self._queue.put(_STOP)
+        self._worker.join()
+        self._worker = None
+        logging.info(f"Prediction writer stopped, {self.written_total} rows written")
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, row: dict) -> bool:
+        with self._condition:
+            if not self._accepting:
+                return False
+            self._in_flight += 1
+        accepted = True
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            accepted = False
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self.rejected_total += not accepted
+                self._condition.notify_all()
+        return accepted
+
+    def _next_batch(self) -> tuple:
+        rows = []
+        stop = False
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return rows, stop
+        while True:
+            if item is _STOP:
+                stop = True
+            else:
+                rows.append(item)
+            if stop or len(rows) >= self.batch_size:
+                break
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return rows, stop
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            rows, stop = self._next_batch()
+            if rows:
+                self._write(rows)
+
+    def _write(self, rows: List[dict]) -> None:
+        for attempt in range(1, self.max_retries + 1):
+            session = self.session_factory()
+            try:
+                session.execute(insert(self.model), rows)
+                session.commit()
+                self.written_total += len(rows)
+                self.batches_total += 1
+                return
+            except Exception:
+                session.rollback()
+                logging.exception(f"Writing {len(rows)} predictions failed (attempt {attempt}/{self.max_retries})")
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+            finally:
+                session.close()
+        self.failed_total += len(rows)
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "written_total": self.written_total,
+            "batches_total": self.batches_total,
+            "rejected_total": self.rejected_total,
+            "failed_total": self.failed_total,
+        }
@@ -0,0 +1,145 @@
+import json
+import logging
+import pickle
+import numpy as np
+
+from pathlib import Path
+from typing import List, Optional, Union
+
+MODEL_FORMATS = ["pickle", "booster", "numpy"]
+IDENTITY_OBJECTIVES = ["reg:squarederror", "reg:squaredlogerror", "reg:absoluteerror", "reg:pseudohubererror"]
+
+# Native XGBoost model loaded with xgboost.Booster, no sklearn wrapper in the serving path
+class BoosterPredictor:
+
+    def __init__(self, model_path: Union[Path, bytearray]):
+        import xgboost
+
+        # A bytearray holds a raw model, e.g. the booster section of a model bundle
+        self.booster = xgboost.Booster(model_file=model_path if isinstance(model_path, bytearray) else str(model_path))
+        self.feature_names = self.booster.feature_names
+        best_iteration = self.booster.attr("best_iteration")
+        # Models trained with early stopping keep every tree, predict only with the best ones like XGBRegressor does
+        self.iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.booster.inplace_predict(features, iteration_range=self.iteration_range, validate_features=False)
+
+# Pure NumPy evaluator of an XGBoost tree ensemble saved in the JSON format, for containers without xgboost.
+# All trees are packed into flat node arrays and every row walks every tree at once, one level per step.
+class NumpyTreePredictor:
+
+    def __init__(self, left: np.ndarray, right: np.ndarray, feature: np.ndarray, threshold: np.ndarray,
+                 default_left: np.ndarray, value: np.ndarray, roots: np.ndarray, depth: int,
+                 base_score: float, feature_names: Optional[List[str]] = None):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.base_score = base_score
+        self.feature_names = feature_names
+
+    @classmethod
+    def from_json(cls, model_path: Path) -> "NumpyTreePredictor":
+        with open(model_path, "r") as file:
+            return cls.from_learner(json.load(file)["learner"])
+
+    @classmethod
+    def from_learner(cls, learner: dict) -> "NumpyTreePredictor":
+        objective = learner["objective"]["name"]
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Objective {objective} is not supported by the NumPy evaluator")
+        model_param = learner["learner_model_param"]
+        if int(model_param.get("num_target", 1)) > 1 or int(model_param.get("num_class", 0)) > 0:
+            raise ValueError("Only single target regression models are supported by the NumPy evaluator")
+
+        trees = learner["gradient_booster"]["model"]["trees"]
+        best_iteration = learner.get("attributes", {}).get("best_iteration")
+        if best_iteration is not None:
+            indptr = learner["gradient_booster"]["model"]["iteration_indptr"]
+            trees = trees[:indptr[int(best_iteration) + 1]]
+
+        left, right, feature, threshold, default_left, value, roots = [], [], [], [], [], [], []
+        depth = 0
+        offset = 0
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported by the NumPy evaluator")
+            tree_left = np.asarray(tree["left_children"], dtype=np.int64)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int64)
+            is_leaf = tree_left == -1
+            node_ids = np.arange(len(tree_left))
+            # Leaves point at themselves so rows that reached a leaf stay there for the remaining steps
+            left.append(np.where(is_leaf, node_ids, tree_left) + offset)
+            right.append(np.where(is_leaf, node_ids, tree_right) + offset)
+            feature.append(np.where(is_leaf, 0, tree["split_indices"]))
+            threshold.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            # For leaves split_conditions holds the leaf value
+            value.append(np.where(is_leaf, np.asarray(tree["split_conditions"], dtype=np.float32), 0).astype(np.float32))
+            roots.append(offset)
+            depth = max(depth, cls._tree_depth(tree_left, tree_right))
+            offset += len(tree_left)
+
+        return cls(
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold),
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value),
+            roots=np.asarray(roots, dtype=np.int32),
+            depth=depth,
+            base_score=float(model_param["base_score"]),
+            feature_names=learner.get("feature_names") or None,
+        )
+
+    @staticmethod
+    def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+        depth = 0
+        level = [0]
+        while True:
+            level = [child for node in level for child in (left[node], right[node]) if child != -1]
+            if not level:
+                return depth
+            depth += 1
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features[None, :]
+        rows = np.arange(features.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (features.shape[0], len(self.roots)))
+        for _ in range(self.depth):
+            values = features[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(values), self.default_left[nodes], values < self.threshold[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].sum(axis=1) + np.float32(self.base_score)
+
+def load_predictor(model_path: Path, model_format: str = "pickle"):
+    logging.info(f"Loading {model_format} model from {model_path}")
+    if model_format == "pickle":
+        with open(model_path, "rb") as file:
+            return pickle.load(file)
+    if model_format == "booster":
+        return BoosterPredictor(model_path)
+    if model_format == "numpy":
+        return NumpyTreePredictor.from_json(model_path)
+    raise ValueError(f"Unknown model format {model_format}, expected one of {MODEL_FORMATS}")
+
+def set_predictor_threads(model, nthread: int) -> None:
+    # The NumPy evaluator is single threaded, the xgboost models predict with nthread OpenMP threads
+    if isinstance(model, NumpyTreePredictor):
+        return
+    booster = model.booster if isinstance(model, BoosterPredictor) else model.get_booster()
+    booster.set_param({"nthread": nthread})
+
+def model_feature_names(model) -> Optional[List[str]]:
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is None:
+        feature_names = getattr(model, "feature_names", None)
+    return list(feature_names) if feature_names is not None else None
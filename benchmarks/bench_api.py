@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import httpx
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from app.core.resources import available_cores
+from benchmarks.bench_login_storm import free_port
+from benchmarks.bench_prefork_workers import start_server
+from scripts.dummy_artifacts import build_dummy_artifacts, artifact_environment, make_vehicles
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BASELINE_PATH = ROOT_DIR / "benchmarks" / "baselines" / "bench_api.json"
+SCENARIOS = ["login", "predict", "batch", "history"]
+CREDENTIALS = {"username": "bench@example.com", "password": "bench-password"}
+
+# Load test of the API end to end, in-process through the ASGI TestClient or over HTTP against a local uvicorn.
+# Both run on dummy model artifacts and a fresh SQLite database. Scenarios run in order, history then lists
+# the rows written by predict and batch.
+
+def scenario_request(scenario: str, i: int, records: list, batch_size: int) -> tuple:
+    if scenario == "login":
+        return "POST", "/login", {"data": CREDENTIALS}, 200
+    if scenario == "predict":
+        return "POST", "/predict/", {"json": records[i % len(records)]}, 201
+    if scenario == "batch":
+        start = (i * batch_size) % len(records)
+        return "POST", "/predict/batch", {"json": {"items": (records * 2)[start:start + batch_size]}}, 201
+    return "GET", "/predict/", {"params": {"limit": 100}}, 200
+
+def drive(session: httpx.Client, scenario: str, records: list, requests: int, warmup: int, batch_size: int) -> dict:
+    timings, errors = [], 0
+    for i in range(warmup + requests):
+        method, url, kwargs, expected = scenario_request(scenario, i, records, batch_size)
+        start = time.perf_counter()
+        response = session.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            timings.append(elapsed)
+            errors += response.status_code != expected
+    return {"timings": timings, "errors": errors}
+
+# One client process of the uvicorn mode
+def remote_client(base_url: str, headers: dict, scenario: str, records: list, requests: int, warmup: int, batch_size: int) -> dict:
+    with httpx.Client(base_url=base_url, headers=headers, timeout=60) as session:
+        return drive(session, scenario, records, requests, warmup, batch_size)
+
+def summarize(results: list, seconds: float) -> dict:
+    timings = np.concatenate([np.array(result["timings"]) for result in results]) * 1000
+    return {
+        "requests": len(timings),
+        "errors": sum(result["errors"] for result in results),
+        "requests_per_second": len(timings) / seconds,
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+    }
+
+def authenticate(session: httpx.Client) -> dict:
+    session.post("/users/", json={"email": CREDENTIALS["username"], "password": CREDENTIALS["password"]})
+    response = session.post("/login", data=CREDENTIALS)
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def run_inprocess(records: list, args) -> dict:
+    # Settings are read on import, the environment is prepared by the caller
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database.migrate import migrate
+
+    migrate()
+    results = {}
+    with TestClient(app) as session:
+        session.headers.update(authenticate(session))
+        for scenario in args.scenarios:
+            start = time.perf_counter()
+            result = drive(session, scenario, records, args.requests, args.warmup, args.batch_size)
+            results[scenario] = summarize([result], time.perf_counter() - start)
+    return results
+
+def run_uvicorn(records: list, env: dict, args) -> dict:
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    process, base_url, _ = start_server(command, env, port)
+    results = {}
+    try:
+        with httpx.Client(base_url=base_url, timeout=60) as session:
+            headers = authenticate(session)
+        # Client processes, each sends its share of the requests back to back
+        with ProcessPoolExecutor(args.clients) as pool:
+            for scenario in args.scenarios:
+                requests = -(-args.requests // args.clients)
+                start = time.perf_counter()
+                client_results = list(pool.map(remote_client, *zip(*[(base_url, headers, scenario, records, requests,
+                                                                       args.warmup, args.batch_size)] * args.clients)))
+                results[scenario] = summarize(client_results, time.perf_counter() - start)
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+# Latencies of runs with other settings are not comparable, e.g. bcrypt rounds double the login time per round
+def settings_mismatch(report: dict, baseline: dict) -> list:
+    recorded = {"mode": baseline.get("mode"), **baseline.get("settings", {})}
+    current = {"mode": report["mode"], **report["settings"]}
+    return [f"{name}={current[name]} (baseline {recorded.get(name)})" for name in current if current[name] != recorded.get(name)]
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    failures = []
+    for scenario, expected in baseline["scenarios"].items():
+        if scenario not in results:
+            continue
+        actual = results[scenario]
+        if actual["errors"]:
+            failures.append(f"{scenario}: {actual['errors']} failed requests")
+        if actual["p99_ms"] > expected["p99_ms"] * (1 + tolerance):
+            failures.append(f"{scenario}: p99 {actual['p99_ms']:.2f} ms > baseline {expected['p99_ms']:.2f} ms + {tolerance:.0%}")
+        if actual["requests_per_second"] < expected["requests_per_second"] * (1 - tolerance):
+            failures.append(f"{scenario}: {actual['requests_per_second']:.1f} req/s < baseline "
+                            f"{expected['requests_per_second']:.1f} req/s - {tolerance:.0%}")
+    return failures
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Throughput and p50/p95/p99 latency of login, predict, batch predict and history")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=300, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario (per client)")
+    parser.add_argument("--clients", type=int, default=1, help="Client processes in uvicorn mode")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--output", type=Path, default=None, help="Also write the results to this file")
+    parser.add_argument("--baseline", type=Path, default=None, help=f"Fail on a regression against this file, e.g. {BASELINE_PATH.relative_to(ROOT_DIR)}")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed p99 increase and throughput drop relative to the baseline")
+    parser.add_argument("--write-baseline", action="store_true", help=f"Save the results as the new {BASELINE_PATH.relative_to(ROOT_DIR)}")
+    args = parser.parse_args()
+
+    settings = {"requests": args.requests, "warmup": args.warmup, "clients": args.clients if args.mode == "uvicorn" else 1,
+                "batch_size": args.batch_size, "bcrypt_rounds": args.bcrypt_rounds}
+    baseline = None
+    if args.baseline is not None:
+        # Checked before the run, a comparison against other settings would be meaningless
+        baseline = json.loads(args.baseline.read_text())
+        mismatch = settings_mismatch({"mode": args.mode, "settings": settings}, baseline)
+        if mismatch:
+            parser.error(f"{args.baseline} was recorded with other settings, rerun with the baseline settings or "
+                         f"record a new baseline with --write-baseline: {', '.join(mismatch)}")
+
+    records = make_vehicles(200, seed=7).astype(object).to_dict(orient="records")
+    with tempfile.TemporaryDirectory() as folder:
+        env = {**artifact_environment(build_dummy_artifacts(Path(folder))), "DATABASE_URL": f"sqlite:///{Path(folder) / 'bench.sqlite'}",
+               "SECRET_KEY": "bench", "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+               "BCRYPT_ROUNDS": str(args.bcrypt_rounds), "MODEL_CHECK_INTERVAL_SECONDS": "0"}
+        if args.mode == "inprocess":
+            os.environ.update(env)
+            scenarios = run_inprocess(records, args)
+        else:
+            scenarios = run_uvicorn(records, {**os.environ, **env}, args)
+
+    report = {
+        "mode": args.mode,
+        "machine": {"cores": available_cores(), "python": platform.python_version()},
+        "settings": settings,
+        "scenarios": scenarios,
+    }
+    failures = []
+    if baseline is not None:
+        failures = regressions(scenarios, baseline, args.tolerance)
+        report["baseline"] = {"path": str(args.baseline), "tolerance": args.tolerance, "regressions": failures}
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output is not None:
+        args.output.write_text(text + "\n")
+    if args.write_baseline:
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps({key: report[key] for key in ["mode", "machine", "settings", "scenarios"]}, indent=2) + "\n")
+    sys.exit(1 if failures else 0)
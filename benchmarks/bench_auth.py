@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# Set DATABASE_URL to benchmark against Postgres, a temporary SQLite file is used otherwise
+for name, value in {"DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite", "SECRET_KEY": "bench",
+                    "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30"}.items():
+    os.environ.setdefault(name, value)
+
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.database.database import db
+from app.models import User, Prediction
+from app.auth import oauth2
+from app.auth.cache import TokenCache
+
+def setup_user() -> tuple:
+    from app.main import app
+    from app.database.migrate import migrate
+    
+    migrate()
+    session = db.get_session()
+    user = User(email=f"bench-{time.time()}@example.com", password=f"bench-{time.time()}")
+    session.add(user)
+    session.commit()
+    session.add(Prediction(brand="Toyota", production_year=2020, used_or_new="USED", transmission="Automatic",
+                           drive_type="AWD", fuel_type="Unleaded", fuel_consumption=8.5, kilometres=45000,
+                           cylinder_in_engine=4, body_type="SUV", doors=4, seats=5, prediction_price=25000.0,
+                           owner_id=user.id))
+    session.commit()
+    session.close()
+    token = oauth2.create_access_token(data={"user_id": user.id, "email": user.email})
+    return TestClient(app), {"Authorization": f"Bearer {token}"}
+
+def dependency_throughput(token: str, requests: int) -> float:
+    session = db.get_session()
+    start = time.perf_counter()
+    for _ in range(requests):
+        oauth2.get_current_user(token, session)
+    session.close()
+    return requests / (time.perf_counter() - start)
+
+def request_throughput(client: TestClient, headers: dict, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get("/predict/", headers=headers, params={"limit": 1, "fields": "prediction_price"})
+        assert response.status_code == 200, response.text
+    return requests / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Authenticated request throughput with and without the token cache")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    
+    client, headers = setup_user()
+    token = headers["Authorization"].split(" ", 1)[1]
+    modes = {
+        "no_cache": (None, False),
+        "token_cache": (TokenCache(settings.auth_cache_size, settings.auth_cache_ttl_seconds), False),
+        "trusted_claims": (None, True),
+    }
+    results = {}
+    for mode, (cache, trust_claims) in modes.items():
+        oauth2.token_cache = cache
+        settings.auth_trust_token_claims = trust_claims
+        results[mode] = {
+            "get_current_user_per_s": dependency_throughput(token, args.requests),
+            "requests_per_s": request_throughput(client, headers, args.requests // 4),
+        }
+    print(json.dumps(results, indent=2))
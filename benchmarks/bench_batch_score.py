@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import psutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pathlib import Path
+from app.core.resources import available_cores
+from app.services.encoding import INPUT_COLS
+from app.services.model_handler import ModelHandler
+from benchmarks.bench_worker_cold_start import build_artifacts
+from scripts.dummy_artifacts import artifact_environment, make_vehicles
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+def write_inputs(folder: Path, rows: int, piece: int = 500_000) -> dict:
+    # Written piece by piece, the input files can be larger than the memory of the benchmark
+    csv_path, parquet_path = folder / f"vehicles_{rows}.csv", folder / f"vehicles_{rows}.parquet"
+    writer = None
+    for i, start in enumerate(range(0, rows, piece)):
+        frame = make_vehicles(min(piece, rows - start), seed=i)
+        frame.to_csv(csv_path, mode="a", header=i == 0, index=False)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        writer = writer or pq.ParquetWriter(parquet_path, table.schema)
+        writer.write_table(table)
+    writer.close()
+    return {"csv": csv_path, "parquet": parquet_path}
+
+def encoding_rows_per_second(paths: dict, rows: int) -> dict:
+    model_handler = ModelHandler(**paths, version_check_interval=None)
+    frame = make_vehicles(rows, seed=99)
+    start = time.perf_counter()
+    model_handler.encoding_tables.encode_batch(frame.to_dict(orient="records"))
+    records_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    model_handler.encoding_tables.encode_frame(frame[INPUT_COLS])
+    frame_seconds = time.perf_counter() - start
+    return {"records_rows_per_second": rows / records_seconds, "frame_rows_per_second": rows / frame_seconds,
+            "speedup": records_seconds / frame_seconds}
+
+def run(input_path: Path, output_dir: Path, env: dict, workers: int, args) -> dict:
+    shutil.rmtree(output_dir, ignore_errors=True)
+    command = [sys.executable, "-m", "app.services.batch_score", str(input_path), str(output_dir), "--chunksize",
+               str(args.chunksize), "--workers", str(workers), "--no-progress", "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=subprocess.PIPE)
+    # Peak RSS of the whole process tree, the pool workers included
+    root, peak = psutil.Process(process.pid), 0
+    while process.poll() is None:
+        try:
+            peak = max(peak, sum(p.memory_info().rss for p in [root, *root.children(recursive=True)]))
+        except psutil.NoSuchProcess:
+            pass
+        time.sleep(0.05)
+    assert process.returncode == 0, f"{command} failed"
+    summary = json.loads(process.stdout.read())
+    shutil.rmtree(output_dir)
+    return {"rows_per_second": summary["rows_per_second"], "seconds": summary["seconds"], "peak_rss_mb": peak / 2 ** 20}
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Offline batch scoring throughput and peak memory by file format, size and workers")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Pool sizes to run, 0 and the available cores by default")
+    parser.add_argument("--n-estimators", type=int, default=300)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+
+    workers = args.workers or sorted({0, available_cores()})
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        paths = build_artifacts(folder, 50_000, args.n_estimators, args.max_depth)["pickle"]
+        env = {**os.environ, **artifact_environment(paths), "SECRET_KEY": "bench", "ALGORITHM": "HS256",
+               "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "DATABASE_URL": "sqlite://"}
+        results["encoding"] = encoding_rows_per_second(paths, args.chunksize)
+        # The same chunks of a file four times smaller, a bounded pipeline peaks at the same memory
+        small = write_inputs(folder, args.rows // 4)
+        full = write_inputs(folder, args.rows)
+        for input_format in ["csv", "parquet"]:
+            for n in workers:
+                results[f"{input_format}_workers_{n}"] = run(full[input_format], folder / "scored", env, n, args)
+            results[f"{input_format}_workers_0_quarter_rows"] = run(small[input_format], folder / "scored", env, 0, args)
+
+    print(json.dumps({"rows": args.rows, "chunksize": args.chunksize, "cores": available_cores(), **results}, indent=2))
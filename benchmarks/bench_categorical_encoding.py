@@ -0,0 +1,90 @@
+import argparse
+import json
+import time
+import numpy as np
+
+from sklearn.metrics import root_mean_squared_error
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+from app.services.encoding import EncodingTables
+from scripts.dummy_artifacts import make_vehicles, make_prices, ONE_HOT_COLS, LABEL_COLS
+from scripts.train import Encoder
+
+# Category effects on top of the year/kilometres price, so the encodings have something to learn
+BRAND_PREMIUM = {"Toyota": 2000, "Ford": 0, "Mazda": 1000, "BMW": 15000, "Kia": -3000}
+BODY_PREMIUM = {"SUV": 5000, "Sedan": 0, "Hatchback": -2000, "Wagon": 1000, "Ute / Tray": 4000}
+FUEL_PREMIUM = {"Diesel": 2000, "Hybrid": 6000, "LPG": -4000, "Premium": 3000, "Unleaded": 0}
+
+def make_listings(n: int, seed: int = 1234) -> tuple:
+    vehicles = make_vehicles(n, seed)
+    y = make_prices(vehicles) + vehicles["Brand"].map(BRAND_PREMIUM) + vehicles["BodyType"].map(BODY_PREMIUM) \
+        + vehicles["FuelType"].map(FUEL_PREMIUM) + np.random.default_rng(seed + 1).normal(0, 1000, n)
+    return vehicles, y
+
+def encode(vehicles, encoding: str) -> tuple:
+    encoder = Encoder(vehicles.copy())
+    if encoding == "categorical":
+        X = encoder.categorical_encode(LABEL_COLS + ONE_HOT_COLS, save_model=False).get_dataframe()
+        return X, lambda feature_names: EncodingTables.from_vocabulary(encoder.vocabulary, feature_names)
+    X = encoder.one_hot_encode(ONE_HOT_COLS, save_model=False).label_encode(LABEL_COLS, save_model=False).get_dataframe()
+    return X, lambda feature_names: EncodingTables.from_encoders(encoder.one_hot_encoder, encoder.label_encoder, feature_names)
+
+def run(encoding: str, train_vehicles, y_train, test_records: list, y_test, unseen_records: list, y_unseen, args) -> dict:
+    X_train, compile_tables = encode(train_vehicles, encoding)
+    model = XGBRegressor(n_estimators=args.n_estimators, max_depth=args.max_depth, learning_rate=0.1, tree_method="hist",
+                         enable_categorical=encoding == "categorical", random_state=1234)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    # Scored the way the API does it: records compiled by the encoding tables into float32 rows for the booster
+    tables = compile_tables(list(model.feature_names_in_))
+    booster = model.get_booster()
+    predict = lambda features: booster.inplace_predict(features, validate_features=False)
+
+    timings = []
+    for record in test_records[:args.requests]:
+        start = time.perf_counter()
+        predict(tables.encode_row(record))
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+
+    batch = test_records[:args.batch_size]
+    batch_timings = []
+    for _ in range(args.batch_repeats):
+        start = time.perf_counter()
+        predict(tables.encode_batch(batch))
+        batch_timings.append(time.perf_counter() - start)
+    batch_seconds = float(np.median(batch_timings))
+
+    return {
+        "n_features": tables.n_features,
+        "train_seconds": train_seconds,
+        "test_rmse": float(root_mean_squared_error(y_test, predict(tables.encode_batch(test_records)))),
+        "unseen_brand_rmse": float(root_mean_squared_error(y_unseen, predict(tables.encode_batch(unseen_records)))),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "batch_rows_per_second": len(batch) / batch_seconds,
+    }
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Training time, accuracy and serving latency of OneHot + LabelEncoder vs native categories")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--n-estimators", type=int, default=300)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--requests", type=int, default=2000, help="Single-row predictions timed for the latency percentiles")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--batch-repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    vehicles, y = make_listings(args.rows)
+    train_vehicles, test_vehicles, y_train, y_test = train_test_split(vehicles, y, test_size=0.2, random_state=1234)
+    test_records = test_vehicles.to_dict(orient="records")
+    # A brand that never appears in training, it should fall back to an average vehicle instead of another brand
+    unseen_records = [dict(record, Brand="Tesla") for record in test_records[:args.batch_size]]
+    y_unseen = y_test.iloc[:args.batch_size] - test_vehicles["Brand"].iloc[:args.batch_size].map(BRAND_PREMIUM)
+
+    results = {encoding: run(encoding, train_vehicles, y_train, test_records, y_test, unseen_records, y_unseen, args)
+               for encoding in ["onehot_label", "categorical"]}
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+
+from pathlib import Path
+from benchmarks.bench_worker_cold_start import build_artifacts
+from app.services.model_handler import ModelHandler
+from app.services.model_registry import ModelRegistry
+from app.services.prediction_cache import PredictionCache
+from scripts.dummy_artifacts import make_vehicles
+
+def redeploy(path: Path) -> None:
+    # Same content with a new modification time, enough for a new model version
+    os.utime(path, ns=(0, time.time_ns()))
+
+def serve(predict, records: list, threads: int, reload, reloads: int, interval: float) -> dict:
+    timings = [[] for _ in range(threads)]
+    stop = threading.Event()
+
+    def client(timing: list, offset: int) -> None:
+        i = offset
+        while not stop.is_set():
+            start = time.perf_counter()
+            predict(records[i % len(records)])
+            timing.append(time.perf_counter() - start)
+            i += 1
+
+    workers = [threading.Thread(target=client, args=(timing, i * 7919)) for i, timing in enumerate(timings)]
+    for worker in workers:
+        worker.start()
+    start = time.perf_counter()
+    time.sleep(interval)
+    for _ in range(reloads):
+        reload()
+        time.sleep(interval)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.concatenate([np.array(timing) for timing in timings]) * 1000
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+    }
+
+def in_request(paths: dict, records: list, args) -> dict:
+    # The previous behaviour, the request that notices the new artifact reloads it while the others wait on the lock
+    model_handler = ModelHandler(**paths, cache=PredictionCache(maxsize=1), version_check_interval=0)
+    model_handler.predict(records[0])
+    return serve(model_handler.predict, records, args.threads, lambda: redeploy(paths["model_path"]), args.reloads, args.interval)
+
+def registry(paths: dict, records: list, args) -> dict:
+    model_registry = ModelRegistry(lambda: ModelHandler(**paths, version_check_interval=None), cache=PredictionCache(maxsize=1))
+    model_registry.load()
+
+    def reload():
+        redeploy(paths["model_path"])
+        model_registry.reload_in_background()
+
+    result = serve(lambda record: model_registry.active.predict(record), records, args.threads, reload, args.reloads, args.interval)
+    last_reload = model_registry.last_reload or {}
+    return {**result, "reloads_total": model_registry.reloads_total, "reload_seconds": last_reload.get("seconds")}
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Prediction latency while the model is reloaded in the request vs in the background")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--reloads", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between reloads")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--n-estimators", type=int, default=1000)
+    parser.add_argument("--max-depth", type=int, default=8)
+    args = parser.parse_args()
+
+    records = make_vehicles(1000, seed=99).to_dict(orient="records")
+    records = [{name: value.item() if hasattr(value, "item") else value for name, value in record.items()} for record in records]
+    with tempfile.TemporaryDirectory() as folder:
+        paths = build_artifacts(Path(folder), args.rows, args.n_estimators, args.max_depth)["pickle"]
+        results = {
+            "no_reload": registry(paths, records, argparse.Namespace(**{**vars(args), "reloads": 0})),
+            "in_request": in_request(paths, records, args),
+            "registry": registry(paths, records, args),
+        }
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import httpx
+import numpy as np
+
+from pathlib import Path
+from scripts.dummy_artifacts import build_dummy_artifacts, artifact_environment, make_vehicles
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(folder: Path, executor: str, bcrypt_rounds: int) -> tuple:
+    port = free_port()
+    env = {**os.environ, **artifact_environment(build_dummy_artifacts(folder)),
+           "DATABASE_URL": f"sqlite:///{folder / f'{executor}.sqlite'}", "SECRET_KEY": "bench", "ALGORITHM": "HS256",
+           "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "BCRYPT_ROUNDS": str(bcrypt_rounds), "PASSWORD_HASH_EXECUTOR": executor}
+    subprocess.run([sys.executable, "-m", "app.database.migrate"], cwd=ROOT_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                               cwd=ROOT_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(f"{base_url}/predict/healthcheck")
+            return process, base_url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+def predict_latencies(base_url: str, headers: dict, record: dict, requests: int) -> list:
+    timings = []
+    with httpx.Client(base_url=base_url, headers=headers, timeout=60) as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.post("/predict/", json=record)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 201, response.text
+    return timings
+
+def login_storm(base_url: str, credentials: dict, stop: threading.Event, statuses: list) -> None:
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        while not stop.is_set():
+            statuses.append(client.post("/login", data=credentials).status_code)
+
+def run(executor: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        process, base_url = start_server(Path(folder), executor, args.bcrypt_rounds)
+        try:
+            credentials = {"username": "storm@example.com", "password": "storm-password"}
+            httpx.post(f"{base_url}/users/", json={"email": credentials["username"], "password": credentials["password"]})
+            token = httpx.post(f"{base_url}/login", data=credentials).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            record = make_vehicles(1).astype(object).iloc[0].to_dict()
+            
+            baseline = predict_latencies(base_url, headers, record, args.requests)
+            stop = threading.Event()
+            statuses = []
+            storm = [threading.Thread(target=login_storm, args=(base_url, credentials, stop, statuses))
+                     for _ in range(args.login_clients)]
+            for thread in storm:
+                thread.start()
+            time.sleep(0.5)
+            under_storm = predict_latencies(base_url, headers, record, args.requests)
+            stop.set()
+            for thread in storm:
+                thread.join()
+            hashing = httpx.get(f"{base_url}/login/metrics").json()
+        finally:
+            process.terminate()
+            process.wait()
+    
+    def summary(timings: list) -> dict:
+        return {"p50_ms": float(np.percentile(timings, 50) * 1000), "p99_ms": float(np.percentile(timings, 99) * 1000)}
+    return {
+        "predict_alone": summary(baseline),
+        "predict_during_login_storm": summary(under_storm),
+        "logins": statuses.count(200),
+        "logins_rejected": statuses.count(503),
+        "hashing": hashing,
+    }
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Prediction latency during a concurrent login storm, per password hashing executor")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--login-clients", type=int, default=64)
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--executors", nargs="+", default=["inline", "thread"])
+    args = parser.parse_args()
+    
+    print(json.dumps({executor: run(executor, args) for executor in args.executors}, indent=2))
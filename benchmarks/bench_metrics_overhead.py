@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import httpx
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from benchmarks.bench_login_storm import free_port
+from benchmarks.bench_prefork_workers import start_server, client
+from benchmarks.bench_worker_cold_start import build_artifacts
+from scripts.dummy_artifacts import artifact_environment, make_vehicles
+
+# Everything the instrumentation does for one POST /predict/: the middleware with its response wrapper,
+# the auth, validation and db_commit stages, encode and predict timings and the prediction counter
+def instrumentation_seconds(iterations: int) -> float:
+    from app.core.metrics import MetricsMiddleware, observe_stage, observe_model
+
+    class Route:
+        path = "/predict/"
+
+    async def app(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 201})
+
+    async def send(message):
+        pass
+
+    async def run() -> float:
+        middleware = MetricsMiddleware(app)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await middleware({"type": "http", "method": "POST"}, None, send)
+            auth_start = time.perf_counter()
+            auth_seconds = time.perf_counter() - auth_start
+            observe_stage("/predict/", "auth", auth_seconds)
+            observe_stage("/predict/", "validation", time.perf_counter() - auth_start - auth_seconds)
+            encode_start = time.perf_counter()
+            encoded = time.perf_counter()
+            observe_model("bench", encoded - encode_start, time.perf_counter() - encoded, 1)
+            commit_start = time.perf_counter()
+            observe_stage("/predict/", "db_commit", time.perf_counter() - commit_start)
+        return (time.perf_counter() - start) / iterations
+
+    async def baseline() -> float:
+        # The same request path without the instrumentation, only the coroutine calls remain
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await app({"type": "http", "method": "POST"}, None, send)
+        return (time.perf_counter() - start) / iterations
+
+    return asyncio.run(run()) - asyncio.run(baseline())
+
+def run_server(metrics_enabled: bool, env: dict, folder: Path, args) -> dict:
+    port = free_port()
+    env = {**env, "METRICS_ENABLED": str(metrics_enabled).lower(),
+           "DATABASE_URL": f"sqlite:///{folder / f'metrics_{metrics_enabled}_{time.time_ns()}.sqlite'}"}
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    process, base_url, _ = start_server(command, env, port)
+    try:
+        credentials = {"username": "bench@example.com", "password": "bench-password"}
+        httpx.post(f"{base_url}/users/", json={"email": credentials["username"], "password": credentials["password"]})
+        token = httpx.post(f"{base_url}/login", data=credentials).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        records = make_vehicles(200, seed=7).astype(object).to_dict(orient="records")
+        client(base_url, headers, records, 1.0)
+        with ProcessPoolExecutor(args.clients) as pool:
+            timings = np.concatenate([np.array(timing) for timing in
+                                      pool.map(client, *zip(*[(base_url, headers, records, args.seconds)] * args.clients))])
+    finally:
+        process.terminate()
+        process.wait()
+    return {"requests_per_second": len(timings) / args.seconds, "p50_ms": float(np.percentile(timings, 50) * 1000)}
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Cost of the /metrics instrumentation per prediction request")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=3, help="Alternating server runs with metrics off and on")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--n-estimators", type=int, default=300)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+
+    instrumentation_us = instrumentation_seconds(args.iterations) * 1e6
+    runs = {False: [], True: []}
+    with tempfile.TemporaryDirectory() as folder:
+        paths = build_artifacts(Path(folder), args.rows, args.n_estimators, args.max_depth)["pickle"]
+        env = {**os.environ, **artifact_environment(paths), "SECRET_KEY": "bench", "ALGORITHM": "HS256",
+               "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "BCRYPT_ROUNDS": "4", "MODEL_CHECK_INTERVAL_SECONDS": "0"}
+        # Interleaved, so drift of the machine over time affects both settings alike
+        for _ in range(args.rounds):
+            for metrics_enabled in [False, True]:
+                runs[metrics_enabled].append(run_server(metrics_enabled, env, Path(folder), args))
+
+    def median(metrics_enabled: bool, key: str) -> float:
+        return float(np.median([run[key] for run in runs[metrics_enabled]]))
+
+    # Per request the instrumentation runs once, its cost relative to the server time of one request
+    server_us_per_request = 1e6 / median(True, "requests_per_second")
+    print(json.dumps({
+        "instrumentation_us_per_request": instrumentation_us,
+        "server_us_per_request": server_us_per_request,
+        "instrumentation_overhead_pct": 100 * instrumentation_us / server_us_per_request,
+        "metrics_off": {"requests_per_second": median(False, "requests_per_second"), "p50_ms": median(False, "p50_ms")},
+        "metrics_on": {"requests_per_second": median(True, "requests_per_second"), "p50_ms": median(True, "p50_ms")},
+        "throughput_change_pct": 100 * (median(True, "requests_per_second") / median(False, "requests_per_second") - 1),
+        "runs": {"off": runs[False], "on": runs[True]},
+    }, indent=2))
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+from pathlib import Path
+from xgboost import XGBRegressor
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+COLD_START = """
+import time
+start = time.perf_counter()
+import numpy as np
+from app.services.predictors import load_predictor
+predictor = load_predictor({path!r}, {model_format!r})
+predictor.predict(np.zeros((1, {n_features}), dtype=np.float32))
+print(time.perf_counter() - start)
+"""
+
+def build_models(folder: Path, n_features: int, n_estimators: int, max_depth: int) -> dict:
+    rng = np.random.default_rng(1234)
+    X = rng.random((20000, n_features)).astype(np.float32)
+    y = X[:, 0] * 30000 + X[:, 1] * 10000 + rng.normal(0, 1000, len(X))
+    model = XGBRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=1234).fit(X, y)
+    
+    paths = {"pickle": folder / "xgb_model.pkl", "booster": folder / "xgb_model.ubj", "numpy": folder / "xgb_model.json"}
+    with open(paths["pickle"], "wb") as file:
+        pickle.dump(model, file)
+    model.get_booster().save_model(paths["booster"])
+    model.get_booster().save_model(paths["numpy"])
+    return paths
+
+def cold_start(path: Path, model_format: str, n_features: int, repeats: int) -> float:
+    # A fresh interpreter per run, so imports and deserialization are both measured
+    code = COLD_START.format(path=str(path), model_format=model_format, n_features=n_features)
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, check=True, capture_output=True, text=True)
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return float(np.median(timings))
+
+def latency(path: Path, model_format: str, n_features: int, requests: int) -> dict:
+    from app.services.predictors import load_predictor
+    
+    predictor = load_predictor(path, model_format)
+    rows = np.random.default_rng(42).random((requests, 1, n_features)).astype(np.float32)
+    predictor.predict(rows[0])
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        predictor.predict(row)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99))}
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Compare cold-start time and single-row latency of the model loaders")
+    parser.add_argument("--n-features", type=int, default=23)
+    parser.add_argument("--n-estimators", type=int, default=500)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--cold-start-repeats", type=int, default=5)
+    args = parser.parse_args()
+    
+    sys.path.insert(0, str(ROOT_DIR))
+    with tempfile.TemporaryDirectory() as folder:
+        paths = build_models(Path(folder), args.n_features, args.n_estimators, args.max_depth)
+        results = {}
+        for model_format, path in paths.items():
+            results[model_format] = {
+                "artifact_bytes": os.path.getsize(path),
+                "cold_start_s": cold_start(path, model_format, args.n_features, args.cold_start_repeats),
+                **latency(path, model_format, args.n_features, args.requests),
+            }
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+
+for name, value in {"DATABASE_URL": "sqlite://", "SECRET_KEY": "bench", "ALGORITHM": "HS256",
+                    "ACCESS_TOKEN_EXPIRE_MINUTES": "30"}.items():
+    os.environ.setdefault(name, value)
+
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import sessionmaker
+from app.database.database import Base
+from app.models import User, Prediction
+from app.services.prediction_writer import PredictionWriter
+
+def prediction_row(i: int, owner_id: int) -> dict:
+    return dict(brand="Toyota", production_year=2020, used_or_new="USED", transmission="Automatic", drive_type="AWD",
+                fuel_type="Unleaded", fuel_consumption=8.5, kilometres=45000 + i, cylinder_in_engine=4,
+                body_type="SUV", doors=4, seats=5, prediction_price=25000.0 + i, owner_id=owner_id)
+
+def summary(timings: list, total: float, rows: int) -> dict:
+    timings = np.array(timings) * 1000
+    return {"requests_per_s": rows / total, "p50_ms": float(np.percentile(timings, 50)),
+            "p99_ms": float(np.percentile(timings, 99)), "total_s": total}
+
+def write_through(session_factory, rows: int, owner_id: int) -> dict:
+    # What the predict route does today, one add/commit/refresh per request
+    timings = []
+    start = time.perf_counter()
+    for i in range(rows):
+        request_start = time.perf_counter()
+        session = session_factory()
+        db_prediction = Prediction(**prediction_row(i, owner_id))
+        session.add(db_prediction)
+        session.commit()
+        session.refresh(db_prediction)
+        session.close()
+        timings.append(time.perf_counter() - request_start)
+    return summary(timings, time.perf_counter() - start, rows)
+
+def background(session_factory, rows: int, owner_id: int, batch_size: int) -> dict:
+    writer = PredictionWriter(session_factory, Prediction, batch_size=batch_size).start()
+    timings = []
+    start = time.perf_counter()
+    for i in range(rows):
+        request_start = time.perf_counter()
+        writer.submit(prediction_row(i, owner_id))
+        timings.append(time.perf_counter() - request_start)
+    writer.stop()
+    # Total time includes the flush, so throughput counts rows actually in the database
+    result = summary(timings, time.perf_counter() - start, rows)
+    result.update(writer.metrics())
+    return result
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Compare write-through and background persistence of predictions")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--database-url", default=None, help="SQLAlchemy URL, a temporary SQLite file by default")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        engine = create_engine(args.database_url or f"sqlite:///{folder}/bench.sqlite")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        with session_factory() as session:
+            user = User(email=f"bench-{time.time()}@example.com", password=f"bench-{time.time()}")
+            session.add(user)
+            session.commit()
+            owner_id = user.id
+        
+        results = {
+            "write_through": write_through(session_factory, args.rows, owner_id),
+            "background": background(session_factory, args.rows, owner_id, args.batch_size),
+        }
+        with session_factory() as session:
+            results["rows_in_database"] = session.execute(select(func.count()).select_from(Prediction)).scalar()
+        engine.dispose()
+    print(json.dumps(results, indent=2))
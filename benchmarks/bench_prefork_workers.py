@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+import numpy as np
+import psutil
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from app.core.resources import available_cores
+from benchmarks.bench_login_storm import free_port
+from benchmarks.bench_worker_cold_start import build_artifacts
+from scripts.dummy_artifacts import artifact_environment, make_vehicles
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+def start_server(command: list, env: dict, port: int) -> tuple:
+    # Schema creation is a separate deployment step and not part of the measured startup
+    subprocess.run([sys.executable, "-m", "app.database.migrate"], cwd=ROOT_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    for _ in range(1200):
+        try:
+            httpx.get(f"{base_url}/predict/healthcheck")
+            return process, base_url, time.perf_counter() - start
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+# Client processes, a single Python client would be the bottleneck long before the workers
+def client(base_url: str, headers: dict, records: list, seconds: float) -> list:
+    timings = []
+    with httpx.Client(base_url=base_url, headers=headers, timeout=60) as session:
+        deadline = time.perf_counter() + seconds
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = session.post("/predict/", json=records[i % len(records)])
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 201, response.text
+            i += 1
+    return timings
+
+def run(server: str, workers: int, env: dict, args) -> dict:
+    port = free_port()
+    if server == "prefork":
+        command = [sys.executable, "-m", "app.serve", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    else:
+        # Every uvicorn worker imports the app and loads its own model
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    process, base_url, startup_seconds = start_server(command, env, port)
+    try:
+        credentials = {"username": "bench@example.com", "password": "bench-password"}
+        httpx.post(f"{base_url}/users/", json={"email": credentials["username"], "password": credentials["password"]})
+        token = httpx.post(f"{base_url}/login", data=credentials).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        records = make_vehicles(200, seed=7).astype(object).to_dict(orient="records")
+
+        client(base_url, headers, records, 1.0)
+        with ProcessPoolExecutor(args.clients) as pool:
+            timings = np.concatenate([np.array(timing) for timing in
+                                      pool.map(client, *zip(*[(base_url, headers, records, args.seconds)] * args.clients))])
+        # The pre-fork parent and the uvicorn supervisor count towards the total, a single uvicorn worker runs in the main process
+        root = psutil.Process(process.pid)
+        workers_processes = root.children(recursive=True) or [root]
+        worker_memory = [worker.memory_full_info() for worker in workers_processes]
+        pss_total = sum(info.pss for info in worker_memory) + (root.memory_full_info().pss if workers_processes[0] != root else 0)
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "startup_s": startup_seconds,
+        "requests_per_second": len(timings) / args.seconds,
+        "p50_ms": float(np.percentile(timings, 50) * 1000),
+        "p99_ms": float(np.percentile(timings, 99) * 1000),
+        "uss_mb_per_worker": float(np.mean([info.uss for info in worker_memory])) / 2 ** 20,
+        "pss_mb_total": pss_total / 2 ** 20,
+    }
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Prediction throughput and memory from 1 to N workers, pre-forked vs independent uvicorn workers")
+    parser.add_argument("--max-workers", type=int, default=available_cores())
+    parser.add_argument("--clients", type=int, default=8, help="Client processes sending requests")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--servers", nargs="+", default=["prefork", "uvicorn"])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--n-estimators", type=int, default=1000)
+    parser.add_argument("--max-depth", type=int, default=8)
+    args = parser.parse_args()
+
+    results = {"cores": available_cores()}
+    with tempfile.TemporaryDirectory() as folder:
+        paths = build_artifacts(Path(folder), args.rows, args.n_estimators, args.max_depth)["pickle"]
+        env = {**os.environ, **artifact_environment(paths), "SECRET_KEY": "bench", "ALGORITHM": "HS256",
+               "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "BCRYPT_ROUNDS": "4", "PREDICTION_WRITE_MODE": "background",
+               "MODEL_CHECK_INTERVAL_SECONDS": "0"}
+        worker_counts = sorted({1, *range(2, args.max_workers + 1, 2), args.max_workers})
+        for server in args.servers:
+            results[server] = {}
+            for workers in worker_counts:
+                # A fresh database per run
+                env["DATABASE_URL"] = f"sqlite:///{Path(folder) / f'{server}_{workers}.sqlite'}"
+                results[server][workers] = run(server, workers, env, args)
+    print(json.dumps(results, indent=2))
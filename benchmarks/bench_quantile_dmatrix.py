@@ -0,0 +1,56 @@
+import argparse
+import json
+import subprocess
+import sys
+
+from pathlib import Path
+from scripts.search import early_stopping_rounds_for, EARLY_STOPPING_ROUNDS
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Each mode runs in a fresh interpreter, so ru_maxrss is the peak of that mode alone
+TRAIN = """
+import json, resource, time
+from sklearn.metrics import root_mean_squared_error
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+from scripts.dummy_artifacts import make_training_data
+from scripts.train import ModelHandler, PARAM_GRID
+X, y, _, _ = make_training_data({rows}, noise=2000)
+X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=1234)
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+model_handler = ModelHandler(XGBRegressor(n_estimators=1000, objective='reg:squarederror', random_state=1234, tree_method="hist"))
+model = model_handler.train(X_train, y_train, PARAM_GRID, search={search!r}, n_iter={n_iter}, early_stopping_rounds={early_stopping_rounds},
+                            quantile_dmatrix={quantile_dmatrix}, max_bin={max_bin})
+report = model_handler.search_report
+print(json.dumps({{
+    "seconds": report["seconds"],
+    "candidates": report["candidates"],
+    "best_params": report["best_params"],
+    "test_rmse": float(root_mean_squared_error(y_test, model.predict(X_test))),
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "data_rss_mb": baseline / 1024,
+}}))
+"""
+
+def train(quantile_dmatrix: bool, args) -> dict:
+    code = TRAIN.format(rows=args.rows, search=args.search, n_iter=args.n_iter, early_stopping_rounds=early_stopping_rounds_for(args.search, args.early_stopping_rounds),
+                        quantile_dmatrix=quantile_dmatrix, max_bin=args.max_bin)
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Search time and peak RSS of the sklearn wrapper vs QuantileDMatrix training")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--search", choices=["grid", "random", "bayesian"], default="random")
+    parser.add_argument("--n-iter", type=int, default=6)
+    parser.add_argument("--early-stopping-rounds", type=int,
+                        help=f"Off for the grid search, {EARLY_STOPPING_ROUNDS} for the other strategies by default, 0 disables it")
+    parser.add_argument("--max-bin", type=int, default=256)
+    args = parser.parse_args()
+    
+    results = {"sklearn_hist": train(False, args), "quantile_dmatrix": train(True, args)}
+    results["speedup"] = results["sklearn_hist"]["seconds"] / results["quantile_dmatrix"]["seconds"]
+    results["peak_rss_saved_mb"] = results["sklearn_hist"]["peak_rss_mb"] - results["quantile_dmatrix"]["peak_rss_mb"]
+    print(json.dumps(results, indent=2))
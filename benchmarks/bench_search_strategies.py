@@ -0,0 +1,30 @@
+import argparse
+import json
+
+from sklearn.metrics import root_mean_squared_error
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+from scripts.dummy_artifacts import make_training_data
+from scripts.search import early_stopping_rounds_for, SEARCH_STRATEGIES, EARLY_STOPPING_ROUNDS
+from scripts.train import ModelHandler, PARAM_GRID
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Wall-clock time vs best score of the hyperparameter search strategies")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--strategies", nargs="+", choices=SEARCH_STRATEGIES, default=SEARCH_STRATEGIES)
+    parser.add_argument("--n-iter", type=int, default=20)
+    parser.add_argument("--early-stopping-rounds", type=int,
+                        help=f"Off for the grid search, {EARLY_STOPPING_ROUNDS} for the other strategies by default, 0 disables it")
+    args = parser.parse_args()
+    
+    X, y, _, _ = make_training_data(args.rows, noise=2000)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=1234)
+    results = {}
+    for strategy in args.strategies:
+        model_handler = ModelHandler(XGBRegressor(n_estimators=1000, objective='reg:squarederror', random_state=1234))
+        model = model_handler.train(X_train, y_train, PARAM_GRID, search=strategy, n_iter=args.n_iter,
+                                    early_stopping_rounds=early_stopping_rounds_for(strategy, args.early_stopping_rounds))
+        # Halving searches score their last round on a subsample, the held out RMSE is comparable across strategies
+        results[strategy] = {**model_handler.search_report, "test_rmse": float(root_mean_squared_error(y_test, model.predict(X_test)))}
+    print(json.dumps(results, indent=2, default=str))
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+
+from collections import Counter
+from pathlib import Path
+from benchmarks.bench_login_storm import free_port
+from benchmarks.bench_prefork_workers import start_server
+from benchmarks.bench_worker_cold_start import build_artifacts
+from scripts.dummy_artifacts import artifact_environment
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "sklearn", "scipy", "xgboost", "jose", "passlib"]
+# Modules the lifespan loads with the model and the auth routes on their first use
+DEFERRED_IMPORTS = "import app.services.model_registry, pandas, jose.jwt, passlib.context"
+FORMATS = ["pickle", "bundle_booster", "bundle_numpy"]
+
+# Cold boot of a worker: importing app.main in a fresh interpreter, the -X importtime profile of that import,
+# and the time from starting uvicorn to the first answered request (import plus lifespan with the model load)
+# per artifact format. The pickles and the booster bring xgboost, sklearn and scipy, the numpy bundle only numpy.
+
+def format_environment(artifacts: dict, artifact_format: str) -> dict:
+    if artifact_format == "pickle":
+        return artifact_environment(artifacts["pickle"])
+    bundle = artifacts[artifact_format]
+    return {"MODEL_BUNDLE_PATH": str(bundle["bundle_path"]), "MODEL_FORMAT": bundle["model_format"]}
+
+def timed_import(env: dict, statement: str) -> float:
+    code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout)
+
+def import_profile(env: dict, top: int) -> dict:
+    code = f"import sys, json, app.main; print(json.dumps([name for name in {HEAVY_MODULES} if name in sys.modules]))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True)
+    # Lines of "import time: self [us] | cumulative | imported package", nesting shown by the indent of the name
+    packages, cumulative = Counter(), {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        packages[name.split(".")[0]] += int(self_us)
+        cumulative.setdefault(name, int(cumulative_us))
+    return {
+        "heavy_modules_loaded": json.loads(result.stdout),
+        "app_main_cumulative_ms": cumulative["app.main"] / 1000,
+        "packages_self_ms": {name: us / 1000 for name, us in packages.most_common(top)},
+    }
+
+def boot_seconds(env: dict) -> float:
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    process, _, startup_seconds = start_server(command, env, port)
+    process.terminate()
+    process.wait()
+    return startup_seconds
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Import time profile and cold boot time of the API against a budget")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement, the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="Packages listed in the import time profile")
+    parser.add_argument("--budget-import-ms", type=float, default=1250, help="Budget for importing app.main")
+    parser.add_argument("--budget-boot-s", type=float, default=2.5, help="Budget from starting uvicorn to the first answered request")
+    parser.add_argument("--budget-format", choices=FORMATS, default="bundle_numpy", help="Artifact format the boot budget applies to")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--n-estimators", type=int, default=300)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        artifacts = build_artifacts(Path(folder), args.rows, args.n_estimators, args.max_depth)
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{Path(folder) / 'bench.sqlite'}", "SECRET_KEY": "bench", "ALGORITHM": "HS256",
+               "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "MODEL_CHECK_INTERVAL_SECONDS": "0"}
+        import_ms = float(np.median([timed_import(env, "import app.main") for _ in range(args.runs)]) * 1000)
+        eager_ms = float(np.median([timed_import(env, f"import app.main; {DEFERRED_IMPORTS}") for _ in range(args.runs)]) * 1000)
+        profile = import_profile(env, args.top)
+        boot_s = {artifact_format: float(np.median([boot_seconds({**env, **format_environment(artifacts, artifact_format)})
+                                                    for _ in range(args.runs)])) for artifact_format in FORMATS}
+
+    failures = []
+    if import_ms > args.budget_import_ms:
+        failures.append(f"import app.main {import_ms:.0f} ms > budget {args.budget_import_ms:.0f} ms")
+    if boot_s[args.budget_format] > args.budget_boot_s:
+        failures.append(f"cold boot with {args.budget_format} {boot_s[args.budget_format]:.2f} s > budget {args.budget_boot_s:.2f} s")
+    if profile["heavy_modules_loaded"]:
+        failures.append(f"import app.main loads {profile['heavy_modules_loaded']}")
+
+    print(json.dumps({
+        "import_app_main_ms": import_ms,
+        # What importing everything up front, as before the model and auth imports were deferred, would cost
+        "import_with_deferred_modules_ms": eager_ms,
+        "deferred_ms": eager_ms - import_ms,
+        "cold_boot_s": boot_s,
+        **profile,
+        "budget": {"import_ms": args.budget_import_ms, "boot_s": args.budget_boot_s, "boot_format": args.budget_format, "failures": failures},
+    }, indent=2))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+from scripts.dummy_artifacts import make_raw_listings
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Each mode runs in a fresh interpreter, so ru_maxrss is the peak of that mode alone
+INGEST = """
+import json, resource, time
+import pandas as pd
+from benchmarks.reference_data_processor import COLS_TO_DROP, COLS_FOR_CONVERT_TO_INT, COLS_FOR_CONVERT_TO_FLOAT, COLS_TO_INT
+from scripts.train import DataProcessor, StreamingDataProcessor
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if {chunksize}:
+    df = StreamingDataProcessor({path!r}, {chunksize}).process(COLS_TO_DROP, COLS_FOR_CONVERT_TO_INT, COLS_FOR_CONVERT_TO_FLOAT, COLS_TO_INT)
+else:
+    df = DataProcessor(pd.read_csv({path!r})).drop_unnecessary_and_NA_values(COLS_TO_DROP).remove_dash_symbol().remove_POA_values()\\
+        .from_cat_to_int(COLS_FOR_CONVERT_TO_INT).from_cat_to_float(COLS_FOR_CONVERT_TO_FLOAT).convert_to_int(COLS_TO_INT).get_dataframe()
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "rows": len(df),
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "import_rss_mb": baseline / 1024,
+    "result_mb": df.memory_usage(deep=True).sum() / 2 ** 20,
+}}))
+"""
+
+def write_listings(path: Path, rows: int, batch_size: int = 500_000) -> None:
+    for offset in range(0, rows, batch_size):
+        batch = make_raw_listings(min(batch_size, rows - offset), seed=offset)
+        batch.to_csv(path, mode="a", header=offset == 0, index=False)
+
+def ingest(path: Path, chunksize: int) -> dict:
+    code = INGEST.format(path=str(path), chunksize=chunksize)
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Peak RSS of loading and cleaning a listings CSV at once vs in chunks")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunksizes", type=int, nargs="+", default=[0, 100_000, 500_000], help="0 loads the CSV at once")
+    parser.add_argument("--csv", help="Existing listings CSV, a synthetic one with --rows rows is written otherwise")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(args.csv) if args.csv else Path(folder) / "listings.csv"
+        if not args.csv:
+            write_listings(path, args.rows)
+        results = {"csv_mb": os.path.getsize(path) / 2 ** 20}
+        for chunksize in args.chunksizes:
+            results["in_memory" if chunksize == 0 else f"chunksize_{chunksize}"] = ingest(path, chunksize)
+    print(json.dumps(results, indent=2))
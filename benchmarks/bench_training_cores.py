@@ -0,0 +1,50 @@
+import argparse
+import json
+import warnings
+
+from xgboost import XGBRegressor
+from scripts.dummy_artifacts import make_training_data
+from app.core.resources import available_cores
+from scripts.train import ModelHandler, PARAM_GRID
+
+# How the cores are split for a given budget: the planner's default, all cores to XGBoost,
+# and the old behaviour of n_jobs=-1 with XGBoost also using every core
+POLICIES = {
+    "planned": lambda cores: (None, None),
+    "xgboost_threads": lambda cores: (1, cores),
+    "oversubscribed": lambda cores: (cores, cores),
+}
+
+def core_counts(limit: int) -> list:
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    return counts if counts[-1] == limit else counts + [limit]
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Candidate fit throughput of the training search from 1 to N cores")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--n-iter", type=int, default=8)
+    parser.add_argument("--max-cores", type=int, default=available_cores())
+    parser.add_argument("--policies", nargs="+", choices=list(POLICIES), default=list(POLICIES))
+    args = parser.parse_args()
+    
+    X, y, _, _ = make_training_data(args.rows, noise=2000)
+    results = {}
+    for cores in core_counts(args.max_cores):
+        for policy in args.policies:
+            n_jobs, nthread = POLICIES[policy](cores)
+            model_handler = ModelHandler(XGBRegressor(n_estimators=1000, objective='reg:squarederror', random_state=1234))
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)
+                model_handler.train(X, y, PARAM_GRID, search="random", n_iter=args.n_iter, early_stopping_rounds=50,
+                                    cores=cores, n_jobs=n_jobs, nthread=nthread)
+            report = model_handler.search_report
+            results.setdefault(f"{cores}_cores", {})[policy] = {
+                "n_jobs": report["n_jobs"],
+                "nthread": report["nthread"],
+                "seconds": report["seconds"],
+                "fits_per_s": report["candidates"] * 3 / report["seconds"],
+            }
+    print(json.dumps(results, indent=2))
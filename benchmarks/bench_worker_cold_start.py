@@ -0,0 +1,90 @@
+import argparse
+import json
+import pickle
+import subprocess
+import sys
+import tempfile
+import numpy as np
+import psutil
+
+from pathlib import Path
+from xgboost import XGBRegressor
+from app.services.model_bundle import save_bundle
+from app.services.model_handler import ModelHandler
+from scripts.dummy_artifacts import make_training_data, make_vehicles
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# A worker imports the app model handler, loads the artifacts and scores one row, then waits until it is told to exit,
+# so the memory of all workers can be measured while they are alive at the same time
+WORKER = """
+import json, sys, time
+start = time.perf_counter()
+from app.services.model_handler import ModelHandler
+loading = time.perf_counter()
+model_handler = ModelHandler(**{arguments!r})
+model_handler.predict({record!r})
+now = time.perf_counter()
+print(json.dumps({{"seconds": now - start, "load_seconds": now - loading}}), flush=True)
+sys.stdin.read()
+"""
+
+def build_artifacts(folder: Path, rows: int, n_estimators: int, max_depth: int) -> dict:
+    df, y, one_hot_encoder, label_encoder = make_training_data(rows, noise=5000)
+    model = XGBRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=1234).fit(df, y)
+    paths = {
+        "model_path": folder / "xgb_model.pkl",
+        "one_hot_encoder_path": folder / "OneHot_encoder.pkl",
+        "label_encoder_path": folder / "Label_encoder.pkl",
+    }
+    for obj, key in [(model, "model_path"), (one_hot_encoder, "one_hot_encoder_path"), (label_encoder, "label_encoder_path")]:
+        with open(paths[key], "wb") as file:
+            pickle.dump(obj, file)
+    save_bundle(folder / "xgb_model.bundle", model, ModelHandler(**paths).encoding_tables)
+    return {
+        "pickle": paths,
+        # The default MODEL_FORMAT, which a bundle serves with its NumPy trees
+        "bundle_default": {"bundle_path": folder / "xgb_model.bundle", "model_format": "pickle"},
+        "bundle_booster": {"bundle_path": folder / "xgb_model.bundle", "model_format": "booster"},
+        "bundle_numpy": {"bundle_path": folder / "xgb_model.bundle", "model_format": "numpy"},
+    }
+
+def start_workers(arguments: dict, workers: int) -> dict:
+    record = {name: value.item() if hasattr(value, "item") else value for name, value in make_vehicles(1).iloc[0].items()}
+    code = WORKER.format(arguments={name: str(value) for name, value in arguments.items()}, record=record)
+    processes = [subprocess.Popen([sys.executable, "-c", code], cwd=ROOT_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                 for _ in range(workers)]
+    try:
+        timings = [json.loads(process.stdout.readline()) for process in processes]
+        # rss counts every resident page of a worker, uss only those private to it, and pss splits shared pages
+        # evenly between the processes mapping them
+        memory = [psutil.Process(process.pid).memory_full_info() for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+    return {
+        "cold_start_p50_s": float(np.median([timing["seconds"] for timing in timings])),
+        "cold_start_max_s": float(np.max([timing["seconds"] for timing in timings])),
+        "load_p50_s": float(np.median([timing["load_seconds"] for timing in timings])),
+        "rss_mb_per_worker": float(np.mean([info.rss for info in memory])) / 2 ** 20,
+        "uss_mb_per_worker": float(np.mean([info.uss for info in memory])) / 2 ** 20,
+        "pss_mb_total": float(np.sum([info.pss for info in memory])) / 2 ** 20,
+    }
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Cold start and memory of workers loading separate pickles vs the memory-mapped bundle")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--n-estimators", type=int, default=1000)
+    parser.add_argument("--max-depth", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        modes = build_artifacts(Path(folder), args.rows, args.n_estimators, args.max_depth)
+        results = {"bundle_mb": (Path(folder) / "xgb_model.bundle").stat().st_size / 2 ** 20,
+                   "pickle_mb": (Path(folder) / "xgb_model.pkl").stat().st_size / 2 ** 20}
+        for mode, arguments in modes.items():
+            results[mode] = start_workers(arguments, args.workers)
+    print(json.dumps(results, indent=2))
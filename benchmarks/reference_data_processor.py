@@ -0,0 +1,79 @@
+import time
+import pandas as pd
+
+from typing import List
+
+# Shared by the DataProcessor tests and the data processing benchmarks: the cleaning settings of the
+# training pipeline and the column-by-column DataProcessor as it was before vectorization
+
+COLS_TO_DROP = ['Title', "Model", "Car/Suv", "Location", "Engine", "ColourExtInt"]
+COLS_FOR_CONVERT_TO_INT = ['Seats', 'Doors', 'CylindersinEngine', 'Kilometres']
+COLS_FOR_CONVERT_TO_FLOAT = ['FuelConsumption']
+COLS_TO_INT = ['Price', 'Year']
+OUTLIERS_VALS = {"Year": (2000, 2024), "FuelConsumption": (1.0, 25.0), "CylindersinEngine": (2, 10), "Seats": (2, 15), "Price": (1000, 100000)}
+
+class ReferenceDataProcessor:
+    
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        
+    def drop_unnecessary_and_NA_values(self, cols: List[str]) -> "ReferenceDataProcessor":
+        self.df.drop(columns=cols, inplace=True)
+        self.df = self.df.apply(lambda x: x.fillna(x.value_counts().index[0]))
+        return self
+    
+    def remove_dash_symbol(self) -> "ReferenceDataProcessor":
+        mask = self.df.apply(lambda col: col.astype(str).str.contains('-')).any(axis=1)
+        self.df = self.df[~mask]
+        return self
+    
+    def remove_POA_values(self, col: str = "Price") -> "ReferenceDataProcessor":
+        self.df = self.df[self.df[col] != 'POA'].reset_index(drop=True)
+        return self
+    
+    def from_cat_to_int(self, cols_for_convert: List[str]) -> "ReferenceDataProcessor":
+        for col in cols_for_convert:
+            self.df[col] = self.df[col].astype(str)
+            self.df[col] = self.df[col].str.replace('[^0-9]', '', regex=True)
+            self.df[col] = self.df[col].astype(int)
+        return self
+    
+    def from_cat_to_float(self, cols_convert_to_float: List[str]) -> "ReferenceDataProcessor":
+        for col in cols_convert_to_float:
+            self.df[col] = self.df[col].astype(str)
+            self.df[col] = self.df[col].str.extract(r'(\d+\.?\d*)').astype(float)
+        return self
+        
+    def convert_to_int(self, cols_to_int: List[str]) -> "ReferenceDataProcessor":
+        for col in cols_to_int:
+            self.df[col] = self.df[col].astype(int)
+        return self
+    
+    def remove_outliers(self, outliers_vals: dict) -> "ReferenceDataProcessor":
+        for col, (min_val, max_val) in outliers_vals.items():
+            self.df = self.df[(self.df[col] >= min_val) & (self.df[col] <= max_val)]
+        self.df.reset_index(drop=True, inplace=True)
+        return self
+    
+    def get_dataframe(self) -> pd.DataFrame:
+        return self.df
+
+STAGES = [
+    ("drop_unnecessary_and_NA_values", (COLS_TO_DROP,)),
+    ("remove_dash_symbol", ()),
+    ("remove_POA_values", ()),
+    ("from_cat_to_int", (COLS_FOR_CONVERT_TO_INT,)),
+    ("from_cat_to_float", (COLS_FOR_CONVERT_TO_FLOAT,)),
+    ("convert_to_int", (COLS_TO_INT,)),
+    ("remove_outliers", (OUTLIERS_VALS,)),
+]
+
+def clean(processor_class, df: pd.DataFrame) -> tuple:
+    processor = processor_class(df)
+    timings = {}
+    for stage, args in STAGES:
+        start = time.perf_counter()
+        getattr(processor, stage)(*args)
+        timings[stage] = time.perf_counter() - start
+    timings["total"] = sum(timings.values())
+    return processor.get_dataframe(), timings
@@ -0,0 +1,149 @@
+import argparse
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from app.services.encoding import save_category_vocabulary
+from sklearn.preprocessing import OneHotEncoder, LabelEncoder
+from xgboost import XGBRegressor
+
+ONE_HOT_COLS = ["UsedOrNew", "Transmission", "DriveType", "FuelType"]
+LABEL_COLS = ["Brand", "BodyType"]
+
+def make_vehicles(n: int, seed: int = 1234) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Brand": rng.choice(np.array(["Toyota", "Ford", "Mazda", "BMW", "Kia"], dtype=object), n),
+        "Year": rng.integers(2000, 2025, n),
+        "UsedOrNew": rng.choice(np.array(["USED", "NEW", "DEMO"], dtype=object), n),
+        "Transmission": rng.choice(np.array(["Automatic", "Manual"], dtype=object), n),
+        "DriveType": rng.choice(np.array(["4WD", "AWD", "Front", "Other", "Rear"], dtype=object), n),
+        "FuelType": rng.choice(np.array(["Diesel", "Hybrid", "LPG", "Premium", "Unleaded"], dtype=object), n),
+        "FuelConsumption": rng.uniform(3.0, 20.0, n).round(1),
+        "Kilometres": rng.integers(0, 300000, n),
+        "CylindersinEngine": rng.integers(2, 10, n),
+        "BodyType": rng.choice(np.array(["SUV", "Sedan", "Hatchback", "Wagon", "Ute / Tray"], dtype=object), n),
+        "Doors": rng.integers(2, 6, n),
+        "Seats": rng.integers(2, 9, n),
+    })
+
+def with_missing(values: np.ndarray, rng: np.random.Generator, fraction: float, fill) -> np.ndarray:
+    values = values.astype(object)
+    values[rng.random(len(values)) < fraction] = fill
+    return values
+
+def as_labels(values: np.ndarray, suffix: str = "") -> np.ndarray:
+    # One string object per distinct value, shared by every row that has it, keeps millions of rows small
+    uniques, inverse = np.unique(values, return_inverse=True)
+    return np.array([f"{value}{suffix}" for value in uniques], dtype=object)[inverse]
+
+# Raw listings shaped like data/vehical.csv (strings with units, "-" and "POA" placeholders, missing values),
+# for exercising scripts/train.py without the dataset
+def make_raw_listings(n: int, seed: int = 1234) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    vehicles = make_vehicles(n, seed)
+    years = vehicles["Year"].to_numpy()
+    return pd.DataFrame({
+        "Brand": with_missing(vehicles["Brand"].to_numpy(), rng, 0.001, np.nan),
+        "Year": with_missing(years.astype(float), rng, 0.001, np.nan).astype(float),
+        "Model": rng.choice(np.array(["Corolla", "Ranger", "CX-5", "X3", "Sportage", "Hilux"], dtype=object), n),
+        "Car/Suv": rng.choice(np.array(["SUV", "Sedan", "Hatchback", "Ute / Tray"], dtype=object), n),
+        "Title": as_labels(years, " listing"),
+        "UsedOrNew": vehicles["UsedOrNew"].to_numpy(),
+        "Transmission": with_missing(vehicles["Transmission"].to_numpy(), rng, 0.01, "-"),
+        "Engine": rng.choice(np.array(["4 cyl, 2 L", "6 cyl, 3.5 L", "8 cyl, 5 L", "-"], dtype=object), n, p=[0.5, 0.3, 0.15, 0.05]),
+        "DriveType": vehicles["DriveType"].to_numpy(),
+        "FuelType": with_missing(vehicles["FuelType"].to_numpy(), rng, 0.02, "-"),
+        "FuelConsumption": with_missing(as_labels(vehicles["FuelConsumption"].to_numpy(), " L / 100 km"), rng, 0.05, "-"),
+        "Kilometres": with_missing(as_labels(vehicles["Kilometres"].to_numpy()), rng, 0.02, "-"),
+        "ColourExtInt": rng.choice(np.array(["White / Black", "Black / Black", "Silver / Grey", "-"], dtype=object), n),
+        "Location": rng.choice(np.array(["Caringbah, NSW", "Brooklyn, VIC", "Toowoomba, QLD"], dtype=object), n),
+        "CylindersinEngine": with_missing(as_labels(vehicles["CylindersinEngine"].to_numpy(), " cyl"), rng, 0.05, "-"),
+        "BodyType": with_missing(vehicles["BodyType"].to_numpy(), rng, 0.01, np.nan),
+        "Doors": with_missing(as_labels(vehicles["Doors"].to_numpy(), " Doors"), rng, 0.05, np.nan),
+        "Seats": with_missing(as_labels(vehicles["Seats"].to_numpy(), " Seats"), rng, 0.05, np.nan),
+        "Price": with_missing(as_labels(make_prices(vehicles).round().astype(int).to_numpy()), rng, 0.01, "POA"),
+    })
+
+def make_prices(vehicles: pd.DataFrame) -> pd.Series:
+    return 20000 + (vehicles["Year"] - 2000) * 900 - vehicles["Kilometres"] * 0.05
+
+# Encoded feature matrix shaped like the output of PipelineManager.process_data, noise adds a random error to the prices
+def make_training_data(n: int, seed: int = 1234, noise: float = 0.0) -> tuple:
+    df = make_vehicles(n, seed)
+    y = make_prices(df)
+    if noise:
+        y = y + np.random.default_rng(seed + 1).normal(0, noise, n)
+    
+    one_hot_encoder = OneHotEncoder(sparse_output=False)
+    one_hot_df = pd.DataFrame(one_hot_encoder.fit_transform(df[ONE_HOT_COLS]),
+                              columns=one_hot_encoder.get_feature_names_out(ONE_HOT_COLS), index=df.index)
+    df = pd.concat([df.drop(ONE_HOT_COLS, axis=1), one_hot_df], axis=1)
+    label_encoder = LabelEncoder()
+    for col in LABEL_COLS:
+        df[col] = label_encoder.fit_transform(df[col])
+    return df, y, one_hot_encoder, label_encoder
+
+# Feature matrix shaped like the output of PipelineManager.process_data with encoding="categorical"
+def make_categorical_training_data(n: int, seed: int = 1234, noise: float = 0.0) -> tuple:
+    df = make_vehicles(n, seed)
+    y = make_prices(df)
+    if noise:
+        y = y + np.random.default_rng(seed + 1).normal(0, noise, n)
+    
+    vocabulary = {}
+    for col in LABEL_COLS + ONE_HOT_COLS:
+        vocabulary[col] = sorted(df[col].unique())
+        df[col] = df[col].astype(pd.CategoricalDtype(vocabulary[col]))
+    return df, y, vocabulary
+
+# Small artifacts fitted the same way scripts/train.py does, so the API can be run and tested offline
+def build_dummy_artifacts(folder: Path, n_vehicles: int = 300, n_estimators: int = 20, encoding: str = "onehot_label") -> dict:
+    folder = Path(folder)
+    os.makedirs(folder, exist_ok=True)
+    paths = {"model_path": folder / "xgb_model.pkl"}
+    if encoding == "categorical":
+        df, y, vocabulary = make_categorical_training_data(n_vehicles)
+        paths["category_vocabulary_path"] = folder / "category_vocabulary.json"
+        save_category_vocabulary(vocabulary, paths["category_vocabulary_path"])
+        encoders = []
+    else:
+        df, y, one_hot_encoder, label_encoder = make_training_data(n_vehicles)
+        paths["one_hot_encoder_path"] = folder / "OneHot_encoder.pkl"
+        paths["label_encoder_path"] = folder / "Label_encoder.pkl"
+        encoders = [(one_hot_encoder, "one_hot_encoder_path"), (label_encoder, "label_encoder_path")]
+    model = XGBRegressor(n_estimators=n_estimators, max_depth=3, random_state=1234,
+                         enable_categorical=encoding == "categorical").fit(df, y)
+    
+    for obj, key in [(model, "model_path")] + encoders:
+        with open(paths[key], "wb") as file:
+            pickle.dump(obj, file)
+    # Native formats next to the pickle, for the booster and NumPy loaders
+    model.get_booster().save_model(folder / "xgb_model.ubj")
+    model.get_booster().save_model(folder / "xgb_model.json")
+    return paths
+
+def artifact_environment(paths: dict) -> dict:
+    if "category_vocabulary_path" in paths:
+        return {
+            "MODEL_PATH": str(paths["model_path"]),
+            "ENCODING": "categorical",
+            "CATEGORY_VOCABULARY_PATH": str(paths["category_vocabulary_path"]),
+        }
+    return {
+        "MODEL_PATH": str(paths["model_path"]),
+        "ONE_HOT_ENCODER_PATH": str(paths["one_hot_encoder_path"]),
+        "LABEL_ENCODER_PATH": str(paths["label_encoder_path"]),
+    }
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Write small model artifacts for running the API without the dataset")
+    parser.add_argument("--output-dir", default="./ml_models")
+    parser.add_argument("--encoding", choices=["onehot_label", "categorical"], default="onehot_label")
+    args = parser.parse_args()
+    
+    for name, path in build_dummy_artifacts(args.output_dir, encoding=args.encoding).items():
+        print(f"{name}: {path}")
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+
+from pathlib import Path
+from typing import List, Optional
+
+# Bump when the cleaning or encoding code changes in a way that alters the features of an unchanged config
+FEATURE_STORE_VERSION = 1
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Cleaned and encoded training matrices cached as uncompressed Arrow IPC files, one folder per key.
+# The key hashes the raw input bytes and the pipeline configuration, so a run that only changes
+# hyperparameters memory-maps the cached matrix instead of parsing and cleaning the CSV again.
+class FeatureStore:
+    
+    def __init__(self, folder: str = "./cache/features"):
+        self.folder = Path(folder)
+        
+    def input_digest(self, data_path: str) -> str:
+        # Hashing a large dump is not free, digests are remembered per path, size and mtime
+        stat = os.stat(data_path)
+        fingerprint = f"{os.path.abspath(data_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        index_path = self.folder / "inputs.json"
+        index = json.loads(index_path.read_text()) if index_path.exists() else {}
+        if fingerprint not in index:
+            index[fingerprint] = file_digest(data_path)
+            os.makedirs(self.folder, exist_ok=True)
+            index_path.write_text(json.dumps(index, indent=2))
+        return index[fingerprint]
+    
+    def key(self, data_path: str, pipeline_config: dict) -> str:
+        config = json.dumps(pipeline_config, sort_keys=True, default=str)
+        payload = f"{FEATURE_STORE_VERSION}|{self.input_digest(data_path)}|{config}"
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    
+    def path(self, key: str) -> Path:
+        return self.folder / key
+    
+    def exists(self, key: str) -> bool:
+        return (self.path(key) / "features.arrow").exists()
+    
+    def save(self, key: str, df: pd.DataFrame, artifacts: List[str] = (), metadata: Optional[dict] = None) -> Path:
+        # Written to a temporary folder and renamed, a crashed run never leaves a half written entry behind
+        os.makedirs(self.folder, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.folder, prefix=f".{key}-"))
+        df.reset_index(drop=True).to_feather(staging / "features.arrow", compression="uncompressed")
+        for artifact in artifacts:
+            shutil.copy2(artifact, staging / Path(artifact).name)
+        meta = {"rows": len(df), "columns": list(df.columns), "created_at": time.time(), **(metadata or {})}
+        (staging / "meta.json").write_text(json.dumps(meta, indent=2, default=str))
+        shutil.rmtree(self.path(key), ignore_errors=True)
+        os.replace(staging, self.path(key))
+        return self.path(key)
+    
+    def load(self, key: str, restore_artifacts: List[str] = ()) -> Optional[pd.DataFrame]:
+        if not self.exists(key):
+            return None
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError("FeatureStore requires the pyarrow package, install it with `pip install pyarrow`") from e
+        # Memory-mapped, numeric columns without nulls are handed to pandas without a copy
+        source = pyarrow.memory_map(str(self.path(key) / "features.arrow"), "r")
+        table = pyarrow.ipc.open_file(source).read_all()
+        for artifact in restore_artifacts:
+            os.makedirs(os.path.dirname(artifact) or ".", exist_ok=True)
+            shutil.copy2(self.path(key) / Path(artifact).name, artifact)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
@@ -0,0 +1,225 @@
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from scipy.stats import norm
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import Matern, WhiteKernel
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, HalvingGridSearchCV, HalvingRandomSearchCV, ParameterGrid, \
+    ParameterSampler, KFold
+from sklearn.model_selection._search import BaseSearchCV
+
+SEARCH_STRATEGIES = ["grid", "halving_grid", "halving_random", "random", "bayesian"]
+EARLY_STOPPING_ROUNDS = 50
+
+# Early stopping is off unless the rounds are given, the exhaustive grid search trains every candidate to n_estimators
+# like it always has. The budgeted strategies default to EARLY_STOPPING_ROUNDS, 0 switches it off for them too.
+def early_stopping_rounds_for(search: str, rounds: Optional[int] = None) -> Optional[int]:
+    if rounds is None and search != "grid":
+        rounds = EARLY_STOPPING_ROUNDS
+    return rounds or None
+
+# Sequential model-based search over the points of a parameter grid. A Gaussian process fitted on the
+# scores seen so far picks the next candidates by expected improvement, so good regions of a large
+# grid are found with a fraction of the fits of an exhaustive search.
+class BayesianSearchCV(BaseSearchCV):
+    
+    def __init__(self, estimator, param_grid, *, n_iter=20, n_initial=5, batch_size=1, scoring=None, n_jobs=None,
+                 refit=True, cv=None, verbose=0, random_state=None, error_score=np.nan, return_train_score=False):
+        super().__init__(estimator=estimator, scoring=scoring, n_jobs=n_jobs, refit=refit, cv=cv, verbose=verbose,
+                         error_score=error_score, return_train_score=return_train_score)
+        self.param_grid = param_grid
+        self.n_iter = n_iter
+        self.n_initial = n_initial
+        self.batch_size = batch_size
+        self.random_state = random_state
+        
+    def _run_search(self, evaluate_candidates):
+        candidates = list(ParameterGrid(self.param_grid))
+        encoded = encode_candidates(candidates, self.param_grid)
+        budget = min(self.n_iter, len(candidates))
+        rng = np.random.default_rng(self.random_state)
+        
+        evaluated = list(rng.choice(len(candidates), size=min(self.n_initial, budget), replace=False))
+        results = evaluate_candidates([candidates[i] for i in evaluated])
+        while len(evaluated) < budget:
+            batch = propose_candidates(encoded, evaluated, results["mean_test_score"],
+                                       min(self.batch_size, budget - len(evaluated)), self.random_state)
+            evaluated.extend(batch)
+            results = evaluate_candidates([candidates[i] for i in batch])
+
+def encode_candidates(candidates: list, param_grid: dict) -> np.ndarray:
+    # Every parameter becomes the position of its value in the grid, scaled to [0, 1]
+    columns = []
+    for name, values in param_grid.items():
+        positions = {value: i for i, value in enumerate(sorted(values))}
+        columns.append([positions[candidate[name]] / max(len(values) - 1, 1) for candidate in candidates])
+    return np.asarray(columns, dtype=float).T
+
+def propose_candidates(encoded: np.ndarray, evaluated: list, scores, batch_size: int, random_state=None) -> np.ndarray:
+    # The batch_size not yet evaluated grid points with the highest expected improvement over the best score
+    scores = np.asarray(scores, dtype=float)
+    scores = np.where(np.isnan(scores), np.nanmin(scores) if not np.isnan(scores).all() else 0.0, scores)
+    surrogate = GaussianProcessRegressor(kernel=Matern(nu=2.5) + WhiteKernel(), normalize_y=True, random_state=random_state)
+    with warnings.catch_warnings():
+        # Few noisy points, the kernel bounds are hit routinely and that is fine for ranking candidates
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        surrogate.fit(encoded[evaluated], scores)
+    
+    remaining = np.setdiff1d(np.arange(len(encoded)), evaluated)
+    mean, std = surrogate.predict(encoded[remaining], return_std=True)
+    std = np.maximum(std, 1e-9)
+    improvement = mean - scores.max()
+    expected_improvement = improvement * norm.cdf(improvement / std) + std * norm.pdf(improvement / std)
+    return remaining[np.argsort(-expected_improvement)[:batch_size]]
+
+def feature_info(X: pd.DataFrame) -> dict:
+    # Native categorical columns are passed to XGBoost as category codes marked with the "c" feature type
+    categorical = [isinstance(dtype, pd.CategoricalDtype) for dtype in X.dtypes]
+    if not any(categorical):
+        return {"feature_names": list(X.columns)}
+    feature_types = ["c" if is_categorical else "float" for is_categorical in categorical]
+    return {"feature_names": list(X.columns), "feature_types": feature_types, "enable_categorical": True}
+
+def float32_matrix(X: pd.DataFrame) -> np.ndarray:
+    columns = []
+    for col in X.columns:
+        values = X[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            values = np.where(codes < 0, np.nan, codes)
+        columns.append(np.asarray(values, dtype=np.float32))
+    return np.column_stack(columns) if columns else np.empty((len(X), 0), dtype=np.float32)
+
+# Search that scores candidates with native xgboost.train on float32 QuantileDMatrix folds. The quantile cuts
+# are computed once on the whole training set and every fold matrix is built once with them, then shared by
+# all candidates, instead of the sklearn wrapper rebuilding a DMatrix from float64 frames for every fit.
+class QuantileDMatrixSearch:
+    
+    def __init__(self, estimator, strategy: str, param_grid: dict, n_iter: int = 20, cv: int = 3, n_jobs: int = 1,
+                 nthread: int = 1, early_stopping_rounds: Optional[int] = None, max_bin: int = 256, random_state: int = 1234):
+        if strategy not in ("grid", "random", "bayesian"):
+            raise ValueError(f"Search strategy {strategy} is not supported with QuantileDMatrix training, use grid, random or bayesian")
+        self.estimator = estimator
+        self.strategy = strategy
+        self.param_grid = param_grid
+        self.n_iter = n_iter
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.nthread = nthread
+        self.early_stopping_rounds = early_stopping_rounds
+        self.max_bin = max_bin
+        self.random_state = random_state
+        
+    def params(self, candidate: dict, nthread: Optional[int] = None) -> tuple:
+        # xgboost.train accepts the sklearn parameter names, only n_estimators becomes the number of rounds
+        params = {**self.estimator.get_xgb_params(), **candidate, "tree_method": "hist", "max_bin": self.max_bin,
+                  "n_jobs": nthread or self.nthread}
+        rounds = params.pop("n_estimators", None) or self.estimator.get_params()["n_estimators"] or 100
+        return {name: value for name, value in params.items() if value is not None}, rounds
+    
+    def train(self, candidate: dict, dtrain, evals: list, nthread: Optional[int] = None):
+        import xgboost
+        
+        params, rounds = self.params(candidate, nthread)
+        return xgboost.train(params, dtrain, num_boost_round=rounds, evals=evals,
+                             early_stopping_rounds=self.early_stopping_rounds if evals else None, verbose_eval=False)
+    
+    @staticmethod
+    def predict(booster, X: np.ndarray) -> np.ndarray:
+        best_iteration = booster.attr("best_iteration")
+        iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+        return booster.inplace_predict(X, iteration_range=iteration_range)
+    
+    def fit(self, X: pd.DataFrame, y: pd.Series, eval_set: Optional[tuple] = None) -> "QuantileDMatrixSearch":
+        import xgboost
+        
+        matrix = dict(max_bin=self.max_bin, **feature_info(X))
+        X = float32_matrix(X)
+        y = np.asarray(y, dtype=np.float32)
+        self.reference_ = xgboost.QuantileDMatrix(X, y, nthread=self.nthread * self.n_jobs, **matrix)
+        folds = [
+            (xgboost.QuantileDMatrix(X[train], y[train], ref=self.reference_, **matrix), test)
+            for train, test in KFold(self.cv).split(X)
+        ]
+        evals = []
+        if eval_set is not None and self.early_stopping_rounds:
+            X_val, y_val = eval_set
+            evals = [(xgboost.QuantileDMatrix(float32_matrix(X_val), np.asarray(y_val, dtype=np.float32), ref=self.reference_, **matrix),
+                      "validation")]
+        
+        def fit_fold(candidate: dict, fold: int) -> tuple:
+            dtrain, test = folds[fold]
+            start = time.perf_counter()
+            booster = self.train(candidate, dtrain, evals)
+            fit_time = time.perf_counter() - start
+            return fit_time, -mean_squared_error(y[test], self.predict(booster, X[test]))
+        
+        self.cv_results_ = {"params": [], "mean_test_score": [], "mean_fit_time": [], "std_fit_time": []}
+        
+        def evaluate(candidates: list) -> dict:
+            # Boosting releases the GIL, candidate folds run on threads that share the fold matrices
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+                futures = [[executor.submit(fit_fold, candidate, fold) for fold in range(self.cv)] for candidate in candidates]
+                for candidate, candidate_futures in zip(candidates, futures):
+                    fit_times, scores = zip(*[future.result() for future in candidate_futures])
+                    self.cv_results_["params"].append(candidate)
+                    self.cv_results_["mean_test_score"].append(float(np.mean(scores)))
+                    self.cv_results_["mean_fit_time"].append(float(np.mean(fit_times)))
+                    self.cv_results_["std_fit_time"].append(float(np.std(fit_times)))
+            return self.cv_results_
+        
+        if self.strategy == "grid":
+            evaluate(list(ParameterGrid(self.param_grid)))
+        elif self.strategy == "random":
+            evaluate(list(ParameterSampler(self.param_grid, n_iter=self.n_iter, random_state=self.random_state)))
+        else:
+            candidates = list(ParameterGrid(self.param_grid))
+            encoded = encode_candidates(candidates, self.param_grid)
+            budget = min(self.n_iter, len(candidates))
+            evaluated = list(np.random.default_rng(self.random_state).choice(len(candidates), size=min(5, budget), replace=False))
+            evaluate([candidates[i] for i in evaluated])
+            while len(evaluated) < budget:
+                batch_size = min(max(1, self.n_jobs // self.cv), budget - len(evaluated))
+                batch = propose_candidates(encoded, evaluated, self.cv_results_["mean_test_score"], batch_size, self.random_state)
+                evaluated.extend(batch)
+                evaluate([candidates[i] for i in batch])
+        
+        best = int(np.argmax(self.cv_results_["mean_test_score"]))
+        self.best_params_ = self.cv_results_["params"][best]
+        self.best_score_ = self.cv_results_["mean_test_score"][best]
+        
+        # The refit reuses the full training matrix and hands the booster to a regular XGBRegressor, it runs alone
+        # and gets the threads of all the search workers
+        booster = self.train(self.best_params_, self.reference_, evals, nthread=self.nthread * self.n_jobs)
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_, tree_method="hist", max_bin=self.max_bin)
+        self.best_estimator_.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+        return self
+
+def make_search(strategy: str, estimator, param_grid: dict, n_iter: int = 20, cv: int = 3,
+                scoring: str = 'neg_mean_squared_error', n_jobs: int = -1, random_state: int = 1234):
+    if strategy == "grid":
+        return GridSearchCV(estimator=estimator, param_grid=param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs)
+    if strategy == "halving_grid":
+        return HalvingGridSearchCV(estimator=estimator, param_grid=param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs,
+                                   factor=3, random_state=random_state)
+    if strategy == "halving_random":
+        return HalvingRandomSearchCV(estimator=estimator, param_distributions=param_grid, n_candidates=n_iter, cv=cv,
+                                     scoring=scoring, n_jobs=n_jobs, factor=3, random_state=random_state)
+    if strategy == "random":
+        return RandomizedSearchCV(estimator=estimator, param_distributions=param_grid, n_iter=n_iter, cv=cv,
+                                  scoring=scoring, n_jobs=n_jobs, random_state=random_state)
+    if strategy == "bayesian":
+        # One batch fills the parallel fits, each candidate takes cv of them
+        batch_size = max(1, n_jobs // cv) if n_jobs and n_jobs > 0 else 1
+        return BayesianSearchCV(estimator=estimator, param_grid=param_grid, n_iter=n_iter, batch_size=batch_size, cv=cv,
+                                scoring=scoring, n_jobs=n_jobs, random_state=random_state)
+    raise ValueError(f"Unknown search strategy {strategy}, expected one of {SEARCH_STRATEGIES}")
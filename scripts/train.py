@@ -1,28 +1,88 @@
+import argparse
+import time
+import numpy as np
 import pandas as pd
 import os
 import pickle
 from tqdm import tqdm
-from typing import List, Union, Dict
+from typing import List, Union, Dict, Optional
 
 from sklearn.preprocessing import OneHotEncoder, LabelEncoder
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import train_test_split, ParameterGrid
+from threadpoolctl import threadpool_limits
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score, root_mean_squared_error
 from xgboost import XGBRegressor
+from scripts.feature_store import FeatureStore, file_digest
+from scripts.search import make_search, early_stopping_rounds_for, QuantileDMatrixSearch, SEARCH_STRATEGIES, EARLY_STOPPING_ROUNDS
+from app.core.resources import plan_workers
+from app.services.encoding import ENCODINGS, EncodingTables, save_category_vocabulary, load_category_vocabulary
+from app.services.model_bundle import save_bundle
 
+# Artifact names inside the output folder, the same names app/core/config.py reads by default
+MODEL_DIR = "./ml_models"
+MODEL_FILE = "xgb_model.pkl"
+ONE_HOT_ENCODER_FILE = "OneHot_encoder.pkl"
+LABEL_ENCODER_FILE = "Label_encoder.pkl"
+CATEGORY_VOCABULARY_FILE = "category_vocabulary.json"
+MODEL_BUNDLE_FILE = "xgb_model.bundle"
+
+PARAM_GRID = {
+    'n_estimators': [500, 1000],
+    'learning_rate': [0.01, 0.1, 0.2],
+    'max_depth': [3, 5, 7],
+    'subsample': [0.8, 1.0],
+    'colsample_bytree': [0.8, 1.0],
+    'gamma': [0, 0.1, 0.2],
+}
 
 class DataProcessor:
     
     def __init__(self, df: pd.DataFrame):
         self.df = df
         
+    @staticmethod
+    def most_frequent(col: pd.Series):
+        # Same value as col.value_counts().index[0], ties go to the value seen first
+        codes, uniques = pd.factorize(col)
+        return uniques[np.bincount(codes[codes >= 0]).argmax()]
+    
+    @staticmethod
+    def map_unique(col: pd.Series, convert) -> np.ndarray:
+        # Listing columns hold few distinct strings, each one is converted once and broadcast back by code
+        codes, uniques = pd.factorize(col, use_na_sentinel=False)
+        return np.asarray(convert(pd.Series(uniques).astype(str)))[codes]
+    
+    @staticmethod
+    def contains_dash(col: pd.Series) -> np.ndarray:
+        # Equivalent to col.astype(str).str.contains('-') without formatting every value
+        values = col.to_numpy()
+        if col.dtype.kind in "iu":
+            return values < 0
+        if col.dtype.kind == "f":
+            # Negative numbers (and -0.0) or values numpy prints in scientific notation with a negative exponent
+            small = (values != 0) & (np.abs(values) < values.dtype.type(1e-4))
+            return ~np.isnan(values) & (np.signbit(values) | small)
+        if col.dtype.kind == "b":
+            return np.zeros(len(col), dtype=bool)
+        return DataProcessor.map_unique(col, lambda uniques: uniques.str.contains('-', regex=False).astype(bool))
+        
     def drop_unnecessary_and_NA_values(self, cols: List[str]) -> "DataProcessor":
         self.df.drop(columns=cols, inplace=True)
-        self.df = self.df.apply(lambda x: x.fillna(x.value_counts().index[0]))
+        return self.fill_NA_values()
+    
+    def fill_NA_values(self, fill_values: Optional[dict] = None) -> "DataProcessor":
+        # Without fill_values every column is filled with its own most frequent value
+        for col in [col for col in self.df.columns if self.df[col].hasnans]:
+            value = fill_values[col] if fill_values is not None else self.most_frequent(self.df[col])
+            self.df[col] = self.df[col].fillna(value)
         return self
     
     def remove_dash_symbol(self) -> "DataProcessor":
-        mask = self.df.apply(lambda col: col.astype(str).str.contains('-')).any(axis=1)
-        self.df = self.df[~mask]
+        mask = np.zeros(len(self.df), dtype=bool)
+        for col in self.df.columns:
+            mask |= self.contains_dash(self.df[col])
+        if mask.any():
+            self.df = self.df[~mask]
         return self
     
     def remove_POA_values(self, col: str = "Price") -> "DataProcessor":
@@ -31,15 +91,16 @@ class DataProcessor:
     
     def from_cat_to_int(self, cols_for_convert: List[str]) -> "DataProcessor":
         for col in tqdm(cols_for_convert, desc="Converting categorical to int"):
-            self.df[col] = self.df[col].astype(str)
-            self.df[col] = self.df[col].str.replace('[^0-9]', '', regex=True)
-            self.df[col] = self.df[col].astype(int)
+            self.df[col] = self.map_unique(
+                self.df[col], lambda uniques: uniques.str.replace('[^0-9]', '', regex=True).astype(int)
+            )
         return self
     
     def from_cat_to_float(self, cols_convert_to_float: List[str]) -> "DataProcessor":
         for col in tqdm(cols_convert_to_float, desc="Converting categorical to float"):
-            self.df[col] = self.df[col].astype(str)
-            self.df[col] = self.df[col].str.extract(r'(\d+\.?\d*)').astype(float)
+            self.df[col] = self.map_unique(
+                self.df[col], lambda uniques: uniques.str.extract(r'(\d+\.?\d*)', expand=False).astype(float)
+            )
         return self
         
     def convert_to_int(self, cols_to_int: List[str]) -> "DataProcessor":
@@ -48,13 +109,77 @@ class DataProcessor:
         return self
     
     def remove_outliers(self, outliers_vals: dict) -> "DataProcessor":
+        # One combined mask, the frame is filtered once instead of once per column
+        mask = np.ones(len(self.df), dtype=bool)
         for col, (min_val, max_val) in outliers_vals.items():
-            self.df = self.df[(self.df[col] >= min_val) & (self.df[col] <= max_val)]
+            mask &= ((self.df[col] >= min_val) & (self.df[col] <= max_val)).to_numpy()
+        if not mask.all():
+            self.df = self.df[mask]
         self.df.reset_index(drop=True, inplace=True)
         return self
     
+    def downcast(self, categories: Optional[Dict[str, list]] = None) -> "DataProcessor":
+        # int32/float32 for numbers and category for the remaining strings, categories fixes the vocabulary
+        # of a column so that chunks cleaned separately concatenate without falling back to object
+        int32 = np.iinfo(np.int32)
+        for col in self.df.columns:
+            values = self.df[col]
+            if values.dtype.kind in "iu" and (values.empty or (values.min() >= int32.min and values.max() <= int32.max)):
+                self.df[col] = values.astype(np.int32)
+            elif values.dtype.kind == "f":
+                self.df[col] = values.astype(np.float32)
+            elif values.dtype == object:
+                self.df[col] = values.astype(pd.CategoricalDtype(categories[col]) if categories and col in categories else "category")
+        return self
+    
     def get_dataframe(self) -> pd.DataFrame:
         return self.df
+
+# Cleans a listings CSV chunk by chunk, so the raw file never has to be in memory at once.
+# A first pass counts the values of every column for the NA fill values and the category vocabularies,
+# the second pass runs the DataProcessor stages on each chunk and keeps only the compact result.
+class StreamingDataProcessor:
+    
+    def __init__(self, path: str, chunksize: int = 500_000):
+        self.path = path
+        self.chunksize = chunksize
+        
+    def read_chunks(self, usecols: List[str]):
+        return pd.read_csv(self.path, usecols=usecols, chunksize=self.chunksize)
+    
+    def value_counts(self, usecols: List[str]) -> Dict[str, pd.Series]:
+        # Counts stay in order of first appearance in the file, idxmax then breaks ties like DataProcessor.most_frequent
+        counts = {}
+        for chunk in tqdm(self.read_chunks(usecols), desc="Counting values"):
+            for col in usecols:
+                codes, uniques = pd.factorize(chunk[col])
+                chunk_counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(uniques)), index=uniques)
+                counts[col] = chunk_counts if col not in counts else \
+                    pd.concat([counts[col], chunk_counts]).groupby(level=0, sort=False).sum()
+        return counts
+    
+    def process(self, cols_to_drop: List[str], cols_for_convert_to_int: List[str], cols_for_convert_to_float: List[str], cols_to_int: List[str]) -> pd.DataFrame:
+        usecols = [col for col in pd.read_csv(self.path, nrows=0).columns if col not in cols_to_drop]
+        counts = self.value_counts(usecols)
+        # A column without a single value has nothing to fill its missing values with
+        empty = [col for col, col_counts in counts.items() if not len(col_counts)]
+        if empty:
+            raise ValueError(f"Columns {empty} of {self.path} hold no values, drop them with cols_to_drop")
+        fill_values = {col: col_counts.idxmax() for col, col_counts in counts.items()}
+        categories = {col: list(col_counts.index) for col, col_counts in counts.items()}
+        
+        chunks = []
+        for chunk in tqdm(self.read_chunks(usecols), desc="Cleaning chunks"):
+            processor = DataProcessor(chunk)
+            processor.fill_NA_values(fill_values)\
+                .remove_dash_symbol()\
+                .remove_POA_values()\
+                .from_cat_to_int(cols_for_convert_to_int)\
+                .from_cat_to_float(cols_for_convert_to_float)\
+                .convert_to_int(cols_to_int)\
+                .downcast(categories)
+            chunks.append(processor.get_dataframe())
+        return pd.concat(chunks, ignore_index=True)
     
 class SaveModel:
     
@@ -62,17 +187,25 @@ class SaveModel:
         self.path = path
         
     def save_with_pickle(self, model, file_path) -> pickle:
-        folder = os.path.dirname("../ml_models")
-        if not os.path.exists(folder):
-            os.mkdir("../ml_models")
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
         with open(file_path, "wb") as file:
             pickle.dump(model, file)
         return self
     
+    def save_booster(self, model: XGBRegressor, file_path) -> "SaveModel":
+        # Native XGBoost format, .ubj for UBJSON and .json for JSON
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        model.get_booster().save_model(file_path)
+        return self
+    
+    def save_bundle(self, model: XGBRegressor, file_path, encoding_tables: EncodingTables, metadata: Optional[dict] = None) -> dict:
+        return save_bundle(file_path, model, encoding_tables, metadata)
+    
 class Encoder(SaveModel):
     
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, output_dir: str = MODEL_DIR):
         self.df = df
+        self.output_dir = output_dir
     
     def one_hot_encode(self, cols: List[str], save_model: bool = True) -> "Encoder":
         one_hot_encoder = OneHotEncoder(sparse_output=False)
@@ -82,16 +215,31 @@ class Encoder(SaveModel):
         ) 
         self.df = pd.concat([self.df.drop(cols, axis=1),
                                 one_hot_df], axis=1)
+        self.one_hot_encoder = one_hot_encoder
         if save_model:
-            self.save_with_pickle(one_hot_encoder, "./ml_models/3OneHot_encoder.pkl")
+            self.save_with_pickle(one_hot_encoder, os.path.join(self.output_dir, ONE_HOT_ENCODER_FILE))
         return self
     
     def label_encode(self, cols: List[str], save_model: bool = True) -> "Encoder":
         label_encoder = LabelEncoder()
         for col in cols:
             self.df[col] = label_encoder.fit_transform(self.df[col])
+        self.label_encoder = label_encoder
+        if save_model:
+            self.save_with_pickle(label_encoder, os.path.join(self.output_dir, LABEL_ENCODER_FILE))
+        return self
+    
+    def categorical_encode(self, cols: List[str], save_model: bool = True) -> "Encoder":
+        # Every column keeps its own sorted vocabulary, the model splits on the categories natively
+        self.vocabulary = {}
+        for col in cols:
+            values = self.df[col].astype(str).where(self.df[col].notna())
+            categories = sorted(values.dropna().unique())
+            self.df[col] = values.astype(pd.CategoricalDtype(categories))
+            self.vocabulary[col] = categories
         if save_model:
-            self.save_with_pickle(label_encoder, "./ml_models/3Label_encoder.pkl")
+            os.makedirs(self.output_dir, exist_ok=True)
+            save_category_vocabulary(self.vocabulary, os.path.join(self.output_dir, CATEGORY_VOCABULARY_FILE))
         return self
     
     def get_dataframe(self) -> pd.DataFrame:
@@ -102,43 +250,97 @@ class ModelHandler(SaveModel):
     def __init__(self, model: XGBRegressor):
         self.model = model
         
-    def train(self, X_train: pd.DataFrame, y_train: pd.Series, param_grid: Dict[str, List[Union[int, float]]]) -> XGBRegressor:
-        grid_search = GridSearchCV(
-            estimator=self.model,
-            param_grid=param_grid,
-            cv=3,
-            scoring='neg_mean_squared_error',
-            n_jobs=-1
-        )
+    def train(self, X_train: pd.DataFrame, y_train: pd.Series, param_grid: Dict[str, List[Union[int, float]]],
+              search: str = "grid", n_iter: int = 20, early_stopping_rounds: Optional[int] = None,
+              validation_size: float = 0.2, random_state: int = 1234, cores: Optional[int] = None,
+              n_jobs: Optional[int] = None, nthread: Optional[int] = None, quantile_dmatrix: bool = False,
+              max_bin: int = 256) -> XGBRegressor:
+        if any(isinstance(dtype, pd.CategoricalDtype) for dtype in X_train.dtypes):
+            self.model.set_params(enable_categorical=True, tree_method="hist")
+        fit_params = {}
+        if early_stopping_rounds:
+            # Boosting stops on a held out validation fold, the CV folds stay untouched for scoring the candidates
+            X_train, X_val, y_train, y_val = train_test_split(X_train, y_train, test_size=validation_size, random_state=random_state)
+            self.model.set_params(early_stopping_rounds=early_stopping_rounds)
+            fit_params = {"eval_set": (X_val, y_val)} if quantile_dmatrix else {"eval_set": [(X_val, y_val)], "verbose": False}
+        
+        cv = 3
+        n_candidates = len(ParameterGrid(param_grid)) if search in ("grid", "halving_grid") else n_iter
+        n_jobs, nthread = plan_workers(cores=cores, workers=n_jobs, nthread=nthread, n_tasks=n_candidates * cv)
+        self.model.set_params(n_jobs=nthread)
+        if quantile_dmatrix:
+            search_cv = QuantileDMatrixSearch(self.model, search, param_grid, n_iter=n_iter, cv=cv, n_jobs=n_jobs, nthread=nthread,
+                                              early_stopping_rounds=early_stopping_rounds, max_bin=max_bin, random_state=random_state)
+        else:
+            search_cv = make_search(search, self.model, param_grid, n_iter=n_iter, cv=cv, scoring='neg_mean_squared_error',
+                                    n_jobs=n_jobs, random_state=random_state)
 
-        print("Training model with GridSearchCV...")
-        grid_search.fit(X_train, y_train)
+        print(f"Training model with {type(search_cv).__name__} ({n_jobs} parallel fits x {nthread} XGBoost threads)...")
+        start = time.perf_counter()
+        # Caps OpenMP/BLAS pools of this process too, sequential fits and the refit run here
+        with threadpool_limits(limits=nthread):
+            search_cv.fit(X_train, y_train, **fit_params)
+        seconds = time.perf_counter() - start
         
-        print(f'Best params: {grid_search.best_params_}')
-        print(f'Best score: {grid_search.best_score_}')
-        self.model = grid_search.best_estimator_
+        results = search_cv.cv_results_
+        for params, fit_time, fit_std in zip(results["params"], results["mean_fit_time"], results["std_fit_time"]):
+            print(f"Candidate fit {fit_time:.2f}s (+/- {fit_std:.2f}s): {params}")
+        print(f'Best params: {search_cv.best_params_}')
+        print(f'Best score: {search_cv.best_score_}')
+        self.model = search_cv.best_estimator_
+        self.search_report = {
+            "strategy": search,
+            "quantile_dmatrix": quantile_dmatrix,
+            "seconds": seconds,
+            "best_score": float(search_cv.best_score_),
+            "best_params": search_cv.best_params_,
+            "candidates": len(results["params"]),
+            "best_iteration": getattr(self.model, "best_iteration", None) if early_stopping_rounds else None,
+            "n_jobs": n_jobs,
+            "nthread": nthread,
+            "fit_seconds": [float(fit_time) for fit_time in results["mean_fit_time"]],
+        }
+        print(f'Search took {seconds:.1f}s for {self.search_report["candidates"]} candidates')
         
         return self.model
         
     
-    def evaluate(self, X_test: pd.DataFrame, y_test: pd.Series) -> None:
+    def evaluate(self, X_test: pd.DataFrame, y_test: pd.Series) -> dict:
         predictions = self.model.predict(X_test)
-        print(f'Mean Squared Error: {mean_squared_error(y_test, predictions)}')
-        print(f'Mean Absolute Error: {mean_absolute_error(y_test, predictions)}')
-        print(f'Root Mean Squared Error: {root_mean_squared_error(y_test, predictions)}')
-        print(f'R2 Score: {r2_score(y_test, predictions)}')
+        metrics = {
+            "mse": float(mean_squared_error(y_test, predictions)),
+            "mae": float(mean_absolute_error(y_test, predictions)),
+            "rmse": float(root_mean_squared_error(y_test, predictions)),
+            "r2": float(r2_score(y_test, predictions)),
+        }
+        print(f'Mean Squared Error: {metrics["mse"]}')
+        print(f'Mean Absolute Error: {metrics["mae"]}')
+        print(f'Root Mean Squared Error: {metrics["rmse"]}')
+        print(f'R2 Score: {metrics["r2"]}')
+        return metrics
         
     @staticmethod
     def load_model(file_path: str) -> XGBRegressor:
         with open(file_path, "rb"):
             return pickle.load(file_path)   
 
+def load_encoding_tables(output_dir: str, encoding: str, feature_names: List[str]) -> EncodingTables:
+    # Serving tables compiled from the encoder artifacts saved next to the model
+    if encoding == "categorical":
+        return EncodingTables.from_vocabulary(load_category_vocabulary(os.path.join(output_dir, CATEGORY_VOCABULARY_FILE)), feature_names)
+    with open(os.path.join(output_dir, ONE_HOT_ENCODER_FILE), "rb") as file:
+        one_hot_encoder = pickle.load(file)
+    with open(os.path.join(output_dir, LABEL_ENCODER_FILE), "rb") as file:
+        label_encoder = pickle.load(file)
+    return EncodingTables.from_encoders(one_hot_encoder, label_encoder, feature_names)
+
 class PipelineManager:
     
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: Optional[pd.DataFrame] = None, output_dir: str = MODEL_DIR):
         self.df = df
+        self.output_dir = output_dir
         
-    def process_data(self, cols_to_drop: List[str], categorica_cols_ohe: List[str], categorica_cols_le: List[str], outliers_vals: dict, cols_for_convert_to_int: List[str], cols_for_convert_to_float: List[str], cols_to_int: List[str]) -> pd.DataFrame:
+    def process_data(self, cols_to_drop: List[str], categorica_cols_ohe: List[str], categorica_cols_le: List[str], outliers_vals: dict, cols_for_convert_to_int: List[str], cols_for_convert_to_float: List[str], cols_to_int: List[str], encoding: str = "onehot_label") -> pd.DataFrame:
         processor = DataProcessor(self.df)
         processor.drop_unnecessary_and_NA_values(cols_to_drop)\
             .remove_dash_symbol()\
@@ -148,9 +350,23 @@ class PipelineManager:
             .convert_to_int(cols_to_int)
         self.df = processor.get_dataframe()
         
-        encoder = Encoder(self.df)
-        encoder.one_hot_encode(categorica_cols_ohe)
-        encoder.label_encode(categorica_cols_le)
+        return self.encode(categorica_cols_ohe, categorica_cols_le, encoding)
+    
+    def process_csv(self, path: str, chunksize: int, cols_to_drop: List[str], categorica_cols_ohe: List[str], categorica_cols_le: List[str], outliers_vals: dict, cols_for_convert_to_int: List[str], cols_for_convert_to_float: List[str], cols_to_int: List[str], encoding: str = "onehot_label") -> pd.DataFrame:
+        processor = StreamingDataProcessor(path, chunksize)
+        self.df = processor.process(cols_to_drop, cols_for_convert_to_int, cols_for_convert_to_float, cols_to_int)
+        
+        return self.encode(categorica_cols_ohe, categorica_cols_le, encoding)
+    
+    def encode(self, categorica_cols_ohe: List[str], categorica_cols_le: List[str], encoding: str = "onehot_label") -> pd.DataFrame:
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding {encoding}, expected one of {ENCODINGS}")
+        encoder = Encoder(self.df, self.output_dir)
+        if encoding == "categorical":
+            encoder.categorical_encode(categorica_cols_le + categorica_cols_ohe)
+        else:
+            encoder.one_hot_encode(categorica_cols_ohe)
+            encoder.label_encode(categorica_cols_le)
         self.df = encoder.get_dataframe()
         
         return self.df
@@ -158,34 +374,80 @@ class PipelineManager:
 
 if __name__ == "__main__":
     
-    data = pd.read_csv("./data/vehical.csv")
+    parser = argparse.ArgumentParser(description="Clean the listings, train the price model and save the artifacts")
+    parser.add_argument("--data-path", default="./data/vehical.csv")
+    parser.add_argument("--chunksize", type=int, default=0, help="Stream the CSV in chunks of this many rows, 0 loads it at once")
+    parser.add_argument("--output-dir", default=MODEL_DIR, help="Folder for the model, encoders and model bundle")
+    parser.add_argument("--features-dir", default="./cache/features", help="Feature store folder, empty to always rebuild without caching")
+    parser.add_argument("--rebuild-features", action="store_true", help="Ignore cached features and rebuild them from the CSV")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="onehot_label",
+                        help="onehot_label: OneHotEncoder + LabelEncoder, categorical: native XGBoost categories with a vocabulary file")
+    parser.add_argument("--search", choices=SEARCH_STRATEGIES, default="grid", help="Hyperparameter search strategy")
+    parser.add_argument("--n-iter", type=int, default=20, help="Candidate budget of the random, halving_random and bayesian searches")
+    parser.add_argument("--early-stopping-rounds", type=int,
+                        help=f"Off for the grid search, {EARLY_STOPPING_ROUNDS} for the other strategies by default, 0 disables it")
+    parser.add_argument("--quantile-dmatrix", action="store_true",
+                        help="Score candidates with xgboost.train on float32 QuantileDMatrix folds built once (grid, random, bayesian)")
+    parser.add_argument("--max-bin", type=int, default=256, help="Histogram bins per feature of the QuantileDMatrix mode")
+    parser.add_argument("--cores", type=int, help="Cores to use for training, all available by default")
+    parser.add_argument("--cv-jobs", type=int, help="Candidate fits run in parallel, derived from --cores by default")
+    parser.add_argument("--xgb-threads", type=int, help="Threads per XGBoost fit, derived from --cores by default")
+    args = parser.parse_args()
     
-    pipeline = PipelineManager(data)
-    processed_data = pipeline.process_data(
+    pipeline_config = dict(
         cols_to_drop=['Title', "Model", "Car/Suv", "Location", "Engine", "ColourExtInt"],
         categorica_cols_ohe=["UsedOrNew", "Transmission", "DriveType", "FuelType"],
         categorica_cols_le=['Brand', "BodyType"],
         cols_for_convert_to_int=['Seats', 'Doors', 'CylindersinEngine', 'Kilometres'],
         cols_for_convert_to_float=['FuelConsumption'],
         cols_to_int=['Price', 'Year'],
-        outliers_vals={"Year": (2000, 2024),"FuelConsumption": (1.0, 25.0), "CylindersinEngine": (2, 10), "Seats": (2, 15), "Price": (1000, 100000)}
+        outliers_vals={"Year": (2000, 2024),"FuelConsumption": (1.0, 25.0), "CylindersinEngine": (2, 10), "Seats": (2, 15), "Price": (1000, 100000)},
+        encoding=args.encoding,
     )
+    encoder_files = [CATEGORY_VOCABULARY_FILE] if args.encoding == "categorical" else [ONE_HOT_ENCODER_FILE, LABEL_ENCODER_FILE]
+    encoder_paths = [os.path.join(args.output_dir, name) for name in encoder_files]
+    
+    # Streamed and in-memory cleaning give different dtypes, so they are cached under different keys
+    feature_store = FeatureStore(args.features_dir) if args.features_dir else None
+    feature_key = feature_store.key(args.data_path, {**pipeline_config, "streaming": bool(args.chunksize)}) if feature_store else None
+    processed_data = None
+    if feature_store and not args.rebuild_features:
+        processed_data = feature_store.load(feature_key, restore_artifacts=encoder_paths)
+        if processed_data is not None:
+            print(f"Loaded cached features {feature_key}")
+    if processed_data is None:
+        if args.chunksize:
+            processed_data = PipelineManager(output_dir=args.output_dir).process_csv(args.data_path, args.chunksize, **pipeline_config)
+        else:
+            processed_data = PipelineManager(pd.read_csv(args.data_path), args.output_dir).process_data(**pipeline_config)
+        if feature_store:
+            feature_store.save(feature_key, processed_data, artifacts=encoder_paths,
+                               metadata={"data_path": args.data_path, "pipeline_config": pipeline_config})
+            print(f"Cached features as {feature_key}")
 
     X = processed_data.drop(columns=["Price"])
     y = processed_data["Price"]
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
     
     model_handler = ModelHandler(XGBRegressor(n_estimators=1000, objective='reg:squarederror', random_state=1234))
-    param_grid = {
-    'n_estimators': [500, 1000],
-    'learning_rate': [0.01, 0.1, 0.2],
-    'max_depth': [3, 5, 7],
-    'subsample': [0.8, 1.0],
-    'colsample_bytree': [0.8, 1.0],
-    'gamma': [0, 0.1, 0.2],
-    }
-    
-    model = model_handler.train(X_train, y_train, param_grid)
-    model_handler.evaluate(X_test, y_test)
+    model = model_handler.train(X_train, y_train, PARAM_GRID, search=args.search, n_iter=args.n_iter,
+                                early_stopping_rounds=early_stopping_rounds_for(args.search, args.early_stopping_rounds), cores=args.cores,
+                                n_jobs=args.cv_jobs, nthread=args.xgb_threads, quantile_dmatrix=args.quantile_dmatrix,
+                                max_bin=args.max_bin)
+    metrics = model_handler.evaluate(X_test, y_test)
 
-    model_handler.save_with_pickle(model, "./ml_models/3xgb_model.pkl")
+    model_path = os.path.join(args.output_dir, MODEL_FILE)
+    model_handler.save_with_pickle(model, model_path)
+    model_handler.save_booster(model, os.path.splitext(model_path)[0] + ".ubj")
+    model_handler.save_booster(model, os.path.splitext(model_path)[0] + ".json")
+    
+    encoding_tables = load_encoding_tables(args.output_dir, args.encoding, list(model.feature_names_in_))
+    bundle = model_handler.save_bundle(model, os.path.join(args.output_dir, MODEL_BUNDLE_FILE), encoding_tables, metadata={
+        "training_data": args.data_path,
+        "training_data_digest": feature_store.input_digest(args.data_path) if feature_store else file_digest(args.data_path),
+        "rows": len(processed_data),
+        "pipeline_config": pipeline_config,
+        "metrics": metrics,
+        "search": model_handler.search_report,
+    })
+    print(f"Saved model bundle {bundle['model_version']} to {args.output_dir}")
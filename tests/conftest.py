@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import pytest
+
+from scripts.dummy_artifacts import make_vehicles, build_dummy_artifacts
+
+# The app settings are read from the environment. Tests run against a temporary SQLite file, the sync and the
+# async engine of the app have to see the same tables and rows, which an in-memory database cannot do
+DATABASE_DIR = tempfile.mkdtemp(prefix="tests-")
+for name, value in {"DATABASE_URL": f"sqlite:///{os.path.join(DATABASE_DIR, 'app.sqlite')}", "SECRET_KEY": "test-secret-key", "ALGORITHM": "HS256",
+                    "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "BCRYPT_ROUNDS": "4"}.items():
+    os.environ.setdefault(name, value)
+
+
+# Importing the app no longer creates the tables, the test database is migrated once per session
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    from app.database.migrate import migrate
+    
+    migrate()
+    yield
+    shutil.rmtree(DATABASE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def vehicles():
+    return make_vehicles(300)
+
+
+@pytest.fixture(scope="session")
+def model_artifacts(tmp_path_factory):
+    return build_dummy_artifacts(tmp_path_factory.mktemp("ml_models"))
+
+
+@pytest.fixture(scope="session")
+def categorical_model_artifacts(tmp_path_factory):
+    return build_dummy_artifacts(tmp_path_factory.mktemp("ml_models_categorical"), encoding="categorical")
+
+
+# The model the prediction routes serve, without running the application lifespan
+@pytest.fixture()
+def serving_registry(model_artifacts, monkeypatch):
+    from app.routes import prediction
+    from app.services.model_handler import ModelHandler
+    from app.services.model_registry import ModelRegistry
+    
+    registry = ModelRegistry(lambda: ModelHandler(**model_artifacts, version_check_interval=None))
+    registry.load()
+    monkeypatch.setattr(prediction, "registry", registry)
+    return registry
@@ -0,0 +1,100 @@
+import pytest
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.core.config import settings
+from app.database.database import db
+from app.models import User
+from app.auth import oauth2
+from app.auth.cache import TokenCache
+from app.auth.oauth2 import create_access_token, get_current_user
+
+class TestAuth:
+    
+    @pytest.fixture()
+    def setup(self, monkeypatch):
+        monkeypatch.setattr(oauth2, "token_cache", TokenCache(maxsize=100, ttl=60))
+        db.init()
+        session = db.get_session()
+        user = User(email="auth@example.com", password="auth-hash")
+        session.add(user)
+        session.commit()
+        
+        queries = []
+        def count_queries(conn, cursor, statement, *args):
+            if "FROM users" in statement:
+                queries.append(statement)
+        event.listen(db.engine, "before_cursor_execute", count_queries)
+        
+        token = create_access_token(data={"user_id": user.id, "email": user.email})
+        yield session, user, token, queries
+        event.remove(db.engine, "before_cursor_execute", count_queries)
+        if session.get(User, user.id) is not None:
+            session.delete(user)
+            session.commit()
+        session.close()
+    
+    def test_cached_principal(self, setup):
+        session, user, token, queries = setup
+        first = get_current_user(token, session)
+        second = get_current_user(token, session)
+        
+        assert first.id == user.id and first.email == user.email
+        assert second == first
+        assert len(queries) == 1, "Second lookup should be served from the token cache"
+        assert oauth2.token_cache.stats()["hits"] == 1
+    
+    def test_invalidated_when_user_changes(self, setup):
+        session, user, token, queries = setup
+        get_current_user(token, session)
+        user.email = "changed@example.com"
+        session.commit()
+        
+        assert get_current_user(token, session).email == "changed@example.com", "Changed users should not be served from the cache"
+        
+        session.delete(user)
+        session.commit()
+        with pytest.raises(HTTPException) as error:
+            get_current_user(token, session)
+        assert error.value.status_code == 401, "Deleted users should not be authenticated"
+    
+    def test_trusted_claims_skip_database(self, setup, monkeypatch):
+        session, user, token, queries = setup
+        monkeypatch.setattr(settings, "auth_trust_token_claims", True)
+        monkeypatch.setattr(oauth2, "token_cache", None)
+        
+        principal = get_current_user(token, session)
+        assert principal.id == user.id and principal.email == user.email
+        assert queries == [], "Trusted claims should not touch the users table"
+    
+    def test_user_and_login_routes_use_the_async_session(self, setup):
+        from app.main import app
+        
+        _, _, _, queries = setup
+        client = TestClient(app)
+        credentials = {"username": "routes@example.com", "password": "routes-password"}
+        created = client.post("/users/", json={"email": credentials["username"], "password": credentials["password"]})
+        try:
+            assert created.status_code == 201, created.text
+            assert client.post("/users/", json={"email": credentials["username"], "password": "other"}).status_code == 409
+            assert client.get(f"/users/{created.json()['id']}").json()["email"] == credentials["username"]
+            login = client.post("/login", data=credentials)
+            assert login.status_code == 200, login.text
+            assert client.post("/login", data=dict(credentials, password="wrong")).status_code == 403
+            assert queries == [], "The user and login routes should not touch the sync engine"
+        finally:
+            with db.get_session() as session:
+                session.query(User).filter(User.email == credentials["username"]).delete()
+                session.commit()
+    
+    def test_invalid_token(self, setup):
+        session, _, _, _ = setup
+        with pytest.raises(HTTPException) as error:
+            get_current_user("not-a-token", session)
+        assert error.value.status_code == 401
+    
+    def test_cache_entry_expires_with_ttl(self):
+        cache = TokenCache(maxsize=10, ttl=-1)
+        cache.set("token", oauth2.UserPrincipal(id=1, email="a@example.com"))
+        assert cache.get("token") is None, "Expired entries should not be returned"
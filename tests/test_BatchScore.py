@@ -0,0 +1,80 @@
+import functools
+import pytest
+import numpy as np
+import pandas as pd
+
+from app.services.batch_score import score_file, PREDICTION_COLUMN, ERROR_COLUMN, MANIFEST_NAME
+from app.services.model_handler import ModelHandler
+
+def read_parts(output_dir, output_format: str = "csv") -> pd.DataFrame:
+    parts = sorted(output_dir.glob(f"part-*.{output_format}"))
+    read = pd.read_parquet if output_format == "parquet" else pd.read_csv
+    return pd.concat([read(part) for part in parts], ignore_index=True)
+
+class TestBatchScore:
+    
+    @pytest.fixture()
+    def setup(self, model_artifacts, vehicles):
+        factory = functools.partial(ModelHandler, **model_artifacts, version_check_interval=None)
+        expected = factory().predict_batch(vehicles.to_dict(orient="records"))
+        return factory, expected
+    
+    def test_csv_chunks(self, setup, vehicles, tmp_path):
+        factory, expected = setup
+        vehicles.to_csv(tmp_path / "vehicles.csv", index=False)
+        summary = score_file(tmp_path / "vehicles.csv", tmp_path / "scored", factory, chunksize=64, progress=False)
+        
+        assert summary["rows"] == len(vehicles) and summary["chunks"] == 5, "Every row should be scored once, in chunks"
+        scored = read_parts(tmp_path / "scored")
+        pd.testing.assert_frame_equal(scored[vehicles.columns], vehicles, check_dtype=False)
+        np.testing.assert_allclose(scored[PREDICTION_COLUMN], expected, rtol=1e-5)
+    
+    def test_parquet_process_pool(self, setup, vehicles, tmp_path):
+        factory, expected = setup
+        vehicles.to_parquet(tmp_path / "vehicles.parquet", index=False)
+        summary = score_file(tmp_path / "vehicles.parquet", tmp_path / "scored", factory, chunksize=50, workers=2, progress=False)
+        
+        assert summary["chunks"] == 6
+        scored = read_parts(tmp_path / "scored", "parquet")
+        np.testing.assert_allclose(scored[PREDICTION_COLUMN], expected, rtol=1e-5)
+    
+    def test_resume(self, setup, vehicles, tmp_path):
+        factory, expected = setup
+        vehicles.to_csv(tmp_path / "vehicles.csv", index=False)
+        output_dir = tmp_path / "scored"
+        score_file(tmp_path / "vehicles.csv", output_dir, factory, chunksize=64, progress=False)
+        # An interrupted run: one chunk never finished and left a partial file behind
+        (output_dir / "part-000000000128.csv").rename(output_dir / "part-000000000128.csv.tmp")
+        
+        with pytest.raises(FileExistsError):
+            score_file(tmp_path / "vehicles.csv", output_dir, factory, chunksize=64, progress=False)
+        with pytest.raises(ValueError):
+            score_file(tmp_path / "vehicles.csv", output_dir, factory, chunksize=32, resume=True, progress=False)
+        summary = score_file(tmp_path / "vehicles.csv", output_dir, factory, chunksize=64, resume=True, progress=False)
+        
+        assert summary["chunks"] == 1 and summary["skipped_chunks"] == 4, "Only the missing chunk should be scored again"
+        assert (output_dir / MANIFEST_NAME).exists()
+        scored = read_parts(output_dir)
+        assert len(scored) == len(vehicles)
+        np.testing.assert_allclose(scored[PREDICTION_COLUMN], expected, rtol=1e-5)
+    
+    @pytest.mark.parametrize("input_format,workers", [("csv", 0), ("parquet", 2)])
+    def test_bad_rows_do_not_stop_the_job(self, setup, vehicles, tmp_path, input_format, workers):
+        factory, expected = setup
+        # Bad rows in the middle of the second chunk
+        bad = vehicles.astype({"Kilometres": str})
+        bad.loc[70, "FuelType"] = "Electric"
+        bad.loc[90, "Kilometres"] = "unknown"
+        path = tmp_path / f"vehicles.{input_format}"
+        bad.to_parquet(path, index=False) if input_format == "parquet" else bad.to_csv(path, index=False)
+        summary = score_file(path, tmp_path / "scored", factory, chunksize=64, workers=workers, progress=False)
+        
+        assert summary["rows"] == len(vehicles) and summary["error_rows"] == 2, "Bad rows should be counted, not abort the job"
+        scored = read_parts(tmp_path / "scored", input_format)
+        assert scored[PREDICTION_COLUMN].isna().to_numpy().nonzero()[0].tolist() == [70, 90]
+        assert scored.loc[70, ERROR_COLUMN] == "Unknown category in column FuelType"
+        assert scored.loc[90, ERROR_COLUMN] == "Non-numeric value in column Kilometres"
+        good = np.ones(len(vehicles), dtype=bool)
+        good[[70, 90]] = False
+        assert scored[ERROR_COLUMN][good].isna().all()
+        np.testing.assert_allclose(scored[PREDICTION_COLUMN][good], np.asarray(expected)[good], rtol=1e-5)
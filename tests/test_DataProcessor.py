@@ -1,7 +1,10 @@
 import pytest
+import numpy as np
 import pandas as pd
 
-from scripts.train import DataProcessor
+from scripts.train import DataProcessor, StreamingDataProcessor
+from benchmarks.reference_data_processor import (ReferenceDataProcessor, clean, COLS_TO_DROP, COLS_FOR_CONVERT_TO_INT,
+                                             COLS_FOR_CONVERT_TO_FLOAT, COLS_TO_INT)
 
 class TestDataProcessor:
     
@@ -98,3 +101,80 @@ class TestDataProcessor:
         assert result["FuelConsumption"].iloc[1] == 12, "The 'FuelConsumption' column filter did not work correctly."
         assert result["CylindersinEngine"].iloc[0] == 4, "The 'CylindersinEngine' column filter did not work correctly."
         assert result["Seats"].iloc[1] == 7, "The 'Seats' column filter did not work correctly."
+
+class TestDataProcessorParity:
+    
+    @pytest.fixture
+    def setup(self):
+        from scripts.dummy_artifacts import make_raw_listings
+        
+        raw = make_raw_listings(5000, seed=7)
+        # Values whose string form has a dash only in some representations
+        raw.loc[:9, "Year"] = [-0.0, 1e-05, 0.0001, -3.0, np.nan, 2015.0, 1e16, -np.inf, 2016.5, 2017.0]
+        raw["Negative"] = np.arange(len(raw)) - 5
+        return raw
+    
+    def run(self, processor_class, raw):
+        df, _ = clean(processor_class, raw.copy())
+        return df
+    
+    def test_matches_reference(self, setup):
+        raw = setup
+        expected = self.run(ReferenceDataProcessor, raw)
+        result = self.run(DataProcessor, raw)
+        
+        assert len(result) > 1000, "Most synthetic listings should survive cleaning"
+        pd.testing.assert_frame_equal(result, expected)
+    
+    def test_dash_detection_matches_string_representation(self, setup):
+        raw = setup
+        for col in ["Year", "Negative", "Kilometres", "Seats"]:
+            expected = raw[col].astype(str).str.contains('-').to_numpy()
+            assert (DataProcessor.contains_dash(raw[col]) == expected).all(), f"Dash mask differs for column {col}"
+    
+    def test_most_frequent_matches_value_counts(self, setup):
+        raw = setup
+        for col in ["Brand", "BodyType", "Doors", "Seats"]:
+            assert DataProcessor.most_frequent(raw[col]) == raw[col].value_counts().index[0]
+
+class TestStreamingDataProcessor:
+    
+    @pytest.fixture
+    def setup(self, tmp_path):
+        from scripts.dummy_artifacts import make_raw_listings
+        
+        path = tmp_path / "listings.csv"
+        make_raw_listings(5000, seed=11).to_csv(path, index=False)
+        return path
+    
+    def process(self, path, chunksize):
+        return StreamingDataProcessor(path, chunksize).process(COLS_TO_DROP, COLS_FOR_CONVERT_TO_INT, COLS_FOR_CONVERT_TO_FLOAT, COLS_TO_INT)
+    
+    def test_matches_in_memory_cleaning(self, setup):
+        path = setup
+        result = self.process(path, chunksize=701)
+        expected = DataProcessor(pd.read_csv(path)).drop_unnecessary_and_NA_values(COLS_TO_DROP)\
+            .remove_dash_symbol()\
+            .remove_POA_values()\
+            .from_cat_to_int(COLS_FOR_CONVERT_TO_INT)\
+            .from_cat_to_float(COLS_FOR_CONVERT_TO_FLOAT)\
+            .convert_to_int(COLS_TO_INT)\
+            .get_dataframe()
+        
+        categorical = [col for col in result.columns if result[col].dtype == "category"]
+        assert categorical == ["Brand", "UsedOrNew", "Transmission", "DriveType", "FuelType", "BodyType"]
+        assert result["FuelConsumption"].dtype == np.float32 and result["Kilometres"].dtype == np.int32
+        pd.testing.assert_frame_equal(result.astype({col: object for col in categorical}), expected, check_dtype=False, rtol=1e-6)
+    
+    def test_fill_values_do_not_depend_on_chunks(self, setup):
+        path = setup
+        pd.testing.assert_frame_equal(self.process(path, chunksize=333), self.process(path, chunksize=100000))
+    
+    def test_empty_column_is_reported(self, setup):
+        path = setup
+        listings = pd.read_csv(path)
+        listings["Seats"] = np.nan
+        listings.to_csv(path, index=False)
+        
+        with pytest.raises(ValueError, match="Seats"):
+            self.process(path, chunksize=701)
@@ -45,3 +45,21 @@ class TestEncoder:
 
         assert result["UsedOrNew"].iloc[0] != result["UsedOrNew"].iloc[2], "Label encoding did not assign unique integers to 'UsedOrNew'."
         assert result["BodyType"].iloc[0] != result["BodyType"].iloc[1], "Label encoding did not assign unique integers to 'BodyType'."
+    
+    def test_categorical_encode(self, setup):
+        encoder = setup
+        categorical_cols = ["Brand", "BodyType"]
+        result = encoder.categorical_encode(categorical_cols, save_model=False).get_dataframe()
+        
+        assert list(result.columns) == ["Brand", "Model", "UsedOrNew", "BodyType", "Year"], "Categorical encoding should not widen the frame."
+        assert isinstance(result["Brand"].dtype, pd.CategoricalDtype), "'Brand' should be a categorical column."
+        assert encoder.vocabulary == {"Brand": ["BMW", "Honda", "Toyota"], "BodyType": ["SUV", "Wagon"]}, "Every column should keep its own vocabulary."
+        assert list(result["BodyType"].cat.codes) == [0, 1, 1], "Categorical codes for 'BodyType' are incorrect."
+    
+    def test_encoders_saved_to_output_dir(self, setup, tmp_path):
+        encoder = setup
+        encoder.output_dir = str(tmp_path / "nested" / "ml_models")
+        encoder.one_hot_encode(["UsedOrNew"]).label_encode(["BodyType"])
+        
+        assert sorted(path.name for path in (tmp_path / "nested" / "ml_models").iterdir()) == ["Label_encoder.pkl", "OneHot_encoder.pkl"], \
+            "Encoders should be saved to a missing output folder."
@@ -0,0 +1,53 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+from scripts.feature_store import FeatureStore
+
+class TestFeatureStore:
+    
+    @pytest.fixture()
+    def setup(self, tmp_path):
+        data_path = tmp_path / "listings.csv"
+        data_path.write_text("Brand,Price\nToyota,20000\nFord,15000\n")
+        features = pd.DataFrame({
+            "Year": np.arange(100, dtype=np.int32),
+            "FuelConsumption": np.linspace(3, 20, 100, dtype=np.float32),
+            "Brand": np.arange(100) % 5,
+        })
+        return FeatureStore(tmp_path / "features"), data_path, features
+    
+    def test_key_depends_on_input_and_config(self, setup):
+        store, data_path, _ = setup
+        key = store.key(data_path, {"cols_to_drop": ["Title"]})
+        
+        assert key == store.key(data_path, {"cols_to_drop": ["Title"]}), "Key should be stable for the same input and config"
+        assert key != store.key(data_path, {"cols_to_drop": ["Title", "Model"]}), "Config changes should change the key"
+        data_path.write_text("Brand,Price\nToyota,20000\nFord,16000\n")
+        assert key != store.key(data_path, {"cols_to_drop": ["Title"]}), "Input changes should change the key"
+    
+    def test_save_and_load(self, setup, tmp_path):
+        store, data_path, features = setup
+        encoder_path = tmp_path / "ml_models" / "encoder.pkl"
+        os.makedirs(encoder_path.parent)
+        encoder_path.write_bytes(b"fitted")
+        key = store.key(data_path, {})
+        
+        assert store.load(key) is None, "Nothing should be cached yet"
+        store.save(key, features, artifacts=[encoder_path])
+        encoder_path.write_bytes(b"refitted on other data")
+        loaded = store.load(key, restore_artifacts=[encoder_path])
+        
+        pd.testing.assert_frame_equal(loaded, features)
+        assert not loaded["Year"].to_numpy().flags.writeable, "Numeric columns should be memory-mapped, not copied"
+        assert encoder_path.read_bytes() == b"fitted", "Encoders fitted with the cached features should be restored"
+        assert not [name for name in os.listdir(store.folder) if name.startswith(".")], "No staging folders should be left"
+    
+    def test_save_replaces_existing_entry(self, setup):
+        store, data_path, features = setup
+        key = store.key(data_path, {})
+        store.save(key, features)
+        store.save(key, features.iloc[:10])
+        
+        assert len(store.load(key)) == 10
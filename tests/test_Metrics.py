@@ -0,0 +1,96 @@
+import re
+import pytest
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.metrics import MetricsRegistry, Counter, Histogram, Gauge, REGISTRY, _LabelledMetric
+from app.database.database import db
+from app.models import User, Prediction
+from app.auth.oauth2 import create_access_token
+
+def sample(text: str, name: str, **labels) -> float:
+    # Value of the sample with exactly these labels
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}{re.escape('{' + label_text + '}') if labels else ''} (\S+)$", text, re.MULTILINE)
+    assert match is not None, f"{name} {labels} not found in\n{text}"
+    return float(match.group(1))
+
+class TestMetrics:
+
+    def test_text_format(self):
+        registry = MetricsRegistry()
+        requests = registry.register(Counter("requests", "Requests", ("route",)))
+        latency = registry.register(Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0)))
+        pool = registry.register(Gauge("pool", "Pool", ("state",)))
+        pool.set_function(lambda: {("checked_out",): 3})
+
+        requests.labels('/a"b').inc()
+        requests.labels('/a"b').inc(2)
+        for value in [0.05, 0.5, 5.0]:
+            latency.labels("/a").observe(value)
+        text = registry.render()
+
+        assert "# TYPE requests counter" in text and "# TYPE latency_seconds histogram" in text
+        assert sample(text, "requests_total", route='/a\\"b') == 3, "Label values should be escaped"
+        assert sample(text, "latency_seconds_bucket", route="/a", le="0.1") == 1
+        assert sample(text, "latency_seconds_bucket", route="/a", le="1.0") == 2, "Buckets should be cumulative"
+        assert sample(text, "latency_seconds_bucket", route="/a", le="+Inf") == 3
+        assert sample(text, "latency_seconds_count", route="/a") == 3
+        assert sample(text, "latency_seconds_sum", route="/a") == pytest.approx(5.55)
+        assert sample(text, "pool", state="checked_out") == 3
+
+    def test_label_count_checked(self):
+        with pytest.raises(ValueError):
+            Counter("requests", "Requests", ("route", "status")).labels("/a")
+
+    def test_gauge_labels_rejected(self):
+        gauge = Gauge("pool", "Pool", ("state",))
+        with pytest.raises(ValueError, match="set_function"):
+            gauge.labels("checked_out")
+
+    def test_metric_types_implement_children(self):
+        class Incomplete(_LabelledMetric):
+            kind = "counter"
+
+        with pytest.raises(TypeError):
+            Incomplete("incomplete", "Incomplete")
+
+    @pytest.fixture()
+    def setup(self, serving_registry):
+        session = db.get_session()
+        user = User(email="metrics@example.com", password="metrics-hash")
+        session.add(user)
+        session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(data={'user_id': user.id})}"}
+        yield serving_registry, headers
+        session.query(Prediction).filter(Prediction.owner_id == user.id).delete()
+        session.delete(user)
+        session.commit()
+        session.close()
+
+    def test_predict_stages(self, setup, vehicles):
+        registry, headers = setup
+        client = TestClient(app)
+        record = vehicles.astype(object).iloc[0].to_dict()
+        for _ in range(3):
+            response = client.post("/predict/", json=record, headers=headers)
+            assert response.status_code == 201, response.text
+        client.get("/predict/12345678", headers=headers)
+
+        response = client.get("/metrics")
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        version = registry.model_version
+        assert sample(text, "http_requests_total", method="POST", route="/predict/", status="201") >= 3
+        assert sample(text, "http_requests_total", method="GET", route="/predict/{id}", status="404") >= 1, \
+            "Routes should be labelled with their template"
+        for stage in ["auth", "validation", "db_commit"]:
+            assert sample(text, "http_request_stage_seconds_count", route="/predict/", stage=stage) >= 3, f"{stage} should be timed"
+        for stage in ["encode", "predict"]:
+            assert sample(text, "model_stage_seconds_count", stage=stage, model_version=version) >= 3, f"{stage} should be timed"
+        assert sample(text, "model_predictions_total", model_version=version) >= 3
+        assert sample(text, "model_info", model_version=version) == 1
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(REGISTRY, "enabled", False)
+        assert TestClient(app).get("/metrics").status_code == 404
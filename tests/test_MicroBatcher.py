@@ -0,0 +1,85 @@
+import pytest
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from app.services.batcher import MicroBatcher
+
+class TestMicroBatcher:
+    
+    @pytest.fixture()
+    def setup(self):
+        calls = []
+        
+        def predict_fn(model, records):
+            calls.append(len(records))
+            return [record["value"] * 2.0 for record in records]
+        
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50).start()
+        yield batcher, calls
+        batcher.stop()
+    
+    def test_concurrent_requests_are_batched(self, setup):
+        batcher, calls = setup
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda i: batcher.predict({"value": i}), range(32)))
+        
+        assert results == [[i * 2.0] for i in range(32)], "Every caller should get its own prediction back"
+        assert sum(calls) == 32, "Every request should be scored exactly once"
+        assert max(calls) > 1, "Concurrent requests should be scored together"
+        assert max(calls) <= 8, "Batches should not exceed max_batch_size"
+        
+        metrics = batcher.metrics()
+        assert metrics["items_total"] == 32
+        assert metrics["batches_total"] == len(calls)
+        assert metrics["queue_depth"] == 0
+    
+    def test_single_request_waits_at_most_max_wait(self, setup):
+        batcher, calls = setup
+        assert batcher.predict({"value": 1}) == [2.0]
+        assert calls == [1], "A lone request should be flushed once the wait window expires"
+    
+    def test_errors_are_propagated(self):
+        def predict_fn(model, records):
+            raise RuntimeError("model failure")
+        
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=1).start()
+        try:
+            with pytest.raises(RuntimeError):
+                batcher.predict({"value": 1})
+            assert batcher.metrics()["errors_total"] == 1
+        finally:
+            batcher.stop()
+    
+    def test_stop_flushes_pending_requests(self):
+        release = threading.Event()
+        
+        def predict_fn(model, records):
+            release.wait()
+            return [0.0 for _ in records]
+        
+        batcher = MicroBatcher(predict_fn, max_batch_size=2, max_wait_ms=1).start()
+        futures = [batcher.submit({"value": i}) for i in range(5)]
+        release.set()
+        batcher.stop()
+        
+        assert all(future.done() for future in futures), "Pending requests should be scored before the batcher stops"
+        with pytest.raises(RuntimeError):
+            batcher.submit({"value": 1})
+    
+    def test_requests_are_scored_by_their_model(self):
+        calls = []
+        
+        def predict_fn(model, records):
+            calls.append((model, len(records)))
+            return [record["value"] * model for record in records]
+        
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50).start()
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda i: batcher.predict({"value": i}, 2.0 if i % 2 else 3.0), range(16)))
+        finally:
+            batcher.stop()
+        
+        assert results == [[i * (2.0 if i % 2 else 3.0)] for i in range(16)], "Every request should be scored by its own model"
+        assert sum(size for _, size in calls) == 16
+        assert {model for model, _ in calls} == {2.0, 3.0}, "Each model call should only get the requests of that model"
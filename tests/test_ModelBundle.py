@@ -0,0 +1,72 @@
+import pytest
+import pickle
+import numpy as np
+
+from app.services.model_bundle import ModelBundle, save_bundle, BUNDLE_FORMAT_VERSION
+from app.services.model_handler import ModelHandler
+from app.services.predictors import BoosterPredictor, NumpyTreePredictor
+
+class TestModelBundle:
+    
+    @pytest.fixture()
+    def setup(self, model_artifacts, tmp_path):
+        model_handler = ModelHandler(**model_artifacts)
+        with open(model_artifacts["model_path"], "rb") as file:
+            model = pickle.load(file)
+        header = save_bundle(tmp_path / "models" / "xgb_model.bundle", model, model_handler.encoding_tables,
+                             metadata={"metrics": {"rmse": 1.5}, "training_data_digest": "abc"})
+        return model_handler, tmp_path / "models" / "xgb_model.bundle", header
+    
+    @pytest.fixture()
+    def records(self, vehicles):
+        return vehicles.head(50).to_dict(orient="records")
+    
+    def test_round_trip(self, setup):
+        model_handler, bundle_path, header = setup
+        bundle = ModelBundle.load(bundle_path)
+        
+        assert bundle.model_version == header["model_version"] and header["format_version"] == BUNDLE_FORMAT_VERSION
+        assert bundle.metadata == {"metrics": {"rmse": 1.5}, "training_data_digest": "abc"}
+        assert bundle.feature_names == model_handler.encoding_tables.feature_names
+        assert all(isinstance(array, np.memmap) for array in bundle.arrays.values()), "Bundle arrays should be memory-mapped"
+        assert [path.name for path in bundle_path.parent.iterdir()] == ["xgb_model.bundle"], "No temporary files should be left behind"
+    
+    @pytest.mark.parametrize("model_format", ["booster", "numpy"])
+    def test_predictions_match_separate_artifacts(self, setup, records, model_format):
+        model_handler, bundle_path, _ = setup
+        bundle_handler = ModelHandler(bundle_path=bundle_path, model_format=model_format)
+        
+        assert bundle_handler.artifact_paths() == [bundle_path]
+        np.testing.assert_array_equal(bundle_handler.encoding_tables.encode_batch(records), model_handler.encoding_tables.encode_batch(records))
+        np.testing.assert_allclose(bundle_handler.predict_batch(records), model_handler.predict_batch(records), rtol=1e-5)
+    
+    def test_default_format_serves_mapped_trees(self, setup):
+        _, bundle_path, _ = setup
+        # The default MODEL_FORMAT is pickle, a bundle serves it from the shared memory-mapped arrays
+        model = ModelHandler(bundle_path=bundle_path).model
+        assert isinstance(model, NumpyTreePredictor), "The default format should evaluate the mapped trees"
+        assert isinstance(model.value, np.memmap), "Tree arrays should not be copied into the worker"
+        assert isinstance(ModelHandler(bundle_path=bundle_path, model_format="booster").model, BoosterPredictor)
+    
+    def test_categorical_bundle_has_no_numpy_trees(self, categorical_model_artifacts, records, tmp_path):
+        model_handler = ModelHandler(**categorical_model_artifacts)
+        with open(categorical_model_artifacts["model_path"], "rb") as file:
+            save_bundle(tmp_path / "xgb_model.bundle", pickle.load(file), model_handler.encoding_tables)
+        
+        with pytest.raises(ValueError):
+            ModelBundle.load(tmp_path / "xgb_model.bundle").predictor("numpy")
+        assert isinstance(ModelHandler(bundle_path=tmp_path / "xgb_model.bundle").model, BoosterPredictor), \
+            "Without NumPy trees the default format should fall back to the booster"
+        records = [dict(records[0], Brand="Unknown brand")] + records[1:]
+        bundle_handler = ModelHandler(bundle_path=tmp_path / "xgb_model.bundle", model_format="booster")
+        np.testing.assert_allclose(bundle_handler.predict_batch(records), model_handler.predict_batch(records), rtol=1e-5)
+    
+    def test_rejects_other_files(self, model_artifacts):
+        with pytest.raises(ValueError):
+            ModelBundle.load(model_artifacts["model_path"])
+    
+    def test_rejects_newer_format(self, setup, monkeypatch):
+        _, bundle_path, _ = setup
+        monkeypatch.setattr("app.services.model_bundle.BUNDLE_FORMAT_VERSION", BUNDLE_FORMAT_VERSION - 1)
+        with pytest.raises(ValueError):
+            ModelBundle.load(bundle_path)
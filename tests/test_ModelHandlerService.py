@@ -0,0 +1,117 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from app.services.encoding import INPUT_COLS
+from app.services.model_handler import ModelHandler
+
+class TestModelHandlerService:
+    
+    @pytest.fixture()
+    def setup(self, model_artifacts):
+        return ModelHandler(**model_artifacts)
+    
+    @pytest.fixture()
+    def records(self, vehicles):
+        return vehicles.head(50).to_dict(orient="records")
+    
+    def test_predict_batch_matches_predict(self, setup, records):
+        model_handler = setup
+        batch_predictions = model_handler.predict_batch(records)
+        
+        assert len(batch_predictions) == len(records), "Batch prediction should return one price per record"
+        single_predictions = [model_handler.predict(record)[0] for record in records]
+        np.testing.assert_allclose(batch_predictions, single_predictions, rtol=1e-6)
+    
+    def test_predict_batch_unknown_labels(self, setup, records):
+        model_handler = setup
+        records = [dict(records[0], Brand="Unknown brand", BodyType="Unknown body"), records[1]]
+        batch_predictions = model_handler.predict_batch(records)
+        
+        reference = model_handler.model.predict(model_handler.process_batch_data(records))
+        np.testing.assert_allclose(batch_predictions, reference, rtol=1e-6)
+    
+    def test_predict_batch_empty(self, setup):
+        model_handler = setup
+        assert model_handler.predict_batch([]) == [], "Empty batch should return no predictions"
+    
+    def test_encoding_tables_parity(self, setup, records):
+        model_handler = setup
+        reference = model_handler.process_batch_data(records)[model_handler.encoding_tables.feature_names]
+        
+        np.testing.assert_array_equal(model_handler.encoding_tables.encode_batch(records), reference.to_numpy(dtype=np.float32))
+        for i, record in enumerate(records[:10]):
+            reference_row = model_handler.process_input_data(record)[model_handler.encoding_tables.feature_names]
+            np.testing.assert_array_equal(model_handler.encoding_tables.encode_row(record), reference_row.to_numpy(dtype=np.float32))
+    
+    def test_encode_frame_parity(self, setup, records):
+        model_handler = setup
+        records = [dict(records[0], Brand="Unknown brand", BodyType=None)] + records[1:]
+        frame = pd.DataFrame.from_records(records)
+        
+        np.testing.assert_array_equal(model_handler.encoding_tables.encode_frame(frame), model_handler.encoding_tables.encode_batch(records))
+        np.testing.assert_allclose(model_handler.predict_frame(frame), model_handler.predict_batch(records), rtol=1e-6)
+        with pytest.raises(ValueError):
+            model_handler.encoding_tables.encode_frame(frame.assign(FuelType="Electric"))
+    
+    def test_predict_parity_with_reference(self, setup, records):
+        model_handler = setup
+        for record in records[:10]:
+            reference = model_handler.model.predict(model_handler.process_input_data(record))
+            assert model_handler.predict(record) == reference.tolist(), "Prediction differs from the pandas reference path"
+    
+    def test_encoding_tables_unknown_one_hot_category(self, setup, records):
+        model_handler = setup
+        with pytest.raises(ValueError):
+            model_handler.predict(dict(records[0], FuelType="Electric"))
+
+class TestCategoricalModelHandlerService:
+    
+    @pytest.fixture()
+    def setup(self, categorical_model_artifacts):
+        return ModelHandler(**categorical_model_artifacts)
+    
+    @pytest.fixture()
+    def records(self, vehicles):
+        return vehicles.head(50).to_dict(orient="records")
+    
+    def test_one_feature_per_column(self, setup):
+        model_handler = setup
+        assert model_handler.encoding_tables.n_features == len(INPUT_COLS), "Native categories should not widen the feature row"
+        assert model_handler.one_hot_encoder is None and model_handler.label_encoder is None
+    
+    def test_encoding_tables_parity(self, setup, records):
+        model_handler = setup
+        records = [dict(records[0], Brand="Unknown brand", FuelType="Electric")] + records[1:]
+        reference = model_handler.process_batch_data(records)[model_handler.encoding_tables.feature_names]
+        
+        np.testing.assert_array_equal(model_handler.encoding_tables.encode_batch(records), reference.to_numpy(dtype=np.float32))
+        for record in records[:10]:
+            reference_row = model_handler.process_input_data(record)[model_handler.encoding_tables.feature_names]
+            np.testing.assert_array_equal(model_handler.encoding_tables.encode_row(record), reference_row.to_numpy(dtype=np.float32))
+    
+    def test_encode_frame_parity(self, setup, records):
+        model_handler = setup
+        records = [dict(records[0], Brand="Unknown brand", FuelType=None)] + records[1:]
+        frame = pd.DataFrame.from_records(records)
+        np.testing.assert_array_equal(model_handler.encoding_tables.encode_frame(frame), model_handler.encoding_tables.encode_batch(records))
+    
+    def test_unknown_categories_are_missing(self, setup, records):
+        model_handler = setup
+        record = dict(records[0], Brand="Unknown brand", FuelType="Electric")
+        features = model_handler.encoding_tables.encode_row(record)[0]
+        
+        feature_names = model_handler.encoding_tables.feature_names
+        assert np.isnan(features[feature_names.index("Brand")]) and np.isnan(features[feature_names.index("FuelType")])
+        booster = model_handler.model.get_booster()
+        np.testing.assert_allclose(model_handler.predict(record), booster.inplace_predict(features[None, :]), rtol=1e-6)
+    
+    def test_predict_batch_matches_predict(self, setup, records):
+        model_handler = setup
+        batch_predictions = model_handler.predict_batch(records)
+        single_predictions = [model_handler.predict(record)[0] for record in records]
+        np.testing.assert_allclose(batch_predictions, single_predictions, rtol=1e-6)
+    
+    def test_artifact_version_tracks_vocabulary(self, setup, categorical_model_artifacts):
+        model_handler = setup
+        assert model_handler.artifact_paths() == [categorical_model_artifacts["model_path"], categorical_model_artifacts["category_vocabulary_path"]]
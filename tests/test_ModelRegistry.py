@@ -0,0 +1,131 @@
+import os
+import shutil
+import threading
+import time
+import pytest
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.model_handler import ModelHandler
+from app.services.model_registry import ModelRegistry, DEFAULT_GOLDEN_RECORDS
+from app.services.prediction_cache import PredictionCache
+from scripts.dummy_artifacts import build_dummy_artifacts
+
+@pytest.fixture(scope="module")
+def retrained_model(tmp_path_factory):
+    return build_dummy_artifacts(tmp_path_factory.mktemp("ml_models_retrained"), n_estimators=40)["model_path"]
+
+class TestModelRegistry:
+
+    @pytest.fixture()
+    def setup(self, model_artifacts, tmp_path):
+        # Private copies of the artifacts, the tests redeploy the model file
+        paths = {}
+        for key, path in model_artifacts.items():
+            paths[key] = tmp_path / path.name
+            shutil.copy(path, paths[key])
+        registry = ModelRegistry(lambda: ModelHandler(**paths, version_check_interval=None), cache=PredictionCache(maxsize=100))
+        registry.load()
+        yield registry, paths
+        registry.stop_watcher()
+
+    def deploy(self, source, target):
+        shutil.copy(source, target)
+        # Copies within the same second can keep the modification time, the fingerprint has to change
+        os.utime(target, ns=(0, time.time_ns() + 10 ** 9))
+
+    def test_reload_swaps_model(self, setup, retrained_model):
+        registry, paths = setup
+        previous = registry.active
+        before = previous.predict_batch(DEFAULT_GOLDEN_RECORDS)
+
+        self.deploy(retrained_model, paths["model_path"])
+        result = registry.reload()
+
+        assert result["status"] == "reloaded", result
+        assert result["previous_version"] == previous.model_version
+        assert registry.active is not previous, "A new handler should be swapped in"
+        assert registry.model_version == registry.active.artifact_version()
+        assert registry.active.predict_batch(DEFAULT_GOLDEN_RECORDS) != before, "The retrained model should be serving"
+        assert previous.predict_batch(DEFAULT_GOLDEN_RECORDS) == before, "Requests holding the old handler should still complete"
+        assert registry.active.cache is registry.cache, "The shared cache should move to the new handler"
+
+    def test_unchanged_artifacts(self, setup):
+        registry, _ = setup
+        active = registry.active
+        assert registry.reload()["status"] == "unchanged"
+        assert registry.active is active, "Identical artifacts should not be swapped"
+
+    def test_rejects_broken_artifact(self, setup):
+        registry, paths = setup
+        active = registry.active
+        with open(paths["model_path"], "wb") as file:
+            file.write(b"not a model")
+
+        result = registry.reload()
+        assert result["status"] == "rejected", result
+        assert registry.active is active, "The previous model should keep serving"
+        assert registry.rejected_total == 1
+        assert registry.status()["last_reload"]["status"] == "rejected"
+
+    def test_rejects_failed_golden_set(self, setup, retrained_model):
+        registry, paths = setup
+        active = registry.active
+        registry.golden_records = [dict(record, expected_price=prediction) for record, prediction
+                                   in zip(DEFAULT_GOLDEN_RECORDS, active.predict_batch(DEFAULT_GOLDEN_RECORDS))]
+        registry.tolerance = 1e-6
+
+        self.deploy(retrained_model, paths["model_path"])
+        assert registry.reload()["status"] == "rejected", "Predictions away from the expected prices should be rejected"
+        assert registry.active is active
+
+        registry.max_price = -1
+        with pytest.raises(Exception, match="outside"):
+            registry.validate(active)
+
+    def test_predictions_continue_during_reload(self, setup, retrained_model):
+        registry, paths = setup
+        record = DEFAULT_GOLDEN_RECORDS[0]
+        old = registry.active.predict(record)
+        errors = []
+        results = []
+        stop = threading.Event()
+
+        def predict():
+            while not stop.is_set():
+                try:
+                    results.append(registry.active.predict(record))
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=predict) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        self.deploy(retrained_model, paths["model_path"])
+        result = registry.reload()
+        time.sleep(0.05)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        new = registry.active.predict(record)
+        assert result["status"] == "reloaded"
+        assert not errors, errors
+        assert {tuple(prediction) for prediction in results} <= {tuple(old), tuple(new)}, "Every request should be scored by one complete model"
+
+    def test_watcher_reloads_changed_artifacts(self, setup, retrained_model):
+        registry, paths = setup
+        version = registry.model_version
+        registry.start_watcher(0.05)
+        self.deploy(retrained_model, paths["model_path"])
+
+        deadline = time.monotonic() + 10
+        while registry.model_version == version and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert registry.model_version != version, "The watcher should reload the redeployed model"
+        assert registry.reloads_total == 1
+
+    def test_admin_endpoints_require_token(self):
+        client = TestClient(app)
+        assert client.post("/predict/admin/reload").status_code == 403
+        assert client.get("/predict/admin/model", headers={"X-Admin-Token": "wrong"}).status_code == 403
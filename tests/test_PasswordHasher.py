@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import pytest
+
+from app.core import security
+from app.core.security import PasswordHasher, HashingPoolBusy
+
+class TestPasswordHasher:
+    
+    @pytest.fixture()
+    def setup(self):
+        hasher = PasswordHasher(max_workers=2, max_pending=1)
+        yield hasher
+        hasher.shutdown()
+    
+    def test_hash_and_verify(self, setup):
+        hasher = setup
+        
+        async def roundtrip():
+            hashed = await hasher.hash("secret")
+            return hashed, await hasher.verify("secret", hashed), await hasher.verify("wrong", hashed)
+        hashed, valid, invalid = asyncio.run(roundtrip())
+        
+        assert hashed != "secret" and security.verify("secret", hashed), "Hash should be a bcrypt hash of the password"
+        assert valid and not invalid
+        stats = hasher.stats()
+        assert stats["completed_total"] == 3 and stats["in_flight"] == 0
+        assert stats["queue_seconds_max"] >= 0 and stats["run_seconds_avg"] > 0
+    
+    def test_rejects_when_pool_is_saturated(self, setup, monkeypatch):
+        hasher = setup
+        release = threading.Event()
+        monkeypatch.setattr(security, "hash", lambda password: release.wait(5) and password)
+        
+        async def burst():
+            tasks = [asyncio.create_task(hasher.hash(str(i))) for i in range(5)]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        results = asyncio.run(burst())
+        
+        rejected = [result for result in results if isinstance(result, HashingPoolBusy)]
+        assert len(rejected) == 2, "Only max_workers + max_pending hashes should be admitted"
+        assert [result for result in results if isinstance(result, str)] == ["0", "1", "2"]
+        assert hasher.stats()["rejected_total"] == 2
+        assert hasher.stats()["queue_seconds_max"] > 0, "The pending hash should have waited for a worker"
+    
+    def test_inline_executor(self):
+        hasher = PasswordHasher(executor="inline")
+        hashed = asyncio.run(hasher.hash("secret"))
+        
+        assert asyncio.run(hasher.verify("secret", hashed))
+        assert hasher.stats()["submitted_total"] == 0, "Inline hashing should not go through the hashing pool"
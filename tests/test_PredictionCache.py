@@ -0,0 +1,112 @@
+import os
+import pytest
+import shutil
+
+from app.services.model_handler import ModelHandler
+from app.services.prediction_cache import PredictionCache, InMemoryCacheBackend, FileCacheBackend
+
+class TestPredictionCache:
+    
+    @pytest.fixture()
+    def setup(self, model_artifacts, tmp_path):
+        # Private copies of the artifacts, the test rewrites the model file
+        paths = {}
+        for key, path in model_artifacts.items():
+            paths[key] = tmp_path / path.name
+            shutil.copy(path, paths[key])
+        cache = PredictionCache(maxsize=100, ttl=60)
+        return ModelHandler(**paths, cache=cache, version_check_interval=0), cache, paths
+    
+    @pytest.fixture()
+    def records(self, vehicles):
+        return vehicles.head(20).to_dict(orient="records")
+    
+    def test_hits_and_misses(self, setup, records):
+        model_handler, cache, _ = setup
+        first = model_handler.predict_batch(records)
+        second = model_handler.predict_batch(records)
+        
+        assert first == second, "Cached predictions should be identical to computed ones"
+        assert cache.misses == len(records), "First pass should only miss"
+        assert cache.hits == len(records), "Second pass should only hit"
+        assert model_handler.predict(records[0]) == [first[0]]
+    
+    def test_lru_eviction(self):
+        backend = InMemoryCacheBackend(maxsize=2, ttl=60)
+        backend.set("a", 1.0)
+        backend.set("b", 2.0)
+        backend.get("a")
+        backend.set("c", 3.0)
+        
+        assert backend.get("b") is None, "Least recently used entry should be evicted"
+        assert backend.get("a") == 1.0
+        assert backend.evictions == 1
+    
+    def test_ttl_expiry(self):
+        backend = InMemoryCacheBackend(maxsize=2, ttl=-1)
+        backend.set("a", 1.0)
+        assert backend.get("a") is None, "Expired entry should not be returned"
+    
+    def test_kilometres_bucket(self, records):
+        cache = PredictionCache(kilometres_bucket=1000)
+        first = cache.canonicalize(dict(records[0], Kilometres=45120))
+        second = cache.canonicalize(dict(records[0], Kilometres=45980))
+        assert cache.key(first, "v1") == cache.key(second, "v1"), "Kilometres in the same bucket should share a key"
+        assert cache.key(first, "v1") != cache.key(first, "v2"), "Keys should depend on the model version"
+    
+    def test_invalidated_when_artifact_changes(self, setup, records):
+        model_handler, cache, paths = setup
+        model_handler.predict(records[0])
+        version = model_handler.model_version
+        
+        # A redeployed artifact, same content but a new modification time
+        os.utime(paths["model_path"], ns=(0, 1))
+        
+        model_handler.predict(records[0])
+        assert model_handler.model_version != version, "Model version should change with the artifact"
+        assert cache.misses == 2, "Cache should be invalidated after the artifact changed"
+    
+    def test_reload_during_a_request_keeps_its_model(self, setup, records, monkeypatch):
+        model_handler, cache, paths = setup
+        state = model_handler.state
+        encode_batch = state.encoding_tables.encode_batch
+        scored_by = []
+        
+        # The model is redeployed and reloaded between encoding the request and scoring it
+        def encode_and_redeploy(rows):
+            features = encode_batch(rows)
+            os.utime(paths["model_path"], ns=(0, 1))
+            assert model_handler.reload_if_changed(), "The redeployed model should be reloaded"
+            return features
+        
+        predict = state.model.predict
+        monkeypatch.setattr(state.encoding_tables, "encode_batch", encode_and_redeploy)
+        monkeypatch.setattr(state.model, "predict", lambda features: scored_by.append(state) or predict(features))
+        model_handler.predict_batch(records)
+        
+        assert scored_by == [state], "The request should be scored by the model its features were encoded for"
+        assert model_handler.state is not state, "The reload should have swapped in a new state"
+        assert model_handler.model_version != state.version
+    
+    def test_shared_file_backend(self, tmp_path, records):
+        first = PredictionCache(shared_backend=FileCacheBackend(tmp_path / "cache.sqlite"))
+        second = PredictionCache(shared_backend=FileCacheBackend(tmp_path / "cache.sqlite"))
+        key = first.key(records[0], "v1")
+        first.set(key, 12345.0)
+        
+        assert second.get(key) == 12345.0, "Entries should be shared through the file backend"
+        assert second.shared_hits == 1
+    
+    def test_file_backend_prunes_expired_and_oldest(self, tmp_path):
+        backend = FileCacheBackend(tmp_path / "cache.sqlite", ttl=60, maxsize=5, prune_every=10)
+        backend.ttl = -1
+        for i in range(5):
+            backend.set(f"expired-{i}", float(i))
+        backend.ttl = 60
+        for i in range(15):
+            backend.set(f"key-{i}", float(i))
+        
+        assert len(backend) <= 10, "Expired rows should be deleted and the rest capped every prune_every writes"
+        assert backend.get("expired-0") is None
+        assert backend.get("key-14") == 14.0, "The newest rows should be kept"
+        assert backend.get("key-0") is None, "The oldest rows beyond maxsize should be evicted"
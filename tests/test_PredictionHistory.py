@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import pytest
+
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from sqlalchemy import text
+from app.database.database import db, DatabaseSession
+from app.database.migrate import migrate
+from app.models import User, Prediction
+from app.auth.oauth2 import create_access_token
+from app.services.prediction_history import history_query, HISTORY_COLUMNS
+
+client = TestClient(app)
+
+class TestPredictionHistory:
+    
+    @pytest.fixture()
+    def setup(self):
+        session = db.get_session()
+        user = User(email="history@example.com", password="history-hash")
+        session.add(user)
+        session.commit()
+        start = datetime(2024, 1, 1)
+        # Pairs of rows share created_at, the prediction_id breaks the tie
+        session.add_all([Prediction(
+            brand="Toyota" if i % 2 else "Ford", production_year=2020, used_or_new="USED", transmission="Automatic",
+            drive_type="AWD", fuel_type="Diesel", fuel_consumption=7.5, kilometres=1000 * i, cylinder_in_engine=4,
+            body_type="SUV", doors=4, seats=5, prediction_price=20000 + i, owner_id=user.id,
+            created_at=start + timedelta(hours=i // 2)
+        ) for i in range(25)])
+        session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(data={'user_id': user.id})}"}
+        yield headers
+        session.query(Prediction).filter(Prediction.owner_id == user.id).delete()
+        session.delete(user)
+        session.commit()
+        session.close()
+    
+    def fetch_all(self, headers, **params):
+        pages = []
+        cursor = None
+        while True:
+            response = client.get("/predict/", headers=headers, params=dict(params, **({"cursor": cursor} if cursor else {})))
+            assert response.status_code == 200, response.text
+            pages.append(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                return pages
+            assert len(pages) < 100, "The cursor should advance to the next page"
+    
+    def test_keyset_pages(self, setup):
+        pages = self.fetch_all(setup, limit=10)
+        rows = [row for page in pages for row in page]
+        
+        assert [len(page) for page in pages] == [10, 10, 5], "History should be split into pages of limit rows"
+        assert len({row["prediction_id"] for row in rows}) == 25, "Every prediction should be returned exactly once"
+        keys = [(row["created_at"], row["prediction_id"]) for row in rows]
+        assert keys == sorted(keys, reverse=True), "History should be ordered newest first"
+    
+    def test_column_projection(self, setup):
+        response = client.get("/predict/", headers=setup, params={"fields": "brand,prediction_price", "limit": 5})
+        
+        assert response.status_code == 200, response.text
+        assert set(response.json()[0]) == {"prediction_id", "created_at", "brand", "prediction_price"}
+        
+        response = client.get("/predict/", headers=setup, params={"fields": "password"})
+        assert response.status_code == 400, "Unknown fields should be rejected"
+    
+    def test_filters(self, setup):
+        rows = [row for page in self.fetch_all(setup, brand="Ford", limit=4) for row in page]
+        assert len(rows) == 13 and all(row["brand"] == "Ford" for row in rows), "Brand filter should apply to every page"
+        
+        response = client.get("/predict/", headers=setup, params={"created_from": "2024-01-01T10:00:00"})
+        assert {row["created_at"] for row in response.json()} <= {f"2024-01-01T{hour}:00:00" for hour in range(10, 13)}
+        assert len(response.json()) == 5
+    
+    def test_pages_of_rows_written_by_the_route(self, serving_registry, vehicles):
+        # created_at comes from the server default here, stored by SQLite without microseconds
+        session = db.get_session()
+        user = User(email="history-route@example.com", password="history-route-hash")
+        session.add(user)
+        session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(data={'user_id': user.id})}"}
+        try:
+            for record in vehicles.head(6).to_dict(orient="records"):
+                assert client.post("/predict/", json=record, headers=headers).status_code == 201
+            pages = self.fetch_all(headers, limit=4)
+        finally:
+            session.query(Prediction).filter(Prediction.owner_id == user.id).delete()
+            session.delete(user)
+            session.commit()
+            session.close()
+        
+        ids = [row["prediction_id"] for page in pages for row in page]
+        assert [len(page) for page in pages] == [4, 2], "Following the cursor should reach the last page"
+        assert ids == sorted(set(ids), reverse=True), "Every prediction should be returned once, newest first"
+    
+    def test_invalid_cursor(self, setup):
+        response = client.get("/predict/", headers=setup, params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400, "Invalid cursors should be rejected"
+    
+    def test_export_ndjson(self, setup):
+        response = client.get("/predict/export", headers=setup)
+        
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 25, "Every prediction should be exported"
+        assert rows[0]["prediction_price"] == 20024.0
+    
+    def test_export_csv_gzip(self, setup):
+        response = client.get("/predict/export", headers=setup, params={"format": "csv", "compress": True, "brand": "Toyota",
+                                                                        "fields": "brand,kilometres"})
+        
+        assert response.status_code == 200, response.text
+        assert response.headers["content-encoding"] == "gzip", "Export should be compressed on the fly"
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 12 and all(row["brand"] == "Toyota" for row in rows)
+        assert set(rows[0]) == {"prediction_id", "created_at", "brand", "kilometres"}
+    
+    def test_index_added_to_existing_table(self, tmp_path):
+        # A database created before the history index existed gets it from the migration step
+        database = DatabaseSession(f"sqlite:///{tmp_path / 'app.sqlite'}")
+        database.init()
+        with database.engine.begin() as connection:
+            connection.execute(text("DROP INDEX ix_price_predictions_owner_id_prediction_id"))
+        migrate(database)
+        
+        with database.get_session() as session:
+            statement = history_query(session, 1, HISTORY_COLUMNS).statement
+            sql = str(statement.compile(database.engine, compile_kwargs={"literal_binds": True}))
+            plan = " ".join(str(row) for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert "ix_price_predictions_owner_id_prediction_id" in plan, "History queries should use the composite index"
@@ -0,0 +1,84 @@
+import pytest
+import threading
+import time
+
+from sqlalchemy import create_engine, Column, Integer, Float, select, func
+from sqlalchemy.orm import sessionmaker, declarative_base
+from app.services.prediction_writer import PredictionWriter
+
+Base = declarative_base()
+
+class Row(Base):
+    __tablename__ = "rows"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    value = Column(Float, nullable=False)
+
+class TestPredictionWriter:
+    
+    @pytest.fixture()
+    def setup(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'writer.sqlite'}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        return engine, session_factory
+    
+    def count(self, session_factory):
+        with session_factory() as session:
+            return session.execute(select(func.count()).select_from(Row)).scalar()
+    
+    def test_rows_are_flushed_on_stop(self, setup):
+        _, session_factory = setup
+        writer = PredictionWriter(session_factory, Row, batch_size=100, flush_interval=0.05).start()
+        for i in range(1000):
+            assert writer.submit({"value": float(i)}), "Row should be accepted by the writer"
+        writer.stop()
+        
+        assert self.count(session_factory) == 1000, "Every queued row should be written on shutdown"
+        assert writer.written_total == 1000
+        assert writer.batches_total >= 10, "Rows should be inserted in batches of at most batch_size"
+        assert not writer.submit({"value": 1.0}), "A stopped writer should not accept rows"
+    
+    def test_backpressure_when_queue_is_full(self, setup):
+        _, session_factory = setup
+        blocked = threading.Event()
+        
+        def slow_session_factory():
+            blocked.wait()
+            return session_factory()
+        
+        writer = PredictionWriter(slow_session_factory, Row, max_queue_size=2, batch_size=1, put_timeout=0.01).start()
+        results = [writer.submit({"value": float(i)}) for i in range(10)]
+        blocked.set()
+        writer.stop()
+        
+        assert not all(results), "Rows should be rejected once the bounded queue is full"
+        assert writer.rejected_total == results.count(False)
+        assert self.count(session_factory) == results.count(True), "Every accepted row should be written"
+    
+    def test_failed_batches_are_counted(self, setup):
+        _, session_factory = setup
+        writer = PredictionWriter(session_factory, Row, max_retries=1, flush_interval=0.01).start()
+        writer.submit({"value": None})
+        writer.stop()
+        
+        assert writer.failed_total == 1, "Rows of a batch that cannot be written should be counted as failed"
+    
+    def test_rows_submitted_during_stop_are_not_lost(self, setup):
+        _, session_factory = setup
+        writer = PredictionWriter(session_factory, Row, batch_size=50, flush_interval=0.01).start()
+        accepted = [0] * 4
+        
+        def submit_forever(index):
+            while writer.submit({"value": float(index)}):
+                accepted[index] += 1
+        
+        threads = [threading.Thread(target=submit_forever, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        while sum(accepted) < 100:
+            time.sleep(0.001)
+        writer.stop()
+        for thread in threads:
+            thread.join()
+        
+        assert self.count(session_factory) == sum(accepted), "Every row accepted while stopping should be written"
@@ -0,0 +1,62 @@
+import json
+import pytest
+import numpy as np
+
+from xgboost import XGBRegressor
+from app.services.model_handler import ModelHandler
+from app.services.predictors import BoosterPredictor, NumpyTreePredictor, load_predictor
+
+class TestPredictors:
+    
+    @pytest.fixture()
+    def setup(self, model_artifacts):
+        model_dir = model_artifacts["model_path"].parent
+        return model_artifacts, model_dir / "xgb_model.ubj", model_dir / "xgb_model.json"
+    
+    @pytest.fixture()
+    def features(self):
+        rng = np.random.default_rng(42)
+        X = rng.random((200, 5)).astype(np.float32)
+        X[rng.random((200, 5)) < 0.1] = np.nan
+        return X
+    
+    def test_formats_give_same_predictions(self, setup, vehicles):
+        model_artifacts, booster_path, json_path = setup
+        records = vehicles.head(100).to_dict(orient="records")
+        reference = ModelHandler(**model_artifacts).predict_batch(records)
+        
+        for model_format, model_path in [("booster", booster_path), ("booster", json_path), ("numpy", json_path)]:
+            model_handler = ModelHandler(**dict(model_artifacts, model_path=model_path), model_format=model_format)
+            np.testing.assert_allclose(model_handler.predict_batch(records), reference, rtol=1e-5,
+                                       err_msg=f"{model_format} loader differs from the pickled model")
+    
+    def test_numpy_predictor_missing_values(self, features, tmp_path):
+        y = np.nan_to_num(features[:, 0]) * 3 + np.nan_to_num(features[:, 1])
+        model = XGBRegressor(n_estimators=30, max_depth=4).fit(features, y)
+        model.get_booster().save_model(tmp_path / "model.json")
+        
+        predictor = NumpyTreePredictor.from_json(tmp_path / "model.json")
+        np.testing.assert_allclose(predictor.predict(features), model.predict(features), rtol=1e-5, atol=1e-5)
+    
+    def test_best_iteration_is_respected(self, features, tmp_path):
+        y = np.nan_to_num(features[:, 0])
+        model = XGBRegressor(n_estimators=200, learning_rate=0.3, early_stopping_rounds=5)
+        model.fit(features[:150], y[:150], eval_set=[(features[150:], y[150:])], verbose=False)
+        model.get_booster().save_model(tmp_path / "model.json")
+        
+        expected = model.predict(features)
+        np.testing.assert_allclose(BoosterPredictor(tmp_path / "model.json").predict(features), expected, rtol=1e-5)
+        np.testing.assert_allclose(NumpyTreePredictor.from_json(tmp_path / "model.json").predict(features), expected, rtol=1e-5, atol=1e-5)
+    
+    def test_unknown_format(self, setup):
+        model_artifacts, _, _ = setup
+        with pytest.raises(ValueError):
+            load_predictor(model_artifacts["model_path"], "onnx")
+    
+    def test_nthread(self, setup):
+        model_artifacts, booster_path, _ = setup
+        for model_format, model_path in [("pickle", model_artifacts["model_path"]), ("booster", booster_path)]:
+            model_handler = ModelHandler(**dict(model_artifacts, model_path=model_path), model_format=model_format, nthread=3)
+            booster = model_handler.model.booster if model_format == "booster" else model_handler.model.get_booster()
+            config = json.loads(booster.save_config())
+            assert config["learner"]["generic_param"]["nthread"] == "3", f"{model_format} model should predict with 3 threads"
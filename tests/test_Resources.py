@@ -0,0 +1,35 @@
+import pytest
+
+from app.core.resources import plan_workers, available_cores
+
+class TestPlanSearchFits:
+    
+    def test_parallel_fits_first(self):
+        assert plan_workers(cores=64, n_tasks=648) == (64, 1), "Many small fits should each get one thread"
+        assert plan_workers(cores=64, n_tasks=6) == (6, 10), "Cores not needed for parallel fits should go to XGBoost"
+    
+    def test_overrides(self):
+        assert plan_workers(cores=64, nthread=8, n_tasks=648) == (8, 8)
+        assert plan_workers(cores=64, workers=4, n_tasks=648) == (4, 16)
+        assert plan_workers(cores=64, workers=100, n_tasks=6) == (6, 10), "Workers should be capped at the tasks"
+        with pytest.warns(UserWarning):
+            assert plan_workers(cores=64, workers=100, n_tasks=648) == (100, 1), "Explicit workers beyond the cores should warn"
+    
+    def test_oversubscription_warning(self):
+        with pytest.warns(UserWarning):
+            assert plan_workers(cores=4, workers=4, nthread=4, n_tasks=648) == (4, 4)
+    
+    def test_defaults_to_available_cores(self):
+        workers, nthread = plan_workers(n_tasks=10000)
+        assert workers * nthread <= available_cores()
+
+class TestPlanWorkers:
+    
+    def test_one_worker_per_core(self):
+        assert plan_workers(cores=8) == (8, 1), "Every core should get a worker by default"
+        assert plan_workers(cores=8, workers=2) == (2, 4), "Cores left per worker should go to XGBoost"
+        assert plan_workers(cores=8, nthread=2) == (4, 2)
+    
+    def test_oversubscription_warning(self):
+        with pytest.warns(UserWarning):
+            assert plan_workers(cores=2, workers=2, nthread=2) == (2, 2)
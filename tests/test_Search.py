@@ -0,0 +1,121 @@
+import pytest
+
+from xgboost import XGBRegressor
+from scripts.dummy_artifacts import make_training_data, make_categorical_training_data
+from scripts.search import BayesianSearchCV, QuantileDMatrixSearch, SEARCH_STRATEGIES, EARLY_STOPPING_ROUNDS, make_search, \
+    early_stopping_rounds_for
+from scripts.train import ModelHandler
+
+class TestSearchStrategies:
+    
+    @pytest.fixture()
+    def setup(self):
+        X, y, _, _ = make_training_data(600, noise=1000)
+        param_grid = {
+            'n_estimators': [50, 100],
+            'learning_rate': [0.1, 0.3],
+            'max_depth': [2, 4],
+        }
+        return X, y, param_grid
+    
+    @pytest.mark.parametrize("search", SEARCH_STRATEGIES)
+    def test_train_with_strategy(self, setup, search):
+        X, y, param_grid = setup
+        model_handler = ModelHandler(XGBRegressor(random_state=1234, n_jobs=1))
+        model = model_handler.train(X, y, param_grid, search=search, n_iter=4, early_stopping_rounds=5)
+        
+        report = model_handler.search_report
+        assert model.predict(X.iloc[:5]).shape == (5,)
+        assert report["strategy"] == search and report["seconds"] > 0
+        assert report["best_params"] == {name: model.get_params()[name] for name in param_grid}
+        assert report["best_iteration"] is not None, "Early stopping should record the best iteration"
+        if search in ("random", "bayesian"):
+            assert report["candidates"] == 4, "Budgeted searches should evaluate n_iter candidates"
+    
+    def test_cores_are_split_between_fits_and_threads(self, setup):
+        X, y, param_grid = setup
+        model_handler = ModelHandler(XGBRegressor(random_state=1234))
+        model = model_handler.train(X, y, param_grid, search="random", n_iter=2, cores=12)
+        
+        report = model_handler.search_report
+        assert (report["n_jobs"], report["nthread"]) == (6, 2), "2 candidates x 3 folds should leave 2 threads per fit"
+        assert model.get_params()["n_jobs"] == 2
+        assert len(report["fit_seconds"]) == 2 and all(seconds > 0 for seconds in report["fit_seconds"])
+    
+    def test_bayesian_search_evaluates_distinct_candidates(self, setup):
+        X, y, param_grid = setup
+        search = BayesianSearchCV(XGBRegressor(random_state=1234, n_jobs=1), param_grid, n_iter=6, n_initial=3, batch_size=2,
+                                  cv=3, scoring='neg_mean_squared_error', random_state=1234).fit(X, y)
+        
+        candidates = [tuple(sorted(params.items())) for params in search.cv_results_["params"]]
+        assert len(candidates) == 6 and len(set(candidates)) == 6, "Every grid point should be evaluated at most once"
+        assert search.best_score_ == max(search.cv_results_["mean_test_score"])
+    
+    def test_unknown_strategy(self, setup):
+        _, _, param_grid = setup
+        with pytest.raises(ValueError):
+            make_search("exhaustive", XGBRegressor(), param_grid)
+
+class TestQuantileDMatrixSearch:
+    
+    @pytest.fixture()
+    def setup(self):
+        X, y, _, _ = make_training_data(600, noise=1000)
+        param_grid = {
+            'n_estimators': [50, 100],
+            'max_depth': [2, 4],
+        }
+        return X, y, param_grid
+    
+    @pytest.mark.parametrize("search", ["grid", "random", "bayesian"])
+    def test_train_with_quantile_dmatrix(self, setup, search):
+        X, y, param_grid = setup
+        model_handler = ModelHandler(XGBRegressor(random_state=1234, n_jobs=1))
+        model = model_handler.train(X, y, param_grid, search=search, n_iter=3, early_stopping_rounds=5, quantile_dmatrix=True, max_bin=64)
+        
+        report = model_handler.search_report
+        assert isinstance(model, XGBRegressor), "The refit booster should be wrapped in a regular XGBRegressor"
+        assert list(model.feature_names_in_) == list(X.columns)
+        assert model.predict(X.iloc[:5]).shape == (5,)
+        assert report["quantile_dmatrix"] and report["best_iteration"] is not None
+        assert report["best_params"] == {name: model.get_params()[name] for name in param_grid}
+        assert report["candidates"] == (4 if search == "grid" else 3)
+    
+    @pytest.mark.parametrize("quantile_dmatrix", [False, True])
+    def test_train_with_categorical_features(self, quantile_dmatrix):
+        X, y, vocabulary = make_categorical_training_data(600, noise=1000)
+        model_handler = ModelHandler(XGBRegressor(random_state=1234, n_jobs=1))
+        model = model_handler.train(X, y, {'max_depth': [2, 4]}, search="grid", quantile_dmatrix=quantile_dmatrix)
+        
+        booster = model.get_booster()
+        assert model.get_params()["enable_categorical"], "Categorical columns should switch on native categorical support"
+        assert [booster.feature_types[list(X.columns).index(col)] for col in vocabulary] == ["c"] * len(vocabulary)
+        assert model.predict(X.iloc[:5]).shape == (5,)
+    
+    def test_matches_sklearn_scores(self, setup):
+        X, y, param_grid = setup
+        search = QuantileDMatrixSearch(XGBRegressor(random_state=1234), "grid", param_grid, cv=3).fit(X, y)
+        reference = make_search("grid", XGBRegressor(random_state=1234, tree_method="hist"), param_grid, cv=3,
+                                scoring='neg_mean_squared_error').fit(X, y)
+        
+        for score, reference_score in zip(search.cv_results_["mean_test_score"], reference.cv_results_["mean_test_score"]):
+            assert score == pytest.approx(reference_score, rel=0.05), "float32 quantile folds should score like the sklearn search"
+    
+    def test_refit_does_not_change_settings(self, setup):
+        X, y, param_grid = setup
+        search = QuantileDMatrixSearch(XGBRegressor(random_state=1234), "grid", {'max_depth': [2]}, cv=2, n_jobs=2, nthread=3)
+        search.fit(X, y).fit(X, y)
+        
+        assert (search.n_jobs, search.nthread) == (2, 3), "Fitting should not change the thread settings"
+    
+    def test_early_stopping_defaults(self):
+        assert early_stopping_rounds_for("grid") is None, "The grid search should train every candidate unless asked"
+        assert early_stopping_rounds_for("grid", 20) == 20
+        for search in ["halving_grid", "halving_random", "random", "bayesian"]:
+            assert early_stopping_rounds_for(search) == EARLY_STOPPING_ROUNDS, f"{search} should stop early by default"
+            assert early_stopping_rounds_for(search, 0) is None, "0 should switch early stopping off"
+    
+    def test_halving_is_not_supported(self, setup):
+        _, _, param_grid = setup
+        with pytest.raises(ValueError):
+            QuantileDMatrixSearch(XGBRegressor(), "halving_grid", param_grid)
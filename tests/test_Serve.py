@@ -0,0 +1,75 @@
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import httpx
+import psutil
+import pytest
+
+from pathlib import Path
+from scripts.dummy_artifacts import artifact_environment
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for(condition, timeout: float = 30) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+class TestServe:
+
+    @pytest.fixture()
+    def setup(self, model_artifacts, tmp_path):
+        port = free_port()
+        env = {**os.environ, **artifact_environment(model_artifacts), "DATABASE_URL": f"sqlite:///{tmp_path / 'app.sqlite'}",
+               "MODEL_CHECK_INTERVAL_SECONDS": "0"}
+        process = subprocess.Popen([sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port),
+                                    "--workers", "2", "--nthread", "1", "--log-level", "warning", "--migrate"], cwd=ROOT_DIR, env=env)
+        yield process, f"http://127.0.0.1:{port}", tmp_path / "app.sqlite"
+        if process.poll() is None:
+            process.kill()
+            for child in psutil.Process(process.pid).children():
+                child.kill()
+            process.wait()
+
+    def healthy(self, base_url: str) -> bool:
+        try:
+            return httpx.get(f"{base_url}/predict/healthcheck").status_code == 200
+        except httpx.TransportError:
+            return False
+
+    def test_workers_share_socket_and_restart(self, setup):
+        process, base_url, database_path = setup
+        assert wait_for(lambda: self.healthy(base_url)), "Server should start"
+        with sqlite3.connect(database_path) as connection:
+            tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"users", "price_predictions"} <= tables, "--migrate should create the tables before forking"
+        parent = psutil.Process(process.pid)
+        workers = parent.children()
+        assert len(workers) == 2, "Two workers should be forked"
+        assert httpx.get(f"{base_url}/predict/healthcheck").json()["model_version"] is not None
+
+        workers[0].kill()
+        assert wait_for(lambda: len(parent.children()) == 2 and workers[0].pid not in [child.pid for child in parent.children()]), \
+            "A dead worker should be replaced"
+        assert wait_for(lambda: self.healthy(base_url))
+
+        # Stopped while a replacement is pending, no worker should be started after the signal
+        workers = parent.children()
+        workers[0].kill()
+        time.sleep(0.2)
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0, "The parent should exit cleanly after stopping the workers"
+        assert not any(psutil.pid_exists(worker.pid) and psutil.Process(worker.pid).status() != psutil.STATUS_ZOMBIE
+                       for worker in workers[1:]), "Workers should be stopped with the parent"
@@ -0,0 +1,19 @@
+import json
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "sklearn", "xgboost", "jose", "passlib"]
+
+class TestStartup:
+    
+    def test_import_is_lazy(self, tmp_path):
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'app.sqlite'}"}
+        code = f"import sys, json, app.main; print(json.dumps([name for name in {HEAVY_MODULES} if name in sys.modules]))"
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True)
+        
+        assert json.loads(result.stdout) == [], "Importing the app should not load the model or auth dependencies"
+        assert not (tmp_path / "app.sqlite").exists(), "Importing the app should not connect to the database"
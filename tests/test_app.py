@@ -1,7 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
 
-from app.main import app, ModelHandler, Config
+from app.main import app
+from app.database.database import db
+from app.models import User, Prediction
+from app.auth.oauth2 import create_access_token
+from app.routes import prediction
+from app.services.batcher import MicroBatcher
+from app.services.model_handler import ModelHandler
 
 client = TestClient(app)
 
@@ -25,21 +31,29 @@ class TestApp:
             }
 
     @pytest.fixture
-    def model_h(self):
-        model_handler = ModelHandler(
-        model_path=Config.MODEL_PATH,
-        one_hot_encoder_path=Config.ONE_HOT_ENCODER_PATH,
-        label_encoder_path=Config.LABEL_ENCODER_PATH,
-        )
+    def model_h(self, model_artifacts):
+        model_handler = ModelHandler(**model_artifacts)
         model_handler.load_model()
         model_handler.load_one_hot_encoder()
         model_handler.load_label_encoder()
         return model_handler
 
-    def test_health_check(self):
-        response = client.get("/healthcheck")
+    @pytest.fixture
+    def headers(self, serving_registry):
+        session = db.get_session()
+        user = User(email="app@example.com", password="app-hash")
+        session.add(user)
+        session.commit()
+        yield {"Authorization": f"Bearer {create_access_token(data={'user_id': user.id})}"}
+        session.query(Prediction).filter(Prediction.owner_id == user.id).delete()
+        session.delete(user)
+        session.commit()
+        session.close()
+
+    def test_health_check(self, serving_registry):
+        response = client.get("/predict/healthcheck")
         assert response.status_code == 200, f"Expected 200, got {response.status_code}"
-        assert response.json() == {"status": "ok"}
+        assert response.json() == {"status": "ok", "model_version": serving_registry.model_version}
             
     def test_process_input_data(self, data, model_h):
         
@@ -58,15 +72,38 @@ class TestApp:
         assert processed_data["Transmission_Automatic"].iloc[0] == 1.0, "Transmission_Automatic should be 1.0"
         assert processed_data["FuelType_Diesel"].iloc[0] == 1.0, "FuelType_Diesel should be 1.0"
         
-    def test_predict(self, data, model_h):
+    def test_predict(self, data, model_h, headers):
         
         model_handler = model_h        
         model_handler.process_input_data(data)
-        response = client.post("/predict", json=data)
-        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        response = client.post("/predict/", json=data, headers=headers)
+        assert response.status_code == 201, f"Expected 201, got {response.status_code}"
         
         json_response = response.json()
         assert "prediction" in json_response, "Response should contain 'prediction' field"
         assert isinstance(json_response["prediction"], list), "'prediction' should be a list"
         assert len(json_response["prediction"]) == 1, "Prediction list should have one item"
         assert isinstance(json_response["prediction"][0], (int, float)), "Prediction should be numeric"
+    
+    def test_batched_predict_uses_the_captured_model(self, data, headers, serving_registry, monkeypatch):
+        handler = serving_registry.active
+        scored_by = []
+        
+        def predict_fn(model_handler, records):
+            # A reload lands while the request waits in the batcher
+            serving_registry._active = None
+            scored_by.append(model_handler)
+            return model_handler.predict_batch(records)
+        
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=1).start()
+        monkeypatch.setattr(prediction, "batcher", batcher)
+        try:
+            response = client.post("/predict/", json=data, headers=headers)
+        finally:
+            batcher.stop()
+            serving_registry._active = handler
+        
+        assert response.status_code == 201, response.text
+        assert scored_by == [handler], "The request should be scored by the model it read at the start"
+        assert response.json()["model_version"] == handler.model_version
+        assert response.json()["prediction"] == handler.predict_batch([data])